@@ -0,0 +1,130 @@
+import json
+import os
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .audit_writer import flush_audit_log
+
+SUMMARY_EVENT = "AUDIT_DAILY_SUMMARY"
+DEFAULT_RETENTION = "*=365,AUDIT_DAILY_SUMMARY=730"
+DEFAULT_COMPACT_EVENTS = "INTRADAY_PRICE_FETCHED,RULE_EVALUATED"
+
+
+def retention_policy() -> dict[str, int]:
+    raw = os.getenv("AUDIT_RETENTION_DAYS", DEFAULT_RETENTION)
+    policy = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        event_type, days = item.split("=", 1)
+        policy[event_type.strip()] = int(days)
+    return policy
+
+
+def compact_events() -> list[str]:
+    raw = os.getenv("AUDIT_COMPACT_EVENTS", DEFAULT_COMPACT_EVENTS)
+    return [item.strip() for item in raw.split(",") if item.strip()]
+
+
+def _compact_after_days() -> int:
+    return int(os.getenv("AUDIT_COMPACT_AFTER_DAYS", "2"))
+
+
+def compact_audit_logs(
+    db: Session,
+    now: datetime | None = None,
+    events: list[str] | None = None,
+    after_days: int | None = None,
+) -> dict:
+    now = now or datetime.utcnow()
+    events = compact_events() if events is None else events
+    after_days = _compact_after_days() if after_days is None else after_days
+    cutoff = datetime.combine((now - timedelta(days=after_days)).date(), time.min)
+    table = models.AuditLog.__table__
+    if not events:
+        return {"summaries": 0, "compacted": 0, "cutoff": cutoff.isoformat()}
+
+    day = func.date(table.c.timestamp).label("day")
+    groups = db.execute(
+        select(
+            table.c.stock_id,
+            table.c.event_type,
+            day,
+            func.count(table.c.id).label("count"),
+            func.min(table.c.timestamp).label("first_at"),
+            func.max(table.c.timestamp).label("last_at"),
+            func.max(table.c.id).label("last_id"),
+        )
+        .where(table.c.event_type.in_(events), table.c.timestamp < cutoff)
+        .group_by(table.c.stock_id, table.c.event_type, day)
+    ).all()
+    if not groups:
+        return {"summaries": 0, "compacted": 0, "cutoff": cutoff.isoformat()}
+
+    last_payloads = {}
+    last_ids = [group.last_id for group in groups]
+    for start in range(0, len(last_ids), 500):
+        chunk = last_ids[start : start + 500]
+        for row in db.execute(select(table.c.id, table.c.payload_json).where(table.c.id.in_(chunk))):
+            last_payloads[row.id] = row.payload_json
+
+    summaries = []
+    for group in groups:
+        summaries.append(
+            {
+                "timestamp": group.last_at,
+                "stock_id": group.stock_id,
+                "event_type": SUMMARY_EVENT,
+                "payload_json": json.dumps(
+                    {
+                        "event_type": group.event_type,
+                        "date": str(group.day),
+                        "count": group.count,
+                        "first_at": group.first_at.isoformat(),
+                        "last_at": group.last_at.isoformat(),
+                        "last_payload": json.loads(last_payloads.get(group.last_id) or "null"),
+                    }
+                ),
+            }
+        )
+
+    db.execute(insert(table), summaries)
+    deleted = db.execute(
+        delete(table).where(table.c.event_type.in_(events), table.c.timestamp < cutoff)
+    ).rowcount
+    db.commit()
+    return {"summaries": len(summaries), "compacted": deleted, "cutoff": cutoff.isoformat()}
+
+
+def apply_retention(
+    db: Session, now: datetime | None = None, policy: dict[str, int] | None = None
+) -> dict[str, int]:
+    now = now or datetime.utcnow()
+    policy = retention_policy() if policy is None else policy
+    table = models.AuditLog.__table__
+    explicit = [event_type for event_type in policy if event_type != "*"]
+    deleted: dict[str, int] = {}
+
+    for event_type, days in policy.items():
+        if days <= 0:
+            continue
+        statement = delete(table).where(table.c.timestamp < now - timedelta(days=days))
+        if event_type == "*":
+            if explicit:
+                statement = statement.where(table.c.event_type.not_in(explicit))
+        else:
+            statement = statement.where(table.c.event_type == event_type)
+        deleted[event_type] = db.execute(statement).rowcount
+    db.commit()
+    return deleted
+
+
+def run_audit_maintenance(db: Session, now: datetime | None = None) -> dict:
+    flush_audit_log()
+    return {
+        "compaction": compact_audit_logs(db, now=now),
+        "retention": apply_retention(db, now=now),
+    }
@@ -0,0 +1,182 @@
+import atexit
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+
+def _batch_size() -> int:
+    return int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+
+
+def _flush_interval() -> float:
+    return float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+
+
+def _max_retries() -> int:
+    return int(os.getenv("AUDIT_MAX_RETRIES", "3"))
+
+
+def _max_pending() -> int:
+    return int(os.getenv("AUDIT_MAX_PENDING", "10000"))
+
+
+def audit_row(stock_id: int | None, event_type: str, payload: dict) -> dict:
+    return {
+        "timestamp": datetime.utcnow(),
+        "stock_id": stock_id,
+        "event_type": event_type,
+        "payload_json": json.dumps(payload),
+    }
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+        max_retries: int | None = None,
+        max_pending: int | None = None,
+    ):
+        self.batch_size = batch_size or _batch_size()
+        self.flush_interval = flush_interval or _flush_interval()
+        self.max_retries = _max_retries() if max_retries is None else max_retries
+        self.max_pending = max_pending or _max_pending()
+        self._pending: list[tuple[Engine, dict, int]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.flushes = 0
+        self.written = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def record(self, bind: Engine, stock_id: int | None, event_type: str, payload: dict):
+        row = audit_row(stock_id, event_type, payload)
+        with self._lock:
+            self._pending.append((bind, row, 0))
+            self._trim_pending()
+            full = len(self._pending) >= self.batch_size
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+
+            by_bind: dict[Engine, list[tuple[dict, int]]] = {}
+            for bind, row, attempts in pending:
+                by_bind.setdefault(bind, []).append((row, attempts))
+
+            written = 0
+            retry: list[tuple[Engine, dict, int]] = []
+            dropped = 0
+            error = None
+            for bind, entries in by_bind.items():
+                try:
+                    with bind.begin() as connection:
+                        connection.execute(
+                            insert(models.AuditLog.__table__), [row for row, _ in entries]
+                        )
+                except Exception as exc:
+                    error = exc
+                    for row, attempts in entries:
+                        if attempts + 1 >= self.max_retries:
+                            dropped += 1
+                        else:
+                            retry.append((bind, row, attempts + 1))
+                    continue
+                written += len(entries)
+
+            with self._lock:
+                self._pending[:0] = retry
+                self.dropped += dropped
+                self._trim_pending()
+                self.flushes += 1
+                self.written += written
+                self.failures += error is not None
+            if dropped:
+                logger.error(
+                    "Dropped %d audit events after %d failed flushes: %s",
+                    dropped,
+                    self.max_retries,
+                    error,
+                )
+            if error is not None:
+                raise error
+            return written
+
+    def _trim_pending(self):
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            logger.error("Audit queue full; dropped %d oldest events", overflow)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "flushes": self.flushes,
+                "written": self.written,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                "max_retries": self.max_retries,
+                "max_pending": self.max_pending,
+            }
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                continue
+
+
+_WRITER: AuditWriter | None = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_audit_writer() -> AuditWriter:
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = AuditWriter()
+            atexit.register(_WRITER.close)
+        return _WRITER
+
+
+def flush_audit_log() -> int:
+    return get_audit_writer().flush()
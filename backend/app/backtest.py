@@ -0,0 +1,554 @@
+import json
+import operator
+import warnings
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy.orm import Session
+
+from . import crud, indicator_engine, models, rule_engine
+from .rule_context import PRICE_FIELDS
+from .rule_engine import (
+    _COMPARISON_OPS,
+    SERIES_FUNCTIONS,
+    compile_expression,
+)
+from .series import BarColumns
+
+_CONDITION_OPS = {
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "eq": operator.eq,
+    "ne": operator.ne,
+}
+_CROSS_CONDITION_OPS = {"crosses_above", "crossover", "crosses_below", "crossunder"}
+
+
+def _as_array(values) -> "np.ndarray":
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+
+class BacktestData:
+    def __init__(
+        self,
+        dates: list[date],
+        columns: dict[str, "np.ndarray"],
+        indicators: list[models.IndicatorDef] | None = None,
+    ):
+        self.dates = dates
+        self.columns = columns
+        self.indicators = {indicator.indicator_id: indicator for indicator in indicators or []}
+        self._series: dict[tuple, "np.ndarray"] = {}
+
+    @classmethod
+    def from_bars(cls, bars: list, indicators: list[models.IndicatorDef] | None = None):
+        columns = BarColumns.from_bars(bars)
+        arrays = {
+            field: np.asarray(columns.column(field), dtype=float) for field in BarColumns.FIELDS
+        }
+        return cls(columns.dates, arrays, indicators)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def with_indicators(self, indicators: list[models.IndicatorDef]) -> "BacktestData":
+        data = BacktestData(self.dates, self.columns, indicators)
+        data._series = self._series
+        return data
+
+    @property
+    def series_cache(self) -> dict[tuple, "np.ndarray"]:
+        return self._series
+
+    def function_series(self, name: str, period: int) -> "np.ndarray":
+        key = (name, period)
+        if key not in self._series:
+            closes = self.columns["close"]
+            if name == "SMA":
+                values = indicator_engine.compute_sma(closes, period)
+            elif name == "EMA":
+                values = indicator_engine.compute_ema(closes, period)
+            elif name == "RSI":
+                values = indicator_engine.compute_rsi(closes, period)
+            else:
+                values = indicator_engine.compute_vwap(closes, self.columns["volume"], period)
+            self._series[key] = _as_array(values)
+        return self._series[key]
+
+    def named_series(self, name: str) -> "np.ndarray | None":
+        field = PRICE_FIELDS.get(name)
+        if field is not None:
+            return self.columns[field]
+        if not name.startswith("ind."):
+            return None
+        indicator = self.indicators.get(name[4:])
+        if indicator is None:
+            return None
+        key = ("ind", indicator.indicator_id, indicator.params_json, indicator.price_field)
+        if key not in self._series:
+            price_field = "adjusted_close" if indicator.price_field == "adjusted_close" else "close"
+            values = indicator_engine.compute_indicator_values(
+                indicator, self.columns[price_field], self.columns["volume"]
+            )
+            self._series[key] = _as_array(values)
+        return self._series[key]
+
+
+def _shift(values: "np.ndarray", count: int) -> "np.ndarray":
+    if count == 0:
+        return values
+    result = np.full(len(values), np.nan)
+    if 0 < count < len(values):
+        result[count:] = values[:-count]
+    return result
+
+
+def _rolling(values: "np.ndarray", period: int, reducer) -> "np.ndarray":
+    if period <= 0:
+        return np.full(len(values), np.nan)
+    padded = np.concatenate([np.full(period - 1, np.nan), values])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return reducer(sliding_window_view(padded, period), axis=1)
+
+
+def _numeric(values: "np.ndarray") -> "np.ndarray":
+    return values.astype(float) if values.dtype == bool else values
+
+
+def _truthy(values: "np.ndarray") -> "np.ndarray":
+    if values.dtype == bool:
+        return values
+    return (values != 0) & ~np.isnan(values)
+
+
+def _literal(node, what: str) -> float:
+    if node[0] != "number":
+        raise ValueError(f"Backtest requires a literal {what}")
+    return node[1]
+
+
+class VectorEvaluator:
+    def __init__(self, data: BacktestData):
+        self.data = data
+        self.length = len(data)
+
+    def series(self, node) -> "np.ndarray | None":
+        if node[0] == "ident":
+            return self.data.named_series(node[1])
+        if node[0] == "call" and node[1] in SERIES_FUNCTIONS:
+            if not node[2]:
+                raise ValueError(f"{node[1]} requires a period")
+            return self.data.function_series(node[1], int(_literal(node[2][0], "period")))
+        return None
+
+    def eval(self, node, shift: int = 0) -> "np.ndarray":
+        kind = node[0]
+        if kind == "number":
+            return np.full(self.length, node[1], dtype=float)
+        if kind == "ident":
+            values = self.series(node)
+            if values is None:
+                return np.full(self.length, np.nan)
+            return _shift(values, shift)
+        if kind == "call":
+            return self._call(node, shift)
+        if kind == "index":
+            values = self.series(node[1])
+            if values is None:
+                raise ValueError("Indexing requires a series")
+            offset = shift + int(_literal(node[2], "index"))
+            if offset < 0:
+                return np.full(self.length, np.nan)
+            return _shift(values, offset)
+        if kind == "unary":
+            values = _numeric(self.eval(node[2], shift))
+            return values if node[1] == "+" else -values
+        if kind == "bin":
+            return self._binary(node[1], self.eval(node[2], shift), self.eval(node[3], shift))
+        if kind == "cmp":
+            return self._compare(node, shift)
+        if kind == "and":
+            return _truthy(self.eval(node[1], shift)) & _truthy(self.eval(node[2], shift))
+        if kind == "or":
+            return _truthy(self.eval(node[1], shift)) | _truthy(self.eval(node[2], shift))
+        if kind == "not":
+            return ~_truthy(self.eval(node[1], shift))
+        raise ValueError(f"Unknown node: {node}")
+
+    def _call(self, node, shift: int) -> "np.ndarray":
+        name, args = node[1], node[2]
+        if name in SERIES_FUNCTIONS:
+            return _shift(self.series(node), shift)
+        if name in {"highest", "lowest"}:
+            values = self.series(args[0]) if args else None
+            if values is None or len(args) != 2:
+                raise ValueError(f"{name} requires a series and a period")
+            reducer = np.nanmax if name == "highest" else np.nanmin
+            return _rolling(values, int(_literal(args[1], "period")), reducer)
+        if name == "change":
+            values = self.series(args[0]) if len(args) == 1 else None
+            if values is None:
+                return np.full(self.length, np.nan)
+            return values - _shift(values, 1)
+        if name == "diff" and len(args) == 2:
+            values = []
+            for arg in args:
+                series = self.series(arg)
+                values.append(series if series is not None else _numeric(self.eval(arg, shift)))
+            return values[0] - values[1]
+        raise ValueError(f"Unknown function: {name}")
+
+    def _binary(self, op: str, left, right) -> "np.ndarray":
+        left = _numeric(left)
+        right = _numeric(right)
+        if op == "+":
+            return left + right
+        if op == "-":
+            return left - right
+        if op == "*":
+            return left * right
+        if op == "/":
+            result = np.full(self.length, np.nan)
+            np.divide(left, right, out=result, where=right != 0)
+            return result
+        raise ValueError(f"Unknown operator: {op}")
+
+    def _compare(self, node, shift: int) -> "np.ndarray":
+        op_upper = node[1].upper()
+        left = _numeric(self.eval(node[2], shift))
+        right = _numeric(self.eval(node[3], shift))
+        valid = ~np.isnan(left) & ~np.isnan(right)
+        if op_upper in {"CROSSOVER", "CROSSUNDER"}:
+            left_prev = _numeric(self.eval(node[2], shift + 1))
+            right_prev = _numeric(self.eval(node[3], shift + 1))
+            valid &= ~np.isnan(left_prev) & ~np.isnan(right_prev)
+            with np.errstate(invalid="ignore"):
+                if op_upper == "CROSSOVER":
+                    crossed = (left > right) & (left_prev <= right_prev)
+                else:
+                    crossed = (left < right) & (left_prev >= right_prev)
+            return crossed & valid
+        func = _COMPARISON_OPS.get(op_upper)
+        if func is None:
+            raise ValueError(f"Unknown comparison: {node[1]}")
+        with np.errstate(invalid="ignore"):
+            return func(left, right) & valid
+
+    def expression(self, expr: str) -> "np.ndarray":
+        return _truthy(self.eval(compile_expression(expr).tree))
+
+    def condition(self, condition: dict) -> "np.ndarray":
+        if "all" in condition:
+            result = np.ones(self.length, dtype=bool)
+            for item in condition["all"]:
+                result &= self.condition(item)
+            return result
+        if "any" in condition:
+            result = np.zeros(self.length, dtype=bool)
+            for item in condition["any"]:
+                result |= self.condition(item)
+            return result
+        if "not" in condition:
+            return ~self.condition(condition["not"])
+
+        op = condition["op"]
+        if op in _CROSS_CONDITION_OPS:
+            return np.zeros(self.length, dtype=bool)
+        func = _CONDITION_OPS.get(op)
+        if func is None:
+            raise ValueError(f"Unsupported operator: {op}")
+        left = self._operand(condition["left"])
+        right = self._operand(condition["right"])
+        with np.errstate(invalid="ignore"):
+            return func(left, right) & ~np.isnan(left) & ~np.isnan(right)
+
+    def _operand(self, name) -> "np.ndarray":
+        values = self.data.named_series(name) if isinstance(name, str) else None
+        return values if values is not None else np.full(self.length, np.nan)
+
+
+def _warm_tree(evaluator: VectorEvaluator, node):
+    if node[0] == "call" and node[1] in SERIES_FUNCTIONS:
+        try:
+            evaluator.series(node)
+        except ValueError:
+            pass
+    for child in node[1:]:
+        for item in child if isinstance(child, list) else [child]:
+            if isinstance(item, tuple):
+                _warm_tree(evaluator, item)
+
+
+def warm_series(rule_plan: dict, data: BacktestData):
+    evaluator = VectorEvaluator(data)
+    for expr in rule_engine.iter_plan_expressions(rule_plan):
+        _warm_tree(evaluator, compile_expression(expr).tree)
+    for name in rule_engine.collect_references(rule_plan):
+        data.named_series(name)
+
+
+@dataclass
+class PlanSignals:
+    entry: "np.ndarray"
+    entry_rule: "np.ndarray"
+    exit: "np.ndarray"
+    exit_rule: "np.ndarray"
+
+
+def plan_signals(rule_plan: dict, data: BacktestData) -> PlanSignals:
+    evaluator = VectorEvaluator(data)
+    length = len(data)
+
+    entry = np.zeros(length, dtype=bool)
+    entry_rule = np.full(length, None, dtype=object)
+    rules = sorted(rule_plan.get("entry_rules", []), key=lambda r: r.get("priority", 999999))
+    for rule in rules:
+        signal = np.ones(length, dtype=bool)
+        for constraint in rule.get("constraints", []):
+            signal &= evaluator.condition(constraint)
+        for expr in rule.get("constraints_expr", []):
+            signal &= evaluator.expression(expr)
+        if rule.get("condition_expr"):
+            signal &= evaluator.expression(rule["condition_expr"])
+        elif rule.get("condition"):
+            signal &= evaluator.condition(rule["condition"])
+        else:
+            continue
+        entry_rule[signal & ~entry] = rule.get("id", "ENTRY")
+        entry |= signal
+
+    exit_ = np.zeros(length, dtype=bool)
+    exit_rule = np.full(length, None, dtype=object)
+    for rule in rule_plan.get("exit_rules", {}).get("conditions", []):
+        if rule.get("condition_expr"):
+            signal = evaluator.expression(rule["condition_expr"])
+        elif rule.get("condition"):
+            signal = evaluator.condition(rule["condition"])
+        else:
+            continue
+        exit_rule[signal & ~exit_] = rule.get("id", "EXIT")
+        exit_ |= signal
+
+    return PlanSignals(entry, entry_rule, exit_, exit_rule)
+
+
+def _stop_fraction(rule: dict | None, expected_type: str) -> float | None:
+    if not rule:
+        return None
+    if rule.get("type", expected_type) != expected_type:
+        raise ValueError(f"Unsupported stop type: {rule.get('type')}")
+    return float(rule["value"])
+
+
+class _Position:
+    def __init__(self, index: int, entry_date: date, price: float, rule: str | None):
+        self.index = index
+        self.entry_date = entry_date
+        self.entry_price = price
+        self.rule = rule
+        self.peak = price
+        self.remaining = 1.0
+        self.realized = 0.0
+        self.fills: list[dict] = []
+        self.hit_targets: set[int] = set()
+
+    def fill(self, bar_date: date, price: float, size: float, reason: str):
+        size = min(size, self.remaining)
+        self.remaining -= size
+        self.realized += size * (price / self.entry_price - 1)
+        self.fills.append(
+            {"date": bar_date.isoformat(), "price": price, "size_pct": size, "reason": reason}
+        )
+
+    def mark(self, price: float) -> float:
+        return self.realized + self.remaining * (price / self.entry_price - 1)
+
+    def as_trade(self, exit_index: int, last_price: float) -> dict:
+        filled = sum(fill["size_pct"] for fill in self.fills)
+        exit_price = (
+            sum(fill["price"] * fill["size_pct"] for fill in self.fills) / filled if filled else None
+        )
+        is_open = self.remaining > 1e-12
+        return {
+            "entry_date": self.entry_date.isoformat(),
+            "entry_price": self.entry_price,
+            "entry_rule": self.rule,
+            "exit_date": None if is_open else self.fills[-1]["date"],
+            "exit_price": exit_price,
+            "exit_reason": "OPEN" if is_open else self.fills[-1]["reason"],
+            "return_pct": self.mark(last_price),
+            "bars_held": exit_index - self.index,
+            "open": is_open,
+            "fills": self.fills,
+        }
+
+
+def simulate(
+    rule_plan: dict, data: BacktestData, signals: PlanSignals, start_index: int = 0
+) -> tuple[list[dict], "np.ndarray"]:
+    exit_rules = rule_plan.get("exit_rules", {})
+    hard_stop = _stop_fraction(exit_rules.get("hard_stop"), "pct_below_entry")
+    trailing_stop = _stop_fraction(exit_rules.get("trailing_stop"), "pct_from_peak")
+    take_profits = sorted(
+        enumerate(exit_rules.get("take_profits", [])), key=lambda item: item[1].get("pct_gain", 0)
+    )
+    max_days = (exit_rules.get("time_stop") or {}).get("max_holding_days")
+    cooldown = int((rule_plan.get("position_intent") or {}).get("cooldown_days_after_exit", 0) or 0)
+
+    dates = data.dates
+    opens = data.columns["open"].tolist()
+    highs = data.columns["high"].tolist()
+    lows = data.columns["low"].tolist()
+    closes = data.columns["close"].tolist()
+    entry = signals.entry.tolist()
+    exit_ = signals.exit.tolist()
+
+    equity = np.ones(len(data))
+    capital = 1.0
+    trades: list[dict] = []
+    position: _Position | None = None
+    reentry: date | None = None
+
+    for i in range(start_index, len(data)):
+        if position is None:
+            equity[i] = capital
+            if entry[i] and (reentry is None or dates[i] >= reentry):
+                position = _Position(i, dates[i], closes[i], signals.entry_rule[i])
+            continue
+
+        entry_price = position.entry_price
+        stop_price = None
+        stop_reason = None
+        if hard_stop is not None:
+            stop_price = entry_price * (1 - hard_stop)
+            stop_reason = "HARD_STOP"
+        if trailing_stop is not None:
+            trailing_price = position.peak * (1 - trailing_stop)
+            if stop_price is None or trailing_price > stop_price:
+                stop_price = trailing_price
+                stop_reason = "TRAILING_STOP"
+
+        if stop_price is not None and lows[i] <= stop_price:
+            position.fill(dates[i], min(opens[i], stop_price), position.remaining, stop_reason)
+        else:
+            for index, target in take_profits:
+                if index in position.hit_targets:
+                    continue
+                target_price = entry_price * (1 + float(target["pct_gain"]))
+                if highs[i] < target_price:
+                    break
+                position.hit_targets.add(index)
+                position.fill(
+                    dates[i],
+                    max(opens[i], target_price),
+                    float(target.get("size_pct", 1.0)),
+                    target.get("id", "TAKE_PROFIT"),
+                )
+                if position.remaining <= 1e-12:
+                    break
+            if position.remaining > 1e-12:
+                if exit_[i]:
+                    position.fill(dates[i], closes[i], position.remaining, signals.exit_rule[i])
+                elif max_days and (dates[i] - position.entry_date).days >= max_days:
+                    position.fill(dates[i], closes[i], position.remaining, "TIME_STOP")
+
+        position.peak = max(position.peak, highs[i])
+        if position.remaining <= 1e-12:
+            capital *= 1 + position.realized
+            equity[i] = capital
+            trades.append(position.as_trade(i, closes[i]))
+            reentry = dates[i] + timedelta(days=max(cooldown, 1))
+            position = None
+        else:
+            equity[i] = capital * (1 + position.mark(closes[i]))
+
+    if position is not None:
+        trades.append(position.as_trade(len(data) - 1, closes[-1]))
+    return trades, equity
+
+
+def summarize(trades: list[dict], equity: "np.ndarray", data: BacktestData, start_index: int = 0) -> dict:
+    closed = [trade for trade in trades if not trade["open"]]
+    returns = np.array([trade["return_pct"] for trade in closed], dtype=float)
+    gross_profit = float(returns[returns > 0].sum()) if len(returns) else 0.0
+    gross_loss = float(-returns[returns < 0].sum()) if len(returns) else 0.0
+    window = equity[start_index:]
+    peaks = np.maximum.accumulate(window) if len(window) else window
+    held_bars = sum(trade["bars_held"] for trade in trades)
+    bars = len(data) - start_index
+    return {
+        "bars": bars,
+        "start": data.dates[start_index].isoformat() if bars > 0 else None,
+        "end": data.dates[-1].isoformat() if bars > 0 else None,
+        "trades": len(closed),
+        "open_trades": len(trades) - len(closed),
+        "wins": int((returns > 0).sum()),
+        "losses": int((returns <= 0).sum()),
+        "win_rate": float((returns > 0).mean()) if len(returns) else None,
+        "total_return": float(window[-1] - 1) if len(window) else 0.0,
+        "avg_return": float(returns.mean()) if len(returns) else None,
+        "best_trade": float(returns.max()) if len(returns) else None,
+        "worst_trade": float(returns.min()) if len(returns) else None,
+        "profit_factor": gross_profit / gross_loss if gross_loss else None,
+        "max_drawdown": float((window / peaks - 1).min()) if len(window) else 0.0,
+        "exposure": held_bars / bars if bars > 0 else 0.0,
+        "avg_bars_held": held_bars / len(trades) if trades else None,
+    }
+
+
+@dataclass
+class BacktestResult:
+    trades: list[dict]
+    summary: dict
+    equity: Any
+
+    def as_dict(self, include_trades: bool = True) -> dict:
+        payload = {"summary": self.summary}
+        if include_trades:
+            payload["trades"] = self.trades
+        return payload
+
+
+def run_backtest(rule_plan: dict, data: BacktestData, start: date | None = None) -> BacktestResult:
+    if len(data) == 0:
+        raise ValueError("No bars available")
+    start_index = 0
+    if start is not None:
+        start_index = next((idx for idx, day in enumerate(data.dates) if day >= start), len(data))
+    signals = plan_signals(rule_plan, data)
+    trades, equity = simulate(rule_plan, data, signals, start_index)
+    return BacktestResult(trades, summarize(trades, equity, data, start_index), equity)
+
+
+def load_backtest_data(
+    db: Session, stock_id: int, rule_plan: dict, end: date | None = None
+) -> BacktestData:
+    query = db.query(models.DailyBar).filter(models.DailyBar.stock_id == stock_id)
+    if end is not None:
+        query = query.filter(models.DailyBar.bar_date <= end)
+    bars = query.order_by(models.DailyBar.bar_date).all()
+    if not bars:
+        raise ValueError("No daily bars available")
+    return BacktestData.from_bars(bars, crud.indicator_defs_from_plan(rule_plan, stock_id))
+
+
+def backtest_stock(
+    db: Session,
+    stock_id: int,
+    rule_plan: dict | None = None,
+    start: date | None = None,
+    end: date | None = None,
+) -> BacktestResult:
+    if rule_plan is None:
+        plan = crud.get_active_rule_plan(db, stock_id)
+        if not plan:
+            raise ValueError("No active rule plan")
+        rule_plan = json.loads(plan.rules_json)
+    data = load_backtest_data(db, stock_id, rule_plan, end)
+    return run_backtest(rule_plan, data, start)
@@ -0,0 +1,69 @@
+import argparse
+import json
+import time
+from datetime import date
+from pathlib import Path
+
+from . import models
+from .backtest import backtest_stock
+from .db import SessionLocal
+
+
+def _pct(value: float | None) -> str:
+    return "-" if value is None else f"{value * 100:.2f}%"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest a rule plan against stored daily bars.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--stock-id", type=int)
+    target.add_argument("--ticker")
+    parser.add_argument("--plan", help="Rule plan JSON file (defaults to the active plan)")
+    parser.add_argument("--start", type=date.fromisoformat, help="First trading date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last bar date (YYYY-MM-DD)")
+    parser.add_argument("--json", action="store_true", help="Print the full result as JSON")
+    args = parser.parse_args(argv)
+
+    rule_plan = None
+    if args.plan:
+        rule_plan = json.loads(Path(args.plan).read_text(encoding="utf-8"))
+
+    with SessionLocal() as db:
+        query = db.query(models.Stock)
+        if args.stock_id is not None:
+            stock = query.filter(models.Stock.id == args.stock_id).first()
+        else:
+            stock = query.filter(models.Stock.ticker == args.ticker.upper()).first()
+        if stock is None:
+            print("Stock not found")
+            return 1
+        started = time.perf_counter()
+        try:
+            result = backtest_stock(db, stock.id, rule_plan, start=args.start, end=args.end)
+        except ValueError as exc:
+            print(f"Backtest failed: {exc}")
+            return 1
+        elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(result.as_dict(), indent=2))
+        return 0
+
+    summary = result.summary
+    print(f"{stock.ticker}: {summary['bars']} bars {summary['start']} .. {summary['end']} ({elapsed:.3f}s)")
+    print(f"  trades        {summary['trades']} closed, {summary['open_trades']} open")
+    print(f"  win rate      {_pct(summary['win_rate'])}")
+    print(f"  total return  {_pct(summary['total_return'])}")
+    print(f"  avg return    {_pct(summary['avg_return'])}")
+    print(f"  max drawdown  {_pct(summary['max_drawdown'])}")
+    print(f"  exposure      {_pct(summary['exposure'])}")
+    for trade in result.trades:
+        print(
+            f"  {trade['entry_date']} {trade['entry_price']:>10.2f} -> "
+            f"{trade['exit_date'] or 'open':<10} {trade['exit_reason']:<14} {_pct(trade['return_pct'])}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
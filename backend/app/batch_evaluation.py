@@ -0,0 +1,256 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import jobs, models, notifications, rule_engine
+from .audit_writer import audit_row
+
+INDICATOR_FIELDS = (
+    "stock_id",
+    "rule_plan_id",
+    "indicator_id",
+    "indicator_type",
+    "params_json",
+    "timeframe",
+    "price_field",
+    "use_eod_only",
+)
+
+
+def _evaluate_workers() -> int:
+    return int(os.getenv("EVALUATE_WORKERS", "1"))
+
+
+def _evaluate_process_min_stocks() -> int:
+    return int(os.getenv("EVALUATE_PROCESS_MIN_STOCKS", "50"))
+
+
+@dataclass
+class BatchEvaluation:
+    decisions: dict[int, dict] = field(default_factory=dict)
+    changed: list[int] = field(default_factory=list)
+    unchanged: list[int] = field(default_factory=list)
+    failures: dict[int, str] = field(default_factory=dict)
+    evaluated: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "evaluated": self.evaluated,
+            "cached": len(self.decisions) - self.evaluated,
+            "changed": self.changed,
+            "failures": {str(stock_id): error for stock_id, error in self.failures.items()},
+        }
+
+
+def _evaluate_task(task: dict) -> dict:
+    result = rule_engine.evaluate_with_bars(
+        task["rule_plan"],
+        task["bars"],
+        task["indicators"],
+        task["position_state"],
+        current_price=task["current_price"],
+    )
+    return jobs.decision_payload(result)
+
+
+def _evaluate_detached(task: dict) -> dict:
+    bars = [models.DailyBar(**row) for row in task["bars"]]
+    indicators = [models.IndicatorDef(**row) for row in task["indicators"]]
+    return _evaluate_task({**task, "bars": bars, "indicators": indicators})
+
+
+def _detach(task: dict) -> dict:
+    indicators = [
+        {name: getattr(indicator, name) for name in INDICATOR_FIELDS} for indicator in task["indicators"]
+    ]
+    return {**task, "bars": jobs.bar_payload(task["bars"]), "indicators": indicators}
+
+
+def _active_plans(db: Session, stock_ids: list[int]) -> dict[int, models.RulePlan]:
+    plans = (
+        db.query(models.RulePlan)
+        .filter(models.RulePlan.stock_id.in_(stock_ids), models.RulePlan.is_active.is_(True))
+        .all()
+    )
+    return {plan.stock_id: plan for plan in plans}
+
+
+def _bar_stats(db: Session, stock_ids: list[int]) -> dict[int, tuple]:
+    rows = (
+        db.query(models.DailyBar.stock_id, *jobs.bar_stats_columns())
+        .filter(models.DailyBar.stock_id.in_(stock_ids))
+        .group_by(models.DailyBar.stock_id)
+        .all()
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def _indicator_defs(db: Session, plan_ids: list[int]) -> dict[int, list[models.IndicatorDef]]:
+    grouped: dict[int, list[models.IndicatorDef]] = {plan_id: [] for plan_id in plan_ids}
+    if not plan_ids:
+        return grouped
+    for indicator in (
+        db.query(models.IndicatorDef).filter(models.IndicatorDef.rule_plan_id.in_(plan_ids)).all()
+    ):
+        grouped[indicator.rule_plan_id].append(indicator)
+    return grouped
+
+
+def _recent_bars(db: Session, limits: dict[int, int | None]) -> dict[int, list[models.DailyBar]]:
+    grouped: dict[int, list[models.DailyBar]] = {stock_id: [] for stock_id in limits}
+    bar = models.DailyBar
+    unbounded = [stock_id for stock_id, limit in limits.items() if limit is None]
+    bounded = [stock_id for stock_id, limit in limits.items() if limit is not None]
+
+    queries = []
+    if unbounded:
+        queries.append(db.query(bar).filter(bar.stock_id.in_(unbounded)))
+    if bounded:
+        ranked = (
+            select(
+                bar.id,
+                func.row_number()
+                .over(partition_by=bar.stock_id, order_by=bar.bar_date.desc())
+                .label("position"),
+            )
+            .where(bar.stock_id.in_(bounded))
+            .subquery()
+        )
+        queries.append(
+            db.query(bar)
+            .join(ranked, ranked.c.id == bar.id)
+            .filter(ranked.c.position <= max(limits[stock_id] for stock_id in bounded))
+        )
+    for query in queries:
+        for row in query.order_by(bar.stock_id, bar.bar_date).all():
+            grouped[row.stock_id].append(row)
+
+    for stock_id in bounded:
+        grouped[stock_id] = grouped[stock_id][-limits[stock_id] :]
+    return grouped
+
+
+def _run_tasks(tasks: dict[int, dict], workers: int, batch: BatchEvaluation) -> dict[int, dict]:
+    payloads = {}
+    if workers > 1 and len(tasks) >= _evaluate_process_min_stocks():
+        stock_ids = list(tasks)
+        with ProcessPoolExecutor(workers) as pool:
+            futures = {
+                stock_id: pool.submit(_evaluate_detached, _detach(tasks[stock_id]))
+                for stock_id in stock_ids
+            }
+            for stock_id, future in futures.items():
+                try:
+                    payloads[stock_id] = future.result()
+                except Exception as exc:
+                    batch.failures[stock_id] = str(exc)
+        return payloads
+
+    for stock_id, task in tasks.items():
+        try:
+            payloads[stock_id] = _evaluate_task(task)
+        except Exception as exc:
+            batch.failures[stock_id] = str(exc)
+    return payloads
+
+
+def evaluate_all(
+    db: Session,
+    stocks: list[models.Stock] | None = None,
+    prices: dict[str, float] | None = None,
+    workers: int | None = None,
+) -> BatchEvaluation:
+    if stocks is None:
+        stocks = db.query(models.Stock).filter(models.Stock.status == "active").all()
+    prices = prices or {}
+    batch = BatchEvaluation()
+    if not stocks:
+        return batch
+
+    stock_ids = [stock.id for stock in stocks]
+    plans = _active_plans(db, stock_ids)
+    stats = _bar_stats(db, stock_ids)
+    states = {
+        state.stock_id: state
+        for state in db.query(models.DecisionState)
+        .filter(models.DecisionState.stock_id.in_(stock_ids))
+        .all()
+    }
+
+    audit_rows = []
+    pending: dict[int, tuple] = {}
+    for stock in stocks:
+        price = prices.get(stock.ticker)
+        if price is not None:
+            audit_rows.append(audit_row(stock.id, "INTRADAY_PRICE_FETCHED", {"price": price}))
+        plan = plans.get(stock.id)
+        if plan is None:
+            batch.failures[stock.id] = "No active rule plan"
+            continue
+        if stock.id not in stats:
+            batch.failures[stock.id] = "No daily bars available"
+            continue
+        fingerprint = jobs.fingerprint_from_stats(stats[stock.id], plan, stock.position_state, price)
+        state = states.get(stock.id)
+        if state is not None and state.input_fingerprint == fingerprint:
+            batch.decisions[stock.id] = json.loads(state.decision_json)
+            batch.unchanged.append(stock.id)
+            continue
+        pending[stock.id] = (stock, plan, fingerprint, price)
+
+    indicators = _indicator_defs(db, [plan.id for _, plan, _, _ in pending.values()])
+    tasks = {}
+    limits = {}
+    for stock_id, (stock, plan, _, price) in pending.items():
+        rule_plan = json.loads(plan.rules_json)
+        limits[stock_id] = rule_engine.plan_lookback(rule_plan, indicators[plan.id])
+        tasks[stock_id] = {
+            "rule_plan": rule_plan,
+            "indicators": indicators[plan.id],
+            "position_state": stock.position_state,
+            "current_price": price,
+        }
+    bars = _recent_bars(db, limits) if limits else {}
+    for stock_id, task in tasks.items():
+        task["bars"] = bars[stock_id]
+
+    payloads = _run_tasks(tasks, workers or _evaluate_workers(), batch)
+    inserts = []
+    updates = []
+    for stock_id, payload in payloads.items():
+        row = {
+            "stock_id": stock_id,
+            "state_key": payload["state_key"],
+            "decision_json": json.dumps(payload),
+            "input_fingerprint": pending[stock_id][2],
+        }
+        state = states.get(stock_id)
+        if state is None:
+            inserts.append(row)
+            changed = True
+        else:
+            updates.append({"id": state.id, **row})
+            changed = state.state_key != payload["state_key"]
+        audit_rows.append(audit_row(stock_id, "RULE_EVALUATED", payload))
+        batch.decisions[stock_id] = payload
+        batch.evaluated += 1
+        (batch.changed if changed else batch.unchanged).append(stock_id)
+
+    if inserts:
+        db.execute(insert(models.DecisionState), inserts)
+    if updates:
+        db.execute(update(models.DecisionState), updates)
+    if audit_rows:
+        db.execute(insert(models.AuditLog.__table__), audit_rows)
+    db.commit()
+    return batch
+
+
+def notify_changes(db: Session, stocks: list[models.Stock], batch: BatchEvaluation):
+    by_id = {stock.id: stock for stock in stocks}
+    for stock_id in batch.changed:
+        notifications.send_decision_change(db, by_id[stock_id], batch.decisions[stock_id])
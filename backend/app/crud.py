@@ -162,64 +162,80 @@ def serialize_rule_plan(plan: models.RulePlan) -> schemas.RulePlanOut:
     )
 
 
-def upsert_decision_state(db: Session, stock_id: int, state_key: str, decision_json: str) -> bool:
-    existing = (
-        db.query(models.DecisionState).filter(models.DecisionState.stock_id == stock_id).first()
-    )
+def get_decision_state(db: Session, stock_id: int) -> models.DecisionState | None:
+    return db.query(models.DecisionState).filter(models.DecisionState.stock_id == stock_id).first()
+
+
+def upsert_decision_state(
+    db: Session,
+    stock_id: int,
+    state_key: str,
+    decision_json: str,
+    input_fingerprint: str | None = None,
+) -> bool:
+    existing = get_decision_state(db, stock_id)
     if existing:
         changed = existing.state_key != state_key
         existing.state_key = state_key
         existing.decision_json = decision_json
+        existing.input_fingerprint = input_fingerprint
         return changed
 
     record = models.DecisionState(
         stock_id=stock_id,
         state_key=state_key,
         decision_json=decision_json,
+        input_fingerprint=input_fingerprint,
     )
     db.add(record)
     return True
 
 
-def sync_indicator_defs(db: Session, stock: models.Stock, plan: models.RulePlan):
-    rules = json.loads(plan.rules_json)
+def indicator_defs_from_plan(
+    rules: dict, stock_id: int = 0, rule_plan_id: int | None = None
+) -> list[models.IndicatorDef]:
     indicator_policy = rules.get("indicator_policy", {})
-    indicators = rules.get("indicators", [])
-
-    for indicator in indicators:
+    indicators = []
+    for indicator in rules.get("indicators", []):
         params = indicator.copy()
         indicator_id = params.pop("id", "")
         indicator_type = params.pop("type", "")
         if not indicator_id or not indicator_type:
             continue
+        indicators.append(
+            models.IndicatorDef(
+                stock_id=stock_id,
+                rule_plan_id=rule_plan_id,
+                indicator_id=indicator_id,
+                indicator_type=indicator_type,
+                params_json=json.dumps(params),
+                timeframe=indicator_policy.get("timeframe", "1D"),
+                price_field=indicator_policy.get("price_field", "close"),
+                use_eod_only=indicator_policy.get("use_eod_only", True),
+            )
+        )
+    return indicators
+
 
+def sync_indicator_defs(db: Session, stock: models.Stock, plan: models.RulePlan):
+    rules = json.loads(plan.rules_json)
+    for record in indicator_defs_from_plan(rules, stock.id, plan.id):
         existing = (
             db.query(models.IndicatorDef)
             .filter(
                 models.IndicatorDef.stock_id == stock.id,
                 models.IndicatorDef.rule_plan_id == plan.id,
-                models.IndicatorDef.indicator_id == indicator_id,
+                models.IndicatorDef.indicator_id == record.indicator_id,
             )
             .first()
         )
         if existing:
-            existing.indicator_type = indicator_type
-            existing.params_json = json.dumps(params)
-            existing.timeframe = indicator_policy.get("timeframe", "1D")
-            existing.price_field = indicator_policy.get("price_field", "close")
-            existing.use_eod_only = indicator_policy.get("use_eod_only", True)
+            existing.indicator_type = record.indicator_type
+            existing.params_json = record.params_json
+            existing.timeframe = record.timeframe
+            existing.price_field = record.price_field
+            existing.use_eod_only = record.use_eod_only
             continue
-
-        record = models.IndicatorDef(
-            stock_id=stock.id,
-            rule_plan_id=plan.id,
-            indicator_id=indicator_id,
-            indicator_type=indicator_type,
-            params_json=json.dumps(params),
-            timeframe=indicator_policy.get("timeframe", "1D"),
-            price_field=indicator_policy.get("price_field", "close"),
-            use_eod_only=indicator_policy.get("use_eod_only", True),
-        )
         db.add(record)
 
     db.commit()
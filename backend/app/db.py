@@ -1,12 +1,77 @@
-from sqlalchemy import create_engine, text
+import os
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./discipline_stock.db"
+from .config import load_env
+
+load_env()
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./discipline_stock.db")
+
+
+def _pool_size() -> int:
+    return int(os.getenv("DB_POOL_SIZE", "5"))
+
+
+def _max_overflow() -> int:
+    return int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+
+def _pool_timeout() -> float:
+    return float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def _pool_recycle() -> int:
+    return int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def sqlite_pragmas() -> dict[str, str]:
+    return {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "cache_size": str(-int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))),
+        "mmap_size": os.getenv("SQLITE_MMAP_SIZE", "268435456"),
+        "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+        "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    }
+
+
+def create_db_engine(url: str | None = None, pragmas: dict[str, str] | None = None) -> Engine:
+    url = url or DATABASE_URL
+    pool_kwargs = {
+        "pool_size": _pool_size(),
+        "max_overflow": _max_overflow(),
+        "pool_timeout": _pool_timeout(),
+        "pool_recycle": _pool_recycle(),
+    }
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_pre_ping=True, **pool_kwargs)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+    busy_timeout = int(pragmas.get("busy_timeout", 5000)) / 1000
+    if ":memory:" in url or url.rstrip("/") == "sqlite:":
+        pool_kwargs = {}
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": busy_timeout},
+        **pool_kwargs,
+    )
+
+    @event.listens_for(db_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return db_engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -20,11 +85,46 @@ def get_db():
         db.close()
 
 
-def ensure_stock_columns():
-    with engine.connect() as connection:
-        result = connection.execute(text("PRAGMA table_info(stocks)"))
-        existing = {row[1] for row in result}
-        if "avg_entry_price" not in existing:
-            connection.execute(text("ALTER TABLE stocks ADD COLUMN avg_entry_price REAL"))
-        if "position_qty" not in existing:
-            connection.execute(text("ALTER TABLE stocks ADD COLUMN position_qty INTEGER"))
+def _ensure_columns(bind: Engine, table_name: str, column_names: tuple[str, ...]):
+    from . import models
+
+    table = models.Base.metadata.tables[table_name]
+    existing = {column["name"] for column in inspect(bind).get_columns(table_name)}
+    missing = [name for name in column_names if name not in existing]
+    if not missing:
+        return
+    preparer = bind.dialect.identifier_preparer
+    with bind.begin() as connection:
+        for name in missing:
+            column_type = table.c[name].type.compile(dialect=bind.dialect)
+            connection.execute(
+                text(
+                    f"ALTER TABLE {preparer.quote(table_name)} "
+                    f"ADD COLUMN {preparer.quote(name)} {column_type}"
+                )
+            )
+
+
+def ensure_stock_columns(bind: Engine | None = None):
+    _ensure_columns(bind or engine, "stocks", ("avg_entry_price", "position_qty"))
+
+
+def ensure_decision_state_columns(bind: Engine | None = None):
+    _ensure_columns(bind or engine, "decision_states", ("input_fingerprint",))
+
+
+def ensure_audit_indexes(bind: Engine | None = None):
+    from .models import AuditLog
+
+    for index in AuditLog.__table__.indexes:
+        index.create(bind=bind or engine, checkfirst=True)
+
+
+def init_db(bind: Engine | None = None):
+    from . import models
+
+    bind = bind or engine
+    models.Base.metadata.create_all(bind=bind)
+    ensure_stock_columns(bind)
+    ensure_decision_state_columns(bind)
+    ensure_audit_indexes(bind)
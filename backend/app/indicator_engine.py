@@ -1,11 +1,28 @@
+import os
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Iterable
+from typing import Iterable, Sequence
 
 from sqlalchemy.orm import Session
 
 from . import models
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+NUMPY_MIN_BARS = 256
+_FILTER_MAX_BLOCK = 1024
+_WINDOW_BLOCK = 512
+_FILTER_MAX_SCALE = 1e150
+RECURSIVE_KINDS = frozenset({"EMA", "RSI"})
+
+
+def _warmup_periods() -> int:
+    return int(os.getenv("LOOKBACK_WARMUP_PERIODS", "20"))
+
 
 @dataclass
 class IndicatorResult:
@@ -15,7 +32,7 @@ class IndicatorResult:
     lookback_used: int
 
 
-def compute_sma(values: list[float], period: int) -> list[float | None]:
+def _compute_sma_python(values: Sequence[float], period: int) -> list[float | None]:
     if period <= 0:
         return [None] * len(values)
     sma = []
@@ -31,7 +48,7 @@ def compute_sma(values: list[float], period: int) -> list[float | None]:
     return sma
 
 
-def compute_ema(values: list[float], period: int) -> list[float | None]:
+def _compute_ema_python(values: Sequence[float], period: int) -> list[float | None]:
     if period <= 0:
         return [None] * len(values)
     ema: list[float | None] = [None] * len(values)
@@ -49,7 +66,7 @@ def compute_ema(values: list[float], period: int) -> list[float | None]:
     return ema
 
 
-def compute_rsi(values: list[float], period: int) -> list[float | None]:
+def _compute_rsi_python(values: Sequence[float], period: int) -> list[float | None]:
     if period <= 0:
         return [None] * len(values)
     rsi: list[float | None] = [None] * len(values)
@@ -87,7 +104,9 @@ def compute_rsi(values: list[float], period: int) -> list[float | None]:
     return rsi
 
 
-def compute_vwap(prices: list[float], volumes: list[int], period: int) -> list[float | None]:
+def _compute_vwap_python(
+    prices: Sequence[float], volumes: Sequence[int], period: int
+) -> list[float | None]:
     if period <= 0:
         return [None] * len(prices)
     if len(prices) != len(volumes):
@@ -109,12 +128,161 @@ def compute_vwap(prices: list[float], volumes: list[int], period: int) -> list[f
     return vwap
 
 
+def _use_numpy(length: int) -> bool:
+    return NUMPY_AVAILABLE and length >= NUMPY_MIN_BARS
+
+
+def compute_sma(values: Sequence[float], period: int) -> list[float | None]:
+    if period > 0 and _use_numpy(len(values)):
+        return _compute_sma_numpy(values, period)
+    return _compute_sma_python(values, period)
+
+
+def compute_ema(values: Sequence[float], period: int) -> list[float | None]:
+    if period > 0 and _use_numpy(len(values)):
+        return _compute_ema_numpy(values, period)
+    return _compute_ema_python(values, period)
+
+
+def compute_rsi(values: Sequence[float], period: int) -> list[float | None]:
+    if period > 0 and _use_numpy(len(values)):
+        return _compute_rsi_numpy(values, period)
+    return _compute_rsi_python(values, period)
+
+
+def compute_vwap(prices: Sequence[float], volumes: Sequence[int], period: int) -> list[float | None]:
+    if len(prices) != len(volumes):
+        raise ValueError("Prices and volumes length mismatch")
+    if period > 0 and _use_numpy(len(prices)):
+        return _compute_vwap_numpy(prices, volumes, period)
+    return _compute_vwap_python(prices, volumes, period)
+
+
+def _to_optional_list(values, first_valid: int) -> list[float | None]:
+    result = values.tolist()
+    first_valid = min(first_valid, len(result))
+    result[:first_valid] = [None] * first_valid
+    return result
+
+
+def _linear_filter(values, alpha: float, initial: float):
+    # Solves y[k] = (1 - alpha) * y[k - 1] + alpha * x[k] block by block in closed form.
+    decay = 1.0 - alpha
+    out = np.empty(len(values), dtype=float)
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    block = int(min(_FILTER_MAX_BLOCK, np.log(_FILTER_MAX_SCALE) / -np.log(decay)))
+    block = max(block, 1)
+    steps = np.arange(1, block + 1, dtype=float)
+    block_powers = decay ** steps
+    previous = initial
+    for start in range(0, len(values), block):
+        chunk = values[start : start + block]
+        powers = block_powers[: len(chunk)]
+        filtered = powers * (previous + alpha * np.cumsum(chunk / powers))
+        out[start : start + len(chunk)] = filtered
+        previous = filtered[-1]
+    return out
+
+
+def _window_sums(data, period: int):
+    # Rolling sums from block-local prefix sums: a window spans at most two
+    # blocks, so rounding error stays bounded by the block, not the history.
+    block = max(period, _WINDOW_BLOCK)
+    padded = np.zeros(-(-len(data) // block) * block, dtype=float)
+    padded[: len(data)] = data
+    local = np.cumsum(padded.reshape(-1, block), axis=1)
+    flat = local.ravel()
+    totals = local[:, -1]
+
+    ends = np.arange(period - 1, len(data))
+    starts = ends - period
+    valid = starts >= 0
+    safe_starts = np.maximum(starts, 0)
+    start_blocks = safe_starts // block
+    carry = np.where(valid & (start_blocks < ends // block), totals[start_blocks], 0.0)
+    return flat[ends] + carry - np.where(valid, flat[safe_starts], 0.0)
+
+
+def _compute_sma_numpy(values: Sequence[float], period: int) -> list[float | None]:
+    data = np.asarray(values, dtype=float)
+    sma = np.empty(len(data), dtype=float)
+    if len(data) >= period:
+        sma[period - 1 :] = _window_sums(data, period) / period
+    return _to_optional_list(sma, period - 1)
+
+
+def _compute_ema_numpy(values: Sequence[float], period: int) -> list[float | None]:
+    data = np.asarray(values, dtype=float)
+    if len(data) < period:
+        return [None] * len(data)
+    ema = np.empty(len(data), dtype=float)
+    ema[period - 1] = data[:period].sum() / period
+    ema[period:] = _linear_filter(data[period:], 2 / (period + 1), ema[period - 1])
+    return _to_optional_list(ema, period - 1)
+
+
+def _compute_rsi_numpy(values: Sequence[float], period: int) -> list[float | None]:
+    data = np.asarray(values, dtype=float)
+    if len(data) <= period:
+        return [None] * len(data)
+    changes = np.diff(data)
+    gains = np.maximum(changes, 0.0)
+    losses = np.abs(np.minimum(changes, 0.0))
+
+    avg_gain = np.empty(len(data), dtype=float)
+    avg_loss = np.empty(len(data), dtype=float)
+    avg_gain[period] = gains[:period].sum() / period
+    avg_loss[period] = losses[:period].sum() / period
+    avg_gain[period + 1 :] = _linear_filter(gains[period:], 1 / period, avg_gain[period])
+    avg_loss[period + 1 :] = _linear_filter(losses[period:], 1 / period, avg_loss[period])
+
+    gain_tail = avg_gain[period:]
+    loss_tail = avg_loss[period:]
+    ratio = np.divide(gain_tail, loss_tail, out=np.zeros_like(gain_tail), where=loss_tail != 0)
+    rsi = np.empty(len(data), dtype=float)
+    rsi[period:] = np.where(loss_tail == 0, 100.0, 100 - (100 / (1 + ratio)))
+    return _to_optional_list(rsi, period)
+
+
+def _compute_vwap_numpy(
+    prices: Sequence[float], volumes: Sequence[int], period: int
+) -> list[float | None]:
+    price_data = np.asarray(prices, dtype=float)
+    volume_data = np.asarray(volumes, dtype=np.int64)
+    if len(price_data) < period:
+        return [None] * len(price_data)
+    window_weighted = _window_sums(price_data * volume_data, period)
+    total_volume = np.cumsum(np.concatenate(([0], volume_data)))
+    window_volume = total_volume[period:] - total_volume[:-period]
+
+    vwap = np.empty(len(price_data), dtype=float)
+    vwap[period - 1 :] = np.divide(
+        window_weighted,
+        window_volume,
+        out=np.full(len(window_weighted), np.nan),
+        where=window_volume != 0,
+    )
+    result = _to_optional_list(vwap, period - 1)
+    return [None if value != value else value for value in result]
+
+
 def compute_indicator_series(indicator: models.IndicatorDef, bars: list[models.DailyBar]):
     if indicator.price_field == "adjusted_close":
         closes = [bar.adjusted_close or bar.close for bar in bars]
     else:
         closes = [bar.close for bar in bars]
     volumes = [bar.volume for bar in bars]
+    return compute_indicator_values(indicator, closes, volumes)
+
+
+def compute_indicator_values(
+    indicator: models.IndicatorDef,
+    closes: Sequence[float],
+    volumes: Sequence[int],
+):
     params = json_loads(indicator.params_json)
     period = int(params.get("period", 0))
 
@@ -133,10 +301,122 @@ def compute_indicator_series(indicator: models.IndicatorDef, bars: list[models.D
     raise ValueError(f"Unsupported indicator type: {indicator.indicator_type}")
 
 
+def indicator_kind(indicator: models.IndicatorDef) -> str:
+    if indicator.indicator_type == "MA":
+        params = json_loads(indicator.params_json)
+        return "EMA" if params.get("ma_type", "SMA") == "EMA" else "SMA"
+    if indicator.indicator_type in {"RSI", "VWAP"}:
+        return indicator.indicator_type
+    raise ValueError(f"Unsupported indicator type: {indicator.indicator_type}")
+
+
+def indicator_lookback(kind: str, period: int) -> int:
+    if period <= 0:
+        return 0
+    if kind in RECURSIVE_KINDS:
+        return period * _warmup_periods() + 1
+    return period
+
+
+def indicator_def_lookback(indicator: models.IndicatorDef) -> int:
+    params = json_loads(indicator.params_json)
+    return indicator_lookback(indicator_kind(indicator), int(params.get("period", 0)))
+
+
+def indicator_state_key(indicator: models.IndicatorDef) -> str:
+    import json
+
+    return json.dumps(
+        {
+            "type": indicator.indicator_type,
+            "params": json_loads(indicator.params_json),
+            "price_field": indicator.price_field,
+            "timeframe": indicator.timeframe,
+        },
+        sort_keys=True,
+    )
+
+
+def new_indicator_state() -> dict:
+    return {"count": 0, "value": None}
+
+
+def advance_indicator_state(
+    kind: str, period: int, state: dict, price: float, volume: int
+) -> float | None:
+    # Applies one bar with the same arithmetic as the full-series functions.
+    index = state["count"]
+    state["count"] = index + 1
+    if period <= 0:
+        state["value"] = None
+        return None
+
+    if kind == "SMA":
+        window = state.setdefault("window", [])
+        window_sum = state.get("sum", 0.0) + price
+        if index >= period:
+            window_sum -= window.pop(0)
+        window.append(price)
+        state["sum"] = window_sum
+        value = window_sum / period if index + 1 >= period else None
+
+    elif kind == "EMA":
+        if index < period:
+            state["seed_sum"] = state.get("seed_sum", 0) + price
+            value = state["seed_sum"] / period if index + 1 == period else None
+        else:
+            previous = state["value"]
+            value = (price - previous) * (2 / (period + 1)) + previous
+
+    elif kind == "RSI":
+        value = None
+        if index > 0:
+            change = price - state["prev"]
+            gain = max(change, 0)
+            loss = abs(min(change, 0))
+            if index <= period:
+                state["gain_sum"] = state.get("gain_sum", 0) + gain
+                state["loss_sum"] = state.get("loss_sum", 0) + loss
+                if index == period:
+                    state["avg_gain"] = state["gain_sum"] / period
+                    state["avg_loss"] = state["loss_sum"] / period
+            else:
+                state["avg_gain"] = (state["avg_gain"] * (period - 1) + gain) / period
+                state["avg_loss"] = (state["avg_loss"] * (period - 1) + loss) / period
+            if index >= period:
+                if state["avg_loss"] == 0:
+                    value = 100.0
+                else:
+                    value = 100 - (100 / (1 + state["avg_gain"] / state["avg_loss"]))
+        state["prev"] = price
+
+    elif kind == "VWAP":
+        window = state.setdefault("window", [])
+        weighted = state.get("weighted", 0.0) + price * volume
+        total_volume = state.get("volume", 0) + volume
+        window.append([price, volume])
+        if len(window) > period:
+            old_price, old_volume = window.pop(0)
+            weighted -= old_price * old_volume
+            total_volume -= old_volume
+        state["weighted"] = weighted
+        state["volume"] = total_volume
+        if index + 1 < period or total_volume == 0:
+            value = None
+        else:
+            value = weighted / total_volume
+
+    else:
+        raise ValueError(f"Unsupported indicator kind: {kind}")
+
+    state["value"] = value
+    return value
+
+
 def upsert_indicator_value(
     db: Session,
     indicator: models.IndicatorDef,
-    bar: models.DailyBar,
+    as_of_date: date,
     value: float | None,
     status: str,
     lookback: int,
@@ -147,7 +427,7 @@ def upsert_indicator_value(
         .filter(
             models.IndicatorValue.stock_id == indicator.stock_id,
             models.IndicatorValue.indicator_id == indicator.indicator_id,
-            models.IndicatorValue.as_of_date == bar.bar_date,
+            models.IndicatorValue.as_of_date == as_of_date,
         )
         .first()
     )
@@ -162,7 +442,7 @@ def upsert_indicator_value(
     record = models.IndicatorValue(
         stock_id=indicator.stock_id,
         indicator_id=indicator.indicator_id,
-        as_of_date=bar.bar_date,
+        as_of_date=as_of_date,
         value=value,
         status=status,
         lookback_used=lookback,
@@ -173,15 +453,44 @@ def upsert_indicator_value(
     return record
 
 
-def compute_indicators_for_stock(db: Session, stock_id: int, source: str = "local"):
-    bars = (
+def invalidate_indicator_states(db: Session, stock_id: int, since: date):
+    (
+        db.query(models.IndicatorState)
+        .filter(
+            models.IndicatorState.stock_id == stock_id,
+            models.IndicatorState.as_of_date >= since,
+        )
+        .delete(synchronize_session=False)
+    )
+
+
+def _bar_price(bar: models.DailyBar, price_field: str) -> float:
+    if price_field == "adjusted_close":
+        return bar.adjusted_close or bar.close
+    return bar.close
+
+
+@dataclass
+class IndicatorWork:
+    stock_id: int
+    latest_date: date
+    items: list[dict]
+    summary: dict
+
+    @property
+    def bars_to_replay(self) -> int:
+        return sum(len(item["prices"]) for item in self.items)
+
+
+def prepare_indicator_work(db: Session, stock_id: int) -> IndicatorWork | None:
+    latest_bar = (
         db.query(models.DailyBar)
         .filter(models.DailyBar.stock_id == stock_id)
-        .order_by(models.DailyBar.bar_date)
-        .all()
+        .order_by(models.DailyBar.bar_date.desc())
+        .first()
     )
-    if not bars:
-        return
+    if not latest_bar:
+        return None
 
     indicators = (
         db.query(models.IndicatorDef)
@@ -189,16 +498,141 @@ def compute_indicators_for_stock(db: Session, stock_id: int, source: str = "loca
         .all()
     )
     if not indicators:
-        return
-
-    latest_bar = bars[-1]
+        return None
 
+    states = {
+        record.params_key: record
+        for record in db.query(models.IndicatorState)
+        .filter(models.IndicatorState.stock_id == stock_id)
+        .all()
+    }
+    bars_after: dict[date, list[models.DailyBar]] = {}
+    bar_counts: dict[date, int] = {}
+
+    def load_bars_after(as_of: date):
+        if as_of not in bars_after:
+            bars_after[as_of] = (
+                db.query(models.DailyBar)
+                .filter(models.DailyBar.stock_id == stock_id, models.DailyBar.bar_date > as_of)
+                .order_by(models.DailyBar.bar_date)
+                .all()
+            )
+        return bars_after[as_of]
+
+    def count_bars_through(as_of: date):
+        if as_of not in bar_counts:
+            bar_counts[as_of] = (
+                db.query(models.DailyBar)
+                .filter(
+                    models.DailyBar.stock_id == stock_id,
+                    models.DailyBar.bar_date <= as_of,
+                )
+                .count()
+            )
+        return bar_counts[as_of]
+
+    plans = []
     for indicator in indicators:
-        series = compute_indicator_series(indicator, bars)
-        value = series[-1]
+        key = indicator_state_key(indicator)
+        record = states.get(key)
+        resumable = (
+            record is not None
+            and record.as_of_date <= latest_bar.bar_date
+            and record.bar_count == count_bars_through(record.as_of_date)
+        )
+        plans.append((indicator, key, record if resumable else None))
+
+    recent_bars: list[models.DailyBar] = []
+    recompute_lookbacks = [
+        indicator_def_lookback(indicator) for indicator, _, record in plans if record is None
+    ]
+    if recompute_lookbacks:
+        recent_bars = (
+            db.query(models.DailyBar)
+            .filter(models.DailyBar.stock_id == stock_id)
+            .order_by(models.DailyBar.bar_date.desc())
+            .limit(max(max(recompute_lookbacks), 1))
+            .all()
+        )
+        recent_bars.reverse()
+
+    summary = {"incremental": 0, "recomputed": 0}
+    items = []
+    for indicator, key, record in plans:
         params = json_loads(indicator.params_json)
-        lookback = int(params.get("period", 0))
+        skipped = 0
+        if record is not None:
+            state = json_loads(record.state_json)
+            new_bars = load_bars_after(record.as_of_date)
+            summary["incremental"] += 1
+        else:
+            state = new_indicator_state()
+            lookback = max(indicator_def_lookback(indicator), 1)
+            new_bars = recent_bars[-lookback:]
+            skipped = count_bars_through(latest_bar.bar_date) - len(new_bars)
+            summary["recomputed"] += 1
+
+        items.append(
+            {
+                "indicator_id": indicator.indicator_id,
+                "key": key,
+                "kind": indicator_kind(indicator),
+                "lookback": int(params.get("period", 0)),
+                "state": state,
+                "skipped": skipped,
+                "prices": [_bar_price(bar, indicator.price_field) for bar in new_bars],
+                "volumes": [bar.volume for bar in new_bars],
+            }
+        )
+
+    return IndicatorWork(
+        stock_id=stock_id,
+        latest_date=latest_bar.bar_date,
+        items=items,
+        summary=summary,
+    )
+
+
+def replay_indicator_items(items: list[dict]) -> list[dict]:
+    states = []
+    for item in items:
+        state = item["state"]
+        for price, volume in zip(item["prices"], item["volumes"]):
+            advance_indicator_state(item["kind"], item["lookback"], state, price, volume)
+        state["count"] += item.get("skipped", 0)
+        states.append(state)
+    return states
 
+
+def apply_indicator_work(
+    db: Session, work: IndicatorWork, states: list[dict], source: str = "local"
+):
+    records = {
+        record.params_key: record
+        for record in db.query(models.IndicatorState)
+        .filter(models.IndicatorState.stock_id == work.stock_id)
+        .all()
+    }
+    indicators = {
+        indicator.indicator_id: indicator
+        for indicator in db.query(models.IndicatorDef)
+        .filter(models.IndicatorDef.stock_id == work.stock_id)
+        .all()
+    }
+
+    for item, state in zip(work.items, states):
+        key = item["key"]
+        record = records.get(key)
+        if record is None:
+            record = models.IndicatorState(stock_id=work.stock_id, params_key=key)
+            db.add(record)
+            records[key] = record
+        record.as_of_date = work.latest_date
+        record.bar_count = state["count"]
+        record.state_json = json_dumps(state)
+        record.updated_at = datetime.utcnow()
+
+        value = state["value"]
         if value is None:
             status = "INSUFFICIENT_HISTORY"
         else:
@@ -206,18 +640,32 @@ def compute_indicators_for_stock(db: Session, stock_id: int, source: str = "loca
 
         upsert_indicator_value(
             db=db,
-            indicator=indicator,
-            bar=latest_bar,
+            indicator=indicators[item["indicator_id"]],
+            as_of_date=work.latest_date,
             value=value,
             status=status,
-            lookback=lookback,
+            lookback=item["lookback"],
             source=source,
         )
+    return work.summary
+
 
+def compute_indicators_for_stock(db: Session, stock_id: int, source: str = "local"):
+    work = prepare_indicator_work(db, stock_id)
+    if work is None:
+        return {"incremental": 0, "recomputed": 0}
+    summary = apply_indicator_work(db, work, replay_indicator_items(work.items), source)
     db.commit()
+    return summary
 
 
 def json_loads(payload: str) -> dict:
     import json
 
     return json.loads(payload)
+
+
+def json_dumps(payload: dict) -> str:
+    import json
+
+    return json.dumps(payload)
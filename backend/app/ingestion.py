@@ -1,58 +1,116 @@
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import date
 
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from . import models
+from . import indicator_engine, models
+from .audit_writer import get_audit_writer
 
 
-def upsert_daily_bars(db: Session, stock_id: int, bars: list[dict], source: str):
-    for bar in bars:
-        existing = (
-            db.query(models.DailyBar)
-            .filter(
-                models.DailyBar.stock_id == stock_id,
-                models.DailyBar.bar_date == bar["bar_date"],
+BAR_FIELDS = ("open", "high", "low", "close", "adjusted_close", "volume")
+BULK_UPSERT_ROWS = 500
+
+
+@dataclass
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return {"inserted": self.inserted, "updated": self.updated, "unchanged": self.unchanged}
+
+
+def _dialect_insert(db: Session, table):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql_insert(table)
+    return sqlite_insert(table)
+
+
+def upsert_daily_bars(db: Session, stock_id: int, bars: list[dict], source: str) -> UpsertResult:
+    return upsert_daily_bars_by_stock(db, {stock_id: bars}, source)[stock_id]
+
+
+def upsert_daily_bars_bulk(
+    db: Session, bars_by_stock: dict[int, list[dict]], source: str
+) -> UpsertResult:
+    total = UpsertResult()
+    for result in upsert_daily_bars_by_stock(db, bars_by_stock, source).values():
+        total.inserted += result.inserted
+        total.updated += result.updated
+        total.unchanged += result.unchanged
+    return total
+
+
+def upsert_daily_bars_by_stock(
+    db: Session, bars_by_stock: dict[int, list[dict]], source: str
+) -> dict[int, UpsertResult]:
+    results = {stock_id: UpsertResult() for stock_id in bars_by_stock}
+    rows: dict[tuple[int, date], dict] = {}
+    for stock_id, bars in bars_by_stock.items():
+        for bar in bars:
+            rows[(stock_id, bar["bar_date"])] = {
+                "stock_id": stock_id,
+                "bar_date": bar["bar_date"],
+                "open": bar["open"],
+                "high": bar["high"],
+                "low": bar["low"],
+                "close": bar["close"],
+                "adjusted_close": bar.get("adjusted_close"),
+                "volume": bar["volume"],
+                "source": source,
+            }
+    if not rows:
+        return results
+
+    table = models.DailyBar.__table__
+    dates = [bar_date for _, bar_date in rows]
+    existing = {
+        (row.stock_id, row.bar_date)
+        for row in db.execute(
+            select(table.c.stock_id, table.c.bar_date).where(
+                table.c.stock_id.in_(list(bars_by_stock)),
+                table.c.bar_date >= min(dates),
+                table.c.bar_date <= max(dates),
             )
-            .first()
         )
-        if existing:
-            existing.open = bar["open"]
-            existing.high = bar["high"]
-            existing.low = bar["low"]
-            existing.close = bar["close"]
-            existing.adjusted_close = bar.get("adjusted_close")
-            existing.volume = bar["volume"]
-            existing.source = source
-            continue
-
-        record = models.DailyBar(
-            stock_id=stock_id,
-            bar_date=bar["bar_date"],
-            open=bar["open"],
-            high=bar["high"],
-            low=bar["low"],
-            close=bar["close"],
-            adjusted_close=bar.get("adjusted_close"),
-            volume=bar["volume"],
-            source=source,
-        )
-        db.add(record)
+    }
 
-    db.commit()
+    statement = _dialect_insert(db, table)
+    excluded = statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.stock_id, table.c.bar_date],
+        set_={field: excluded[field] for field in (*BAR_FIELDS, "source")},
+        where=or_(*(table.c[field].is_distinct_from(excluded[field]) for field in BAR_FIELDS)),
+    ).returning(table.c.stock_id, table.c.bar_date)
 
+    written: set[tuple[int, date]] = set()
+    values = list(rows.values())
+    for start in range(0, len(values), BULK_UPSERT_ROWS):
+        result = db.execute(statement, values[start : start + BULK_UPSERT_ROWS])
+        written.update((row.stock_id, row.bar_date) for row in result)
 
-def record_audit(db: Session, stock_id: int | None, event_type: str, payload: dict):
-    record = models.AuditLog(
-        timestamp=datetime.utcnow(),
-        stock_id=stock_id,
-        event_type=event_type,
-        payload_json=json_dumps(payload),
-    )
-    db.add(record)
+    first_touched: dict[int, date] = {}
+    for stock_id, bar_date in written:
+        if stock_id not in first_touched or bar_date < first_touched[stock_id]:
+            first_touched[stock_id] = bar_date
+    for stock_id, since in first_touched.items():
+        indicator_engine.invalidate_indicator_states(db, stock_id, since=since)
     db.commit()
 
+    for key in rows:
+        result = results[key[0]]
+        if key not in written:
+            result.unchanged += 1
+        elif key in existing:
+            result.updated += 1
+        else:
+            result.inserted += 1
+    return results
 
-def json_dumps(payload: dict) -> str:
-    import json
 
-    return json.dumps(payload)
+def record_audit(db: Session, stock_id: int | None, event_type: str, payload: dict):
+    get_audit_writer().record(db.get_bind(), stock_id, event_type, payload)
@@ -1,14 +1,24 @@
+import hashlib
 import json
+import os
+from datetime import date, timedelta
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from . import crud, indicator_engine, ingestion, models, notifications, rule_engine
-from .market_data import TwelveDataClient
+from .market_data import MAX_OUTPUTSIZE, TwelveDataClient
 
 
-def ingest_daily_bars(db: Session, stock: models.Stock, client: TwelveDataClient):
-    bars = client.fetch_daily_bars(stock.ticker)
-    payload = [
+FINGERPRINT_VERSION = 1
+
+
+def _overlap_days() -> int:
+    return int(os.getenv("DAILY_BARS_OVERLAP_DAYS", "5"))
+
+
+def bar_payload(bars) -> list[dict]:
+    return [
         {
             "bar_date": bar.bar_date,
             "open": bar.open,
@@ -20,25 +30,177 @@ def ingest_daily_bars(db: Session, stock: models.Stock, client: TwelveDataClient
         }
         for bar in bars
     ]
-    ingestion.upsert_daily_bars(db, stock.id, payload, source="alphavantage")
+
+
+def _stored_bar_range(db: Session, stock_id: int):
+    return (
+        db.query(func.min(models.DailyBar.bar_date), func.max(models.DailyBar.bar_date))
+        .filter(models.DailyBar.stock_id == stock_id)
+        .one()
+    )
+
+
+def daily_fetch_window(latest: date | None, as_of: date) -> dict | None:
+    if latest is not None and latest >= as_of:
+        return None
+    if latest is None:
+        return {}
+    start_date = latest - timedelta(days=_overlap_days())
+    return {"start_date": start_date, "outputsize": (as_of - start_date).days + 1}
+
+
+def record_up_to_date(db: Session, stock: models.Stock, latest: date):
     ingestion.record_audit(
         db,
         stock.id,
         "DAILY_BARS_INGESTED",
-        {"count": len(payload)},
+        {"count": 0, "skipped": "up_to_date", "latest": latest.isoformat()},
+    )
+
+
+def record_ingested(
+    db: Session,
+    stock: models.Stock,
+    window: dict,
+    count: int,
+    result: ingestion.UpsertResult | None = None,
+):
+    audit = {"count": count, **(result.as_dict() if result else {})}
+    if window.get("start_date"):
+        audit["start_date"] = window["start_date"].isoformat()
+    ingestion.record_audit(db, stock.id, "DAILY_BARS_INGESTED", audit)
+
+
+def ingest_daily_bars(
+    db: Session,
+    stock: models.Stock,
+    client: TwelveDataClient,
+    as_of: date | None = None,
+):
+    as_of = as_of or date.today()
+    _, latest = _stored_bar_range(db, stock.id)
+    window = daily_fetch_window(latest, as_of)
+    if window is None:
+        record_up_to_date(db, stock, latest)
+        return ingestion.UpsertResult()
+
+    bars = client.fetch_daily_bars(stock.ticker, **window)
+    payload = bar_payload(bars)
+    result = ingestion.upsert_daily_bars(db, stock.id, payload, source="alphavantage")
+    record_ingested(db, stock, window, len(payload), result)
+    return result
+
+
+def backfill_daily_bars(
+    db: Session,
+    stock: models.Stock,
+    client: TwelveDataClient,
+    start_date: date | None = None,
+    page_size: int = MAX_OUTPUTSIZE,
+    max_pages: int = 20,
+):
+    earliest, _ = _stored_bar_range(db, stock.id)
+    end_date = earliest - timedelta(days=1) if earliest else date.today()
+    total = ingestion.UpsertResult()
+    pages = 0
+
+    while pages < max_pages and (start_date is None or end_date >= start_date):
+        bars = client.fetch_daily_bars(
+            stock.ticker,
+            start_date=start_date,
+            end_date=end_date,
+            outputsize=page_size,
+        )
+        pages += 1
+        if not bars:
+            break
+        result = ingestion.upsert_daily_bars(db, stock.id, bar_payload(bars), source="alphavantage")
+        total.inserted += result.inserted
+        total.updated += result.updated
+        total.unchanged += result.unchanged
+        if len(bars) < page_size:
+            break
+        end_date = bars[0].bar_date - timedelta(days=1)
+
+    ingestion.record_audit(
+        db,
+        stock.id,
+        "DAILY_BARS_BACKFILLED",
+        {"pages": pages, "end_date": end_date.isoformat(), **total.as_dict()},
     )
+    return total
 
 
 def update_indicators(db: Session, stock: models.Stock):
-    indicator_engine.compute_indicators_for_stock(db, stock.id, source="computed")
+    summary = indicator_engine.compute_indicators_for_stock(db, stock.id, source="computed")
     ingestion.record_audit(
         db,
         stock.id,
         "INDICATORS_COMPUTED",
-        {"stock_id": stock.id},
+        {"stock_id": stock.id, **summary},
     )
 
 
+def load_recent_bars(db: Session, stock_id: int, limit: int | None) -> list[models.DailyBar]:
+    query = db.query(models.DailyBar).filter(models.DailyBar.stock_id == stock_id)
+    if limit is None:
+        return query.order_by(models.DailyBar.bar_date).all()
+    bars = query.order_by(models.DailyBar.bar_date.desc()).limit(limit).all()
+    bars.reverse()
+    return bars
+
+
+def bar_stats_columns():
+    bar = models.DailyBar
+    return (
+        func.count(bar.id),
+        func.max(bar.bar_date),
+        func.sum(bar.open + bar.high + bar.low + bar.close + func.coalesce(bar.adjusted_close, 0)),
+        func.sum(bar.volume),
+    )
+
+
+def fingerprint_from_stats(
+    stats: tuple,
+    plan: models.RulePlan,
+    position_state: str,
+    current_price: float | None,
+) -> str:
+    count, last_date, price_sum, volume_sum = stats
+    payload = [
+        FINGERPRINT_VERSION,
+        plan.id,
+        plan.version,
+        count,
+        last_date.isoformat() if last_date else None,
+        price_sum,
+        volume_sum,
+        current_price,
+        position_state,
+    ]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def evaluation_fingerprint(
+    db: Session,
+    stock_id: int,
+    plan: models.RulePlan,
+    position_state: str,
+    current_price: float | None,
+) -> str:
+    stats = db.query(*bar_stats_columns()).filter(models.DailyBar.stock_id == stock_id).one()
+    return fingerprint_from_stats(tuple(stats), plan, position_state, current_price)
+
+
+def decision_payload(result: rule_engine.EvaluationResult) -> dict:
+    return {
+        "decision": result.decision,
+        "action": result.action,
+        "state_key": result.state_key,
+        "reasons": result.reasons,
+    }
+
+
 def evaluate_rules(
     db: Session,
     stock: models.Stock,
@@ -49,22 +211,22 @@ def evaluate_rules(
     if not plan:
         raise ValueError("No active rule plan")
 
-    bars = (
-        db.query(models.DailyBar)
-        .filter(models.DailyBar.stock_id == stock.id)
-        .order_by(models.DailyBar.bar_date)
-        .all()
-    )
-    if not bars:
-        raise ValueError("No daily bars available")
+    fingerprint = evaluation_fingerprint(db, stock.id, plan, position_state, current_price)
+    state = crud.get_decision_state(db, stock.id)
+    if state is not None and state.input_fingerprint == fingerprint:
+        return json.loads(state.decision_json), False
 
     indicators = (
         db.query(models.IndicatorDef)
         .filter(models.IndicatorDef.stock_id == stock.id, models.IndicatorDef.rule_plan_id == plan.id)
         .all()
     )
-
     rule_plan = json.loads(plan.rules_json)
+
+    bars = load_recent_bars(db, stock.id, rule_engine.plan_lookback(rule_plan, indicators))
+    if not bars:
+        raise ValueError("No daily bars available")
+
     result = rule_engine.evaluate_with_bars(
         rule_plan,
         bars,
@@ -73,14 +235,9 @@ def evaluate_rules(
         current_price=current_price,
     )
 
-    decision_payload = {
-        "decision": result.decision,
-        "action": result.action,
-        "state_key": result.state_key,
-        "reasons": result.reasons,
-    }
+    payload = decision_payload(result)
     changed = crud.upsert_decision_state(
-        db, stock.id, result.state_key, json.dumps(decision_payload)
+        db, stock.id, result.state_key, json.dumps(payload), fingerprint
     )
     db.commit()
 
@@ -88,17 +245,24 @@ def evaluate_rules(
         db,
         stock.id,
         "RULE_EVALUATED",
-        decision_payload,
+        payload,
     )
 
     if changed:
-        notifications.send_decision_change(db, stock, decision_payload)
+        notifications.send_decision_change(db, stock, payload)
 
-    return decision_payload, changed
+    return payload, changed
 
 
-def market_monitor(db: Session, stock: models.Stock, client: TwelveDataClient, position_state: str):
-    price = client.fetch_intraday_price(stock.ticker)
+def market_monitor(
+    db: Session,
+    stock: models.Stock,
+    client: TwelveDataClient,
+    position_state: str,
+    price: float | None = None,
+):
+    if price is None:
+        price = client.fetch_intraday_price(stock.ticker)
     ingestion.record_audit(
         db,
         stock.id,
@@ -1,17 +1,45 @@
+from contextlib import asynccontextmanager
+from datetime import date
+
 from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, status
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from . import crud, jobs, models, schemas, validation
-from .market_data import TwelveDataClient, get_cached_price, set_cached_price
+from . import (
+    audit_maintenance,
+    backtest,
+    batch_evaluation,
+    crud,
+    jobs,
+    models,
+    rule_context,
+    rule_engine,
+    schemas,
+    validation,
+)
+from .market_data import (
+    TwelveDataClient,
+    fetch_intraday_prices_concurrently,
+    lookup_cached_price,
+    price_flight_stats,
+)
+from .price_cache import FRESH, STALE, get_price_cache
+from .rate_limit import PRIORITY_LOW, get_rate_limiter
+from .audit_writer import get_audit_writer
 from .config import load_env
-from .db import Base, engine, get_db, ensure_stock_columns
+from .db import get_db, init_db
 
 load_env()
-Base.metadata.create_all(bind=engine)
-ensure_stock_columns()
 
-app = FastAPI(title="Discipline Stock Monitoring API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    yield
+    get_audit_writer().close()
+
+
+app = FastAPI(title="Discipline Stock Monitoring API", lifespan=lifespan)
 
 
 @app.post("/stocks", response_model=schemas.StockOut, status_code=status.HTTP_201_CREATED)
@@ -40,17 +68,31 @@ def list_stocks(db: Session = Depends(get_db)):
 
 
 @app.get("/stocks/with-prices", response_model=list[schemas.StockPriceOut])
-def list_stocks_with_prices(db: Session = Depends(get_db)):
-    client = TwelveDataClient()
+def list_stocks_with_prices(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     stocks = crud.list_stocks(db)
-    results: list[schemas.StockPriceOut] = []
+    prices: dict[str, float] = {}
+    to_fetch: list[str] = []
+    to_refresh: list[str] = []
     for stock in stocks:
-        price = None
+        if stock.status != "archived" and stock.market.upper() == "US":
+            cached, state = lookup_cached_price(stock.ticker)
+            if state == STALE:
+                to_refresh.append(stock.ticker)
+            if cached is not None:
+                prices[stock.ticker] = cached
+            else:
+                to_fetch.append(stock.ticker)
+    if to_fetch:
         try:
-            if stock.status != "archived" and stock.market.upper() == "US":
-                price = client.fetch_intraday_price_cached(stock.ticker)
+            prices.update(fetch_intraday_prices_concurrently(to_fetch))
         except Exception:
-            price = None
+            pass
+    if to_refresh:
+        background_tasks.add_task(_refresh_prices, to_refresh)
+
+    results: list[schemas.StockPriceOut] = []
+    for stock in stocks:
+        price = prices.get(stock.ticker)
         results.append(
             schemas.StockPriceOut(
                 id=stock.id,
@@ -68,7 +110,6 @@ def list_stocks_with_prices(db: Session = Depends(get_db)):
 
 @app.get("/stocks/prices", response_model=list[schemas.StockPriceOnly])
 def list_stock_prices(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    client = TwelveDataClient()
     stocks = crud.list_stocks(db)
     results: list[schemas.StockPriceOnly] = []
     to_fetch: list[str] = []
@@ -76,31 +117,27 @@ def list_stock_prices(background_tasks: BackgroundTasks, db: Session = Depends(g
     for stock in stocks:
         price = None
         if stock.status != "archived" and stock.market.upper() == "US":
-            cached = get_cached_price(stock.ticker, ttl_seconds=60)
-            if cached is not None:
-                price = cached
-            else:
+            price, state = lookup_cached_price(stock.ticker)
+            if state != FRESH:
                 to_fetch.append(stock.ticker)
         results.append(schemas.StockPriceOnly(id=stock.id, ticker=stock.ticker, price=price))
 
     if to_fetch:
-        background_tasks.add_task(_refresh_prices, to_fetch, client)
+        background_tasks.add_task(_refresh_prices, to_fetch)
 
     return results
 
 
-def _refresh_prices(symbols: list[str], client: TwelveDataClient):
-    for symbol in symbols:
-        try:
-            price = client.fetch_intraday_price(symbol)
-            set_cached_price(symbol, price)
-        except Exception:
-            continue
+def _refresh_prices(symbols: list[str]):
+    try:
+        fetch_intraday_prices_concurrently(symbols)
+    except Exception:
+        return
 
 
 @app.get("/debug/price/{ticker}")
 def debug_price(ticker: str):
-    client = TwelveDataClient()
+    client = TwelveDataClient(priority=PRIORITY_LOW)
     try:
         price = client.fetch_intraday_price(ticker)
         return {"ticker": ticker.upper(), "price": price}
@@ -108,12 +145,67 @@ def debug_price(ticker: str):
         return {"ticker": ticker.upper(), "error": str(exc)}
 
 
+@app.get("/debug/rate-limit")
+def debug_rate_limit():
+    return {**get_rate_limiter().snapshot(), "price_requests": price_flight_stats()}
+
+
+@app.get("/debug/price-cache")
+def debug_price_cache():
+    return get_price_cache().stats()
+
+
+@app.get("/debug/audit-writer")
+def debug_audit_writer():
+    return get_audit_writer().stats()
+
+
+@app.get("/debug/evaluation-stats")
+def debug_evaluation_stats():
+    cache_info = rule_engine.compile_expression.cache_info()
+    plan_info = rule_engine.compile_plan_expressions.cache_info()
+    return {
+        "expression_cache": {
+            "hits": cache_info.hits,
+            "misses": cache_info.misses,
+            "size": cache_info.currsize,
+            "max_size": cache_info.maxsize,
+        },
+        "plan_cache": {
+            "hits": plan_info.hits,
+            "misses": plan_info.misses,
+            "size": plan_info.currsize,
+            "max_size": plan_info.maxsize,
+        },
+        "indicator_memo": rule_context.memo_stats(),
+    }
+
+
+@app.get("/debug/rule-plans/{rule_plan_id}/graph")
+def debug_rule_plan_graph(rule_plan_id: int, db: Session = Depends(get_db)):
+    plan = crud.get_rule_plan(db, rule_plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Rule plan not found")
+    rules = crud.serialize_rule_plan(plan).rules
+    graph = rule_engine.compile_plan(rules)
+    declared = rule_engine.declared_indicators(rules)
+    return {
+        "rule_plan_id": plan.id,
+        **graph.stats(),
+        "costs": {
+            expr: rule_engine.node_cost(rule_engine.parse_expression(expr), declared)[0]
+            for expr in graph.roots
+        },
+        "errors": graph.errors,
+    }
+
+
 @app.get("/stocks/validate/{ticker}")
 def validate_ticker(ticker: str, market: str = "US"):
     if market.upper() != "US":
         return {"ticker": ticker.upper(), "valid": True}
 
-    client = TwelveDataClient()
+    client = TwelveDataClient(priority=PRIORITY_LOW)
     try:
         price = client.fetch_intraday_price_cached(ticker)
     except Exception as exc:
@@ -231,14 +323,47 @@ def update_rule_plan(
     return crud.serialize_rule_plan(plan)
 
 
+@app.get("/stocks/{stock_id}/backtest")
+def run_backtest(
+    stock_id: int,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    include_trades: bool = True,
+    db: Session = Depends(get_db),
+):
+    stock = crud.get_stock(db, stock_id)
+    if not stock:
+        raise HTTPException(status_code=404, detail="Stock not found")
+    try:
+        result = backtest.backtest_stock(db, stock_id, start=start_date, end=end_date)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"status": "ok", "stock_id": stock_id, **result.as_dict(include_trades)}
+
+
 @app.post("/jobs/ingest-daily/{stock_id}")
 def run_daily_ingestion(stock_id: int, db: Session = Depends(get_db)):
     stock = crud.get_stock(db, stock_id)
     if not stock:
         raise HTTPException(status_code=404, detail="Stock not found")
-    client = jobs.AlphaVantageClient()
-    jobs.ingest_daily_bars(db, stock, client)
-    return {"status": "ok", "stock_id": stock_id}
+    client = TwelveDataClient()
+    result = jobs.ingest_daily_bars(db, stock, client)
+    return {"status": "ok", "stock_id": stock_id, **result.as_dict()}
+
+
+@app.post("/jobs/backfill-daily/{stock_id}")
+def run_daily_backfill(
+    stock_id: int,
+    start_date: date | None = None,
+    max_pages: int = 20,
+    db: Session = Depends(get_db),
+):
+    stock = crud.get_stock(db, stock_id)
+    if not stock:
+        raise HTTPException(status_code=404, detail="Stock not found")
+    client = TwelveDataClient()
+    result = jobs.backfill_daily_bars(db, stock, client, start_date=start_date, max_pages=max_pages)
+    return {"status": "ok", "stock_id": stock_id, **result.as_dict()}
 
 
 @app.post("/jobs/compute-indicators/{stock_id}")
@@ -263,17 +388,31 @@ def run_rule_evaluation(stock_id: int, position_state: str | None = None, db: Se
     return {"status": "ok", "changed": changed, "decision": decision}
 
 
+@app.post("/jobs/evaluate-all")
+def run_batch_evaluation(db: Session = Depends(get_db)):
+    stocks = db.query(models.Stock).filter(models.Stock.status == "active").all()
+    result = batch_evaluation.evaluate_all(db, stocks)
+    batch_evaluation.notify_changes(db, stocks, result)
+    return {"status": "ok", **result.as_dict(), "decisions": result.decisions}
+
+
 @app.post("/jobs/market-monitor/{stock_id}")
 def run_market_monitor(stock_id: int, position_state: str | None = None, db: Session = Depends(get_db)):
     stock = crud.get_stock(db, stock_id)
     if not stock:
         raise HTTPException(status_code=404, detail="Stock not found")
-    client = jobs.AlphaVantageClient()
+    client = TwelveDataClient()
     state = position_state or stock.position_state
     decision, changed = jobs.market_monitor(db, stock, client, state)
     return {"status": "ok", "changed": changed, "decision": decision}
 
 
+@app.post("/jobs/audit-maintenance")
+def run_audit_maintenance(db: Session = Depends(get_db)):
+    result = audit_maintenance.run_audit_maintenance(db)
+    return {"status": "ok", **result}
+
+
 @app.post("/devices/register", response_model=schemas.DeviceOut, status_code=status.HTTP_201_CREATED)
 def register_device(device_in: schemas.DeviceCreate, db: Session = Depends(get_db)):
     device = crud.upsert_device(db, device_in)
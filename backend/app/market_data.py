@@ -1,9 +1,21 @@
+import asyncio
 import os
-import time
+import threading
 from dataclasses import dataclass
 from datetime import date, datetime
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+
+from .price_cache import get_price_cache
+from .rate_limit import (
+    PRIORITY_NORMAL,
+    CreditRateLimiter,
+    RateLimitError,
+    get_rate_limiter,
+)
+from .single_flight import SingleFlight
 
 
 @dataclass
@@ -17,29 +29,154 @@ class DailyBar:
     volume: int
 
 
-_GLOBAL_PRICE_CACHE: dict[str, tuple[float, float]] = {}
+MAX_OUTPUTSIZE = 5000
+RATE_LIMIT_RETRIES = 3
+
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+_PRICE_FLIGHTS = SingleFlight()
+
+
+def _quote_batch_size() -> int:
+    return int(os.getenv("TWELVEDATA_QUOTE_BATCH_SIZE", "8"))
+
+
+def _pool_size() -> int:
+    return int(os.getenv("TWELVEDATA_POOL_SIZE", "10"))
+
+
+def _max_concurrency() -> int:
+    return int(os.getenv("TWELVEDATA_MAX_CONCURRENCY", "4"))
+
 
+def get_http_session() -> requests.Session:
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=_pool_size(), pool_maxsize=_pool_size())
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = session
+        return _SESSION
 
-class TwelveDataClient:
-    def __init__(self, api_key: str | None = None):
+
+class _TwelveDataBase:
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        limiter: CreditRateLimiter | None = None,
+        priority: int = PRIORITY_NORMAL,
+    ):
         self.api_key = api_key or os.getenv("TWELVEDATA_API_KEY")
         if not self.api_key:
             raise ValueError("TWELVEDATA_API_KEY is not set")
+        self.base_url = (
+            base_url or os.getenv("TWELVEDATA_BASE_URL") or "https://api.twelvedata.com"
+        ).rstrip("/")
+        self.limiter = limiter or get_rate_limiter()
+        self.priority = priority
+
+    def _quote_chunks(self, symbols: list[str], chunk_size: int | None) -> list[list[str]]:
+        unique = list(dict.fromkeys(symbols))
+        chunk_size = chunk_size or _quote_batch_size()
+        return [unique[start : start + chunk_size] for start in range(0, len(unique), chunk_size)]
+
+    def _quote_params(self, symbols: list[str]) -> dict:
+        return {
+            "symbol": ",".join(symbols),
+            "apikey": self.api_key,
+        }
+
+    def _credits(self, params: dict) -> int:
+        return max(len(str(params.get("symbol", "")).split(",")), 1)
+
+    def _parse_price(self, symbol: str, payload: dict) -> float:
+        price = payload.get("close")
+        if price is None:
+            raise ValueError(f"Unexpected response for {symbol}: {payload}")
+        return float(price)
+
+    def _partial_prices(
+        self, prices: dict[str, float], errors: list[Exception]
+    ) -> dict[str, float]:
+        if errors and not prices:
+            raise errors[0]
+        return prices
+
+    def _parse_quotes(self, symbols: list[str], payload: dict) -> dict[str, float]:
+        if len(symbols) == 1 and self._is_symbol_error(payload):
+            return {}
+        if payload.get("status") == "error":
+            raise ValueError(f"Unexpected response for {','.join(symbols)}: {payload}")
+        if len(symbols) == 1:
+            quotes = {symbols[0]: payload}
+        else:
+            by_upper = {key.upper(): value for key, value in payload.items()}
+            quotes = {symbol: by_upper.get(symbol.upper()) for symbol in symbols}
+
+        prices: dict[str, float] = {}
+        for symbol, quote in quotes.items():
+            if not isinstance(quote, dict) or quote.get("close") is None:
+                continue
+            prices[symbol] = float(quote["close"])
+        return prices
+
+    def _is_no_data(self, payload: dict) -> bool:
+        if payload.get("status") == "error":
+            return "no data is available" in str(payload.get("message", "")).lower()
+        return False
+
+    def _is_symbol_error(self, payload: dict) -> bool:
+        if payload.get("status") == "error":
+            return str(payload.get("code", "")) in {"400", "404"}
+        return False
+
+    def _is_rate_limited(self, payload: dict) -> bool:
+        if payload.get("status") == "error":
+            code = str(payload.get("code", ""))
+            message = str(payload.get("message", "")).lower()
+            return code == "429" or "limit" in message
+        return False
+
+
+class TwelveDataClient(_TwelveDataBase):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        limiter: CreditRateLimiter | None = None,
+        priority: int = PRIORITY_NORMAL,
+        session: requests.Session | None = None,
+    ):
+        super().__init__(api_key, base_url, limiter, priority)
+        self.session = session or get_http_session()
         self._price_cache: dict[str, tuple[float, float]] = {}
 
-    def fetch_daily_bars(self, symbol: str) -> list[DailyBar]:
-        payload = self._request(
-            {
-                "symbol": symbol,
-                "interval": "1day",
-                "apikey": self.api_key,
-                "outputsize": 100,
-            },
-            endpoint="time_series",
-        )
+    def fetch_daily_bars(
+        self,
+        symbol: str,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        outputsize: int = 100,
+    ) -> list[DailyBar]:
+        params = {
+            "symbol": symbol,
+            "interval": "1day",
+            "apikey": self.api_key,
+            "outputsize": min(outputsize, MAX_OUTPUTSIZE),
+        }
+        if start_date:
+            params["start_date"] = start_date.isoformat()
+        if end_date:
+            params["end_date"] = end_date.isoformat()
+        payload = self._request(params, endpoint="time_series")
 
         values = payload.get("values")
         if not values:
+            if (start_date or end_date) and self._is_no_data(payload):
+                return []
             raise ValueError(f"Unexpected response for {symbol}: {payload}")
 
         bars = []
@@ -61,33 +198,40 @@ class TwelveDataClient:
         return bars
 
     def fetch_intraday_price(self, symbol: str) -> float:
-        payload = self._request(
-            {
-                "symbol": symbol,
-                "apikey": self.api_key,
-            },
-            endpoint="quote",
-        )
-        price = payload.get("close")
-        if price is None:
-            raise ValueError(f"Unexpected response for {symbol}: {payload}")
-        return float(price)
+        payload = self._request(self._quote_params([symbol]), endpoint="quote")
+        return self._parse_price(symbol, payload)
+
+    def fetch_intraday_prices(
+        self, symbols: list[str], chunk_size: int | None = None
+    ) -> dict[str, float]:
+        prices: dict[str, float] = {}
+        errors: list[Exception] = []
+        for chunk in self._quote_chunks(symbols, chunk_size):
+            try:
+                payload = self._request(self._quote_params(chunk), endpoint="quote")
+                prices.update(self._parse_quotes(chunk, payload))
+            except (requests.RequestException, ValueError) as exc:
+                errors.append(exc)
+        return self._partial_prices(prices, errors)
 
     def fetch_intraday_price_cached(self, symbol: str, ttl_seconds: int = 60) -> float:
-        now = time.time()
-        cached = _GLOBAL_PRICE_CACHE.get(symbol)
-        if cached and now - cached[0] < ttl_seconds:
-            return cached[1]
+        cached = get_cached_price(symbol, ttl_seconds)
+        if cached is not None:
+            return cached
+
+        return _PRICE_FLIGHTS.do(symbol, lambda: self._fetch_and_cache(symbol))
 
+    def _fetch_and_cache(self, symbol: str) -> float:
         price = self.fetch_intraday_price(symbol)
-        _GLOBAL_PRICE_CACHE[symbol] = (now, price)
+        set_cached_price(symbol, price)
         return price
 
     def _request(self, params: dict, endpoint: str = "quote") -> dict:
-        backoff = [5, 15, 30]
-        for attempt in range(len(backoff) + 1):
-            response = requests.get(
-                f"https://api.twelvedata.com/{endpoint}",
+        credits = self._credits(params)
+        for _ in range(RATE_LIMIT_RETRIES + 1):
+            self.limiter.acquire(credits, self.priority)
+            response = self.session.get(
+                f"{self.base_url}/{endpoint}",
                 params=params,
                 timeout=30,
             )
@@ -95,25 +239,103 @@ class TwelveDataClient:
             payload = response.json()
             if not self._is_rate_limited(payload):
                 return payload
-            if attempt < len(backoff):
-                time.sleep(backoff[attempt])
-        raise ValueError(f"Twelve Data rate limit: {payload}")
+            self.limiter.drain()
+        raise RateLimitError(f"Twelve Data rate limit: {payload}")
 
-    def _is_rate_limited(self, payload: dict) -> bool:
-        if payload.get("status") == "error":
-            code = str(payload.get("code", ""))
-            message = str(payload.get("message", "")).lower()
-            return code == "429" or "limit" in message
-        return False
+
+class AsyncTwelveDataClient(_TwelveDataBase):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        limiter: CreditRateLimiter | None = None,
+        priority: int = PRIORITY_NORMAL,
+        max_concurrency: int | None = None,
+    ):
+        super().__init__(api_key, base_url, limiter, priority)
+        self.max_concurrency = max_concurrency or _max_concurrency()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._http = httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def fetch_intraday_price(self, symbol: str) -> float:
+        payload = await self._request(self._quote_params([symbol]), endpoint="quote")
+        return self._parse_price(symbol, payload)
+
+    async def fetch_intraday_prices(
+        self, symbols: list[str], chunk_size: int | None = None
+    ) -> dict[str, float]:
+        chunks = self._quote_chunks(symbols, chunk_size)
+        payloads = await asyncio.gather(
+            *(self._request(self._quote_params(chunk), endpoint="quote") for chunk in chunks),
+            return_exceptions=True,
+        )
+        prices: dict[str, float] = {}
+        errors: list[Exception] = []
+        for chunk, payload in zip(chunks, payloads):
+            try:
+                if isinstance(payload, BaseException):
+                    raise payload
+                prices.update(self._parse_quotes(chunk, payload))
+            except (httpx.HTTPError, ValueError) as exc:
+                errors.append(exc)
+        return self._partial_prices(prices, errors)
+
+    async def _request(self, params: dict, endpoint: str = "quote") -> dict:
+        credits = self._credits(params)
+        async with self._semaphore:
+            for _ in range(RATE_LIMIT_RETRIES + 1):
+                await asyncio.to_thread(self.limiter.acquire, credits, self.priority)
+                response = await self._http.get(f"{self.base_url}/{endpoint}", params=params)
+                response.raise_for_status()
+                payload = response.json()
+                if not self._is_rate_limited(payload):
+                    return payload
+                self.limiter.drain()
+        raise RateLimitError(f"Twelve Data rate limit: {payload}")
+
+
+def fetch_intraday_prices_concurrently(
+    symbols: list[str], chunk_size: int | None = None, **client_kwargs
+) -> dict[str, float]:
+    async def _fetch(owned: list[str]):
+        async with AsyncTwelveDataClient(**client_kwargs) as client:
+            return await client.fetch_intraday_prices(owned, chunk_size)
+
+    def _fetch_and_cache(owned: list[str]):
+        prices = asyncio.run(_fetch(owned))
+        for symbol, price in prices.items():
+            set_cached_price(symbol, price)
+        return prices
+
+    return _PRICE_FLIGHTS.do_many(symbols, _fetch_and_cache)
+
+
+def price_flight_stats() -> dict:
+    return _PRICE_FLIGHTS.stats()
+
+
+def get_cached_price(symbol: str, ttl_seconds: int | None = None) -> float | None:
+    return get_price_cache().get(symbol, ttl_seconds)
 
 
-def get_cached_price(symbol: str, ttl_seconds: int = 60) -> float | None:
-    now = time.time()
-    cached = _GLOBAL_PRICE_CACHE.get(symbol)
-    if cached and now - cached[0] < ttl_seconds:
-        return cached[1]
-    return None
+def lookup_cached_price(symbol: str) -> tuple[float | None, str]:
+    return get_price_cache().lookup(symbol)
 
 
 def set_cached_price(symbol: str, price: float):
-    _GLOBAL_PRICE_CACHE[symbol] = (time.time(), price)
+    get_price_cache().set(symbol, price)
@@ -1,6 +1,16 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import (
+    Boolean,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from .db import Base
@@ -109,6 +119,21 @@ class IndicatorValue(Base):
     stock = relationship("Stock", back_populates="indicator_values")
 
 
+class IndicatorState(Base):
+    __tablename__ = "indicator_states"
+    __table_args__ = (
+        UniqueConstraint("stock_id", "params_key", name="uq_indicator_states_stock_params"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    stock_id: Mapped[int] = mapped_column(Integer, ForeignKey("stocks.id"), index=True)
+    params_key: Mapped[str] = mapped_column(Text)
+    as_of_date: Mapped[datetime] = mapped_column(Date)
+    bar_count: Mapped[int] = mapped_column(Integer)
+    state_json: Mapped[str] = mapped_column(Text)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 class DecisionState(Base):
     __tablename__ = "decision_states"
     __table_args__ = (UniqueConstraint("stock_id", name="uq_decision_states_stock"),)
@@ -117,6 +142,7 @@ class DecisionState(Base):
     stock_id: Mapped[int] = mapped_column(Integer, ForeignKey("stocks.id"), index=True)
     state_key: Mapped[str] = mapped_column(String)
     decision_json: Mapped[str] = mapped_column(Text)
+    input_fingerprint: Mapped[str] = mapped_column(String, nullable=True)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     stock = relationship("Stock", back_populates="decision_state")
@@ -124,6 +150,10 @@ class DecisionState(Base):
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_stock_timestamp", "stock_id", "timestamp"),
+        Index("ix_audit_logs_event_timestamp", "event_type", "timestamp"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
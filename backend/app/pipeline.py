@@ -0,0 +1,269 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import batch_evaluation, indicator_engine, ingestion, jobs, models
+from .market_data import TwelveDataClient, fetch_intraday_prices_concurrently
+from .rate_limit import PRIORITY_HIGH
+
+STAGES = ("plan", "fetch", "write", "indicators", "quotes", "monitor", "total")
+
+
+def _fetch_workers() -> int:
+    return int(os.getenv("PIPELINE_FETCH_WORKERS", "4"))
+
+
+def _write_batch_size() -> int:
+    return int(os.getenv("PIPELINE_WRITE_BATCH", "25"))
+
+
+def _process_min_bars() -> int:
+    return int(os.getenv("PIPELINE_PROCESS_MIN_BARS", "20000"))
+
+
+def _process_workers() -> int | None:
+    raw = os.getenv("PIPELINE_PROCESS_WORKERS")
+    return int(raw) if raw else None
+
+
+@dataclass
+class PipelineReport:
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
+    failures: dict[str, dict] = field(default_factory=dict)
+    tickers: list[str] = field(default_factory=list)
+
+    def fail(self, stock: models.Stock, stage: str, exc: Exception):
+        self.failures[stock.ticker] = {"stage": stage, "error": str(exc)}
+
+    def ok(self, stock: models.Stock) -> bool:
+        return stock.ticker not in self.failures
+
+    def bump(self, name: str, amount: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    @property
+    def succeeded(self) -> list[str]:
+        return [ticker for ticker in self.tickers if ticker not in self.failures]
+
+    def as_dict(self) -> dict:
+        return {
+            "stage_seconds": {
+                stage: round(self.stage_seconds[stage], 3)
+                for stage in STAGES
+                if stage in self.stage_seconds
+            },
+            "counts": self.counts,
+            "succeeded": len(self.succeeded),
+            "failures": self.failures,
+        }
+
+    def format(self) -> str:
+        lines = ["Daily pipeline summary"]
+        for stage in STAGES:
+            if stage in self.stage_seconds:
+                lines.append(f"  {stage:<12} {self.stage_seconds[stage]:8.2f}s")
+        for name, value in sorted(self.counts.items()):
+            lines.append(f"  {name:<20} {value}")
+        lines.append(f"  succeeded: {len(self.succeeded)}/{len(self.tickers)}")
+        for ticker, failure in sorted(self.failures.items()):
+            lines.append(f"  FAILED {ticker} at {failure['stage']}: {failure['error']}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def _timed(report: PipelineReport, stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        report.stage_seconds[stage] = report.stage_seconds.get(stage, 0.0) + (
+            time.perf_counter() - start
+        )
+
+
+def _latest_bar_dates(db: Session, stock_ids: list[int]) -> dict[int, date]:
+    rows = (
+        db.query(models.DailyBar.stock_id, func.max(models.DailyBar.bar_date))
+        .filter(models.DailyBar.stock_id.in_(stock_ids))
+        .group_by(models.DailyBar.stock_id)
+        .all()
+    )
+    return {stock_id: latest for stock_id, latest in rows}
+
+
+def _write_batch(db: Session, batch: dict[int, tuple], report: PipelineReport):
+    payloads = {stock_id: payload for stock_id, (_, _, payload) in batch.items()}
+    try:
+        results = ingestion.upsert_daily_bars_by_stock(db, payloads, source="alphavantage")
+    except Exception:
+        db.rollback()
+        results = {}
+        for stock_id, (stock, window, payload) in batch.items():
+            try:
+                results[stock_id] = ingestion.upsert_daily_bars(
+                    db, stock_id, payload, source="alphavantage"
+                )
+            except Exception as exc:
+                db.rollback()
+                report.fail(stock, "write", exc)
+
+    for stock_id, (stock, window, payload) in batch.items():
+        result = results.get(stock_id)
+        if result is None:
+            continue
+        jobs.record_ingested(db, stock, window, len(payload), result)
+        report.bump("bars_inserted", result.inserted)
+        report.bump("bars_updated", result.updated)
+    batch.clear()
+
+
+def _ingest(db: Session, stocks: list, client: TwelveDataClient, as_of: date, report: PipelineReport):
+    with _timed(report, "plan"):
+        latest = _latest_bar_dates(db, [stock.id for stock in stocks])
+        to_fetch = []
+        for stock in stocks:
+            window = jobs.daily_fetch_window(latest.get(stock.id), as_of)
+            if window is None:
+                jobs.record_up_to_date(db, stock, latest[stock.id])
+                report.bump("up_to_date")
+            else:
+                to_fetch.append((stock, window))
+
+    batch: dict[int, tuple] = {}
+    batch_size = _write_batch_size()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=_fetch_workers()) as pool:
+        futures = {
+            pool.submit(client.fetch_daily_bars, stock.ticker, **window): (stock, window)
+            for stock, window in to_fetch
+        }
+        for future in as_completed(futures):
+            stock, window = futures[future]
+            try:
+                bars = future.result()
+            except Exception as exc:
+                report.fail(stock, "fetch", exc)
+                continue
+            report.bump("fetched")
+            batch[stock.id] = (stock, window, jobs.bar_payload(bars))
+            if len(batch) >= batch_size:
+                with _timed(report, "write"):
+                    _write_batch(db, batch, report)
+    report.stage_seconds["fetch"] = time.perf_counter() - start - report.stage_seconds.get("write", 0.0)
+    if batch:
+        with _timed(report, "write"):
+            _write_batch(db, batch, report)
+
+
+def _apply_indicators(db: Session, stock: models.Stock, work, states, report: PipelineReport):
+    try:
+        summary = indicator_engine.apply_indicator_work(db, work, states, source="computed")
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        report.fail(stock, "indicators", exc)
+        return
+    ingestion.record_audit(db, stock.id, "INDICATORS_COMPUTED", {"stock_id": stock.id, **summary})
+    report.bump("indicators_incremental", summary["incremental"])
+    report.bump("indicators_recomputed", summary["recomputed"])
+
+
+def _compute_indicators(db: Session, stocks: list, report: PipelineReport, executor_factory):
+    with _timed(report, "indicators"):
+        prepared = []
+        for stock in stocks:
+            if not report.ok(stock):
+                continue
+            try:
+                work = indicator_engine.prepare_indicator_work(db, stock.id)
+            except Exception as exc:
+                db.rollback()
+                report.fail(stock, "indicators", exc)
+                continue
+            if work is not None:
+                prepared.append((stock, work))
+
+        min_bars = _process_min_bars()
+        large = [(stock, work) for stock, work in prepared if work.bars_to_replay >= min_bars]
+        small = [(stock, work) for stock, work in prepared if work.bars_to_replay < min_bars]
+
+        pool = executor_factory() if large else None
+        try:
+            futures = {
+                pool.submit(indicator_engine.replay_indicator_items, work.items): (stock, work)
+                for stock, work in large
+            }
+            for stock, work in small:
+                states = indicator_engine.replay_indicator_items(work.items)
+                _apply_indicators(db, stock, work, states, report)
+            for future in as_completed(futures):
+                stock, work = futures[future]
+                try:
+                    states = future.result()
+                except Exception as exc:
+                    report.fail(stock, "indicators", exc)
+                    continue
+                _apply_indicators(db, stock, work, states, report)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        report.bump("indicators_in_process_pool", len(large))
+
+
+def _monitor(db: Session, stocks: list, report: PipelineReport, quote_fetcher):
+    candidates = [stock for stock in stocks if report.ok(stock)]
+    with _timed(report, "quotes"):
+        quote_error = None
+        try:
+            prices = quote_fetcher([stock.ticker for stock in candidates], priority=PRIORITY_HIGH)
+        except Exception as exc:
+            prices = {}
+            quote_error = exc
+
+    with _timed(report, "monitor"):
+        priced = []
+        for stock in candidates:
+            if prices.get(stock.ticker) is None:
+                report.fail(stock, "quotes", quote_error or ValueError("no intraday price"))
+                continue
+            priced.append(stock)
+        if not priced:
+            return
+        try:
+            result = batch_evaluation.evaluate_all(db, priced, prices=prices)
+        except Exception as exc:
+            db.rollback()
+            for stock in priced:
+                report.fail(stock, "monitor", exc)
+            return
+        batch_evaluation.notify_changes(db, priced, result)
+        for stock in priced:
+            error = result.failures.get(stock.id)
+            if error is not None:
+                report.fail(stock, "monitor", ValueError(error))
+        report.bump("evaluated", result.evaluated)
+        report.bump("decisions_cached", len(result.decisions) - result.evaluated)
+
+
+def run_daily_pipeline(
+    db: Session,
+    stocks: list,
+    client: TwelveDataClient,
+    as_of: date | None = None,
+    quote_fetcher=fetch_intraday_prices_concurrently,
+    executor_factory=None,
+) -> PipelineReport:
+    report = PipelineReport(tickers=[stock.ticker for stock in stocks])
+    executor_factory = executor_factory or (lambda: ProcessPoolExecutor(_process_workers()))
+    with _timed(report, "total"):
+        _ingest(db, stocks, client, as_of or date.today(), report)
+        _compute_indicators(db, stocks, report, executor_factory)
+        _monitor(db, stocks, report, quote_fetcher)
+    return report
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+def _max_entries() -> int:
+    return int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "1024"))
+
+
+def _ttl_seconds() -> float:
+    return float(os.getenv("PRICE_CACHE_TTL_SECONDS", "60"))
+
+
+def _stale_seconds() -> float:
+    return float(os.getenv("PRICE_CACHE_STALE_SECONDS", "300"))
+
+
+def _shared_path() -> str | None:
+    return os.getenv("PRICE_CACHE_PATH") or None
+
+
+class PriceCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 60,
+        stale_seconds: float = 300,
+        path: str | None = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.path = path
+        self._entries: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "stale": 0, "misses": 0, "evictions": 0, "shared_hits": 0}
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS price_cache ("
+                "symbol TEXT PRIMARY KEY, price REAL NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, symbol: str, ttl_seconds: float | None = None) -> float | None:
+        price, state = self.lookup(symbol, ttl_seconds)
+        return price if state == FRESH else None
+
+    def lookup(self, symbol: str, ttl_seconds: float | None = None) -> tuple[float | None, str]:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None or now - entry[0] > ttl:
+                shared = self._read_shared(symbol)
+                if shared is not None and (entry is None or shared[0] > entry[0]):
+                    entry = shared
+                    self._store(symbol, entry)
+                    self._counters["shared_hits"] += 1
+            if entry is None:
+                self._counters["misses"] += 1
+                return None, MISS
+            age = now - entry[0]
+            if age > ttl + self.stale_seconds:
+                self._entries.pop(symbol, None)
+                self._counters["misses"] += 1
+                return None, MISS
+            self._entries.move_to_end(symbol)
+            if age > ttl:
+                self._counters["stale"] += 1
+                return entry[1], STALE
+            self._counters["hits"] += 1
+            return entry[1], FRESH
+
+    def set(self, symbol: str, price: float, fetched_at: float | None = None):
+        entry = (time.time() if fetched_at is None else fetched_at, float(price))
+        with self._lock:
+            self._store(symbol, entry)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT INTO price_cache (symbol, price, fetched_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(symbol) DO UPDATE SET price = excluded.price, "
+                    "fetched_at = excluded.fetched_at WHERE excluded.fetched_at >= price_cache.fetched_at",
+                    (symbol, entry[1], entry[0]),
+                )
+
+    def prune(self) -> int:
+        cutoff = time.time() - self.ttl_seconds - self.stale_seconds
+        with self._lock:
+            expired = [symbol for symbol, entry in self._entries.items() if entry[0] < cutoff]
+            for symbol in expired:
+                del self._entries[symbol]
+            self._counters["evictions"] += len(expired)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM price_cache WHERE fetched_at < ?", (cutoff,))
+                self._conn.execute(
+                    "DELETE FROM price_cache WHERE symbol NOT IN "
+                    "(SELECT symbol FROM price_cache ORDER BY fetched_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM price_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "stale_seconds": self.stale_seconds,
+                "shared": self.path is not None,
+            }
+
+    def _store(self, symbol: str, entry: tuple[float, float]):
+        self._entries[symbol] = entry
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _read_shared(self, symbol: str) -> tuple[float, float] | None:
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT fetched_at, price FROM price_cache WHERE symbol = ?",
+            (symbol,),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+
+_CACHE: PriceCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_price_cache() -> PriceCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = PriceCache(
+                max_entries=_max_entries(),
+                ttl_seconds=_ttl_seconds(),
+                stale_seconds=_stale_seconds(),
+                path=_shared_path(),
+            )
+        return _CACHE
@@ -0,0 +1,206 @@
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class RateLimitError(ValueError):
+    pass
+
+
+def _credits_per_minute() -> int:
+    return int(os.getenv("TWELVEDATA_CREDITS_PER_MINUTE", "8"))
+
+
+def _credits_per_day() -> int:
+    return int(os.getenv("TWELVEDATA_CREDITS_PER_DAY", "800"))
+
+
+def _reserve_pct() -> float:
+    return float(os.getenv("TWELVEDATA_RESERVE_PCT", "0.25"))
+
+
+def _acquire_timeout() -> float:
+    return float(os.getenv("TWELVEDATA_RATE_LIMIT_TIMEOUT", "60"))
+
+
+def _state_path() -> str:
+    return os.getenv("TWELVEDATA_RATE_LIMIT_PATH", "./twelvedata_rate_limit.db")
+
+
+def _utc_day(now: float) -> str:
+    return datetime.fromtimestamp(now, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _seconds_to_utc_midnight(now: float) -> float:
+    return 86400 - (now % 86400)
+
+
+class CreditRateLimiter:
+    def __init__(
+        self,
+        per_minute: int,
+        per_day: int,
+        path: str = ":memory:",
+        reserve_pct: float = 0.0,
+        timeout: float = 60.0,
+        name: str = "twelvedata",
+    ):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.path = path
+        self.reserve = per_minute * reserve_pct
+        self.timeout = timeout
+        self.name = name
+        self._refill_rate = per_minute / 60.0
+        self._db_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []
+        self._tickets = itertools.count()
+        self._conn = sqlite3.connect(
+            path,
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, "
+            "day TEXT NOT NULL, day_used INTEGER NOT NULL)"
+        )
+
+    def acquire(
+        self,
+        credits: int = 1,
+        priority: int = PRIORITY_NORMAL,
+        timeout: float | None = None,
+    ) -> None:
+        if credits > self.per_minute:
+            raise RateLimitError(
+                f"Twelve Data rate limit: {credits} credits exceed {self.per_minute} per minute"
+            )
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        ticket = (priority, next(self._tickets))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self._cond.notify_all()
+        try:
+            while True:
+                with self._cond:
+                    while self._waiting[0] != ticket:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RateLimitError("Twelve Data rate limit: timed out in queue")
+                        self._cond.wait(remaining)
+                wait = self._try_acquire(credits, priority)
+                if wait == 0:
+                    return
+                remaining = deadline - time.monotonic()
+                if wait > remaining:
+                    raise RateLimitError(
+                        f"Twelve Data rate limit: {credits} credits unavailable for {wait:.1f}s"
+                    )
+                with self._cond:
+                    self._cond.wait(wait)
+        finally:
+            with self._cond:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def drain(self) -> None:
+        with self._transaction() as (tokens, now, day, day_used):
+            self._save(0.0, now, day, day_used)
+
+    def snapshot(self) -> dict:
+        with self._transaction() as (tokens, now, day, day_used):
+            self._save(tokens, now, day, day_used)
+        with self._cond:
+            waiting = len(self._waiting)
+        return {
+            "per_minute": self.per_minute,
+            "per_day": self.per_day,
+            "minute_available": round(tokens, 3),
+            "minute_utilisation": round(1 - tokens / self.per_minute, 3),
+            "day_used": day_used,
+            "day_remaining": max(self.per_day - day_used, 0),
+            "day_utilisation": round(day_used / self.per_day, 3),
+            "reserve": self.reserve,
+            "waiting": waiting,
+        }
+
+    def _try_acquire(self, credits: int, priority: int) -> float:
+        reserve = self.reserve if priority > PRIORITY_HIGH else 0.0
+        with self._transaction() as (tokens, now, day, day_used):
+            if day_used + credits > self.per_day:
+                self._save(tokens, now, day, day_used)
+                return _seconds_to_utc_midnight(now)
+            needed = min(credits + reserve, float(self.per_minute))
+            if tokens >= needed:
+                self._save(tokens - credits, now, day, day_used + credits)
+                return 0
+            self._save(tokens, now, day, day_used)
+            return max((needed - tokens) / self._refill_rate, 0.01)
+
+    @contextmanager
+    def _transaction(self):
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._load()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _load(self) -> tuple[float, float, str, int]:
+        now = time.time()
+        today = _utc_day(now)
+        row = self._conn.execute(
+            "SELECT tokens, updated_at, day, day_used FROM rate_limit_buckets WHERE name = ?",
+            (self.name,),
+        ).fetchone()
+        if row is None:
+            return float(self.per_minute), now, today, 0
+        tokens, updated_at, day, day_used = row
+        elapsed = max(now - updated_at, 0.0)
+        tokens = min(float(self.per_minute), tokens + elapsed * self._refill_rate)
+        if day != today:
+            day, day_used = today, 0
+        return tokens, now, day, day_used
+
+    def _save(self, tokens: float, now: float, day: str, day_used: int) -> None:
+        self._conn.execute(
+            "INSERT INTO rate_limit_buckets (name, tokens, updated_at, day, day_used) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+            "tokens = excluded.tokens, updated_at = excluded.updated_at, "
+            "day = excluded.day, day_used = excluded.day_used",
+            (self.name, tokens, now, day, day_used),
+        )
+
+
+_LIMITER: CreditRateLimiter | None = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def get_rate_limiter() -> CreditRateLimiter:
+    global _LIMITER
+    with _LIMITER_LOCK:
+        if _LIMITER is None:
+            _LIMITER = CreditRateLimiter(
+                per_minute=_credits_per_minute(),
+                per_day=_credits_per_day(),
+                path=_state_path(),
+                reserve_pct=_reserve_pct(),
+                timeout=_acquire_timeout(),
+            )
+        return _LIMITER
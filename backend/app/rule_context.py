@@ -1,98 +1,211 @@
+import threading
+from collections.abc import MutableMapping
 from typing import Any, Callable
 
 from . import indicator_engine, models
-from .series import SeriesAccessor
+from .series import BarColumns, SeriesAccessor
+
+
+PRICE_FIELDS = {
+    "Close": "close",
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Volume": "volume",
+    "price.close": "close",
+    "price.adjusted_close": "adjusted_close",
+    "price.open": "open",
+    "price.high": "high",
+    "price.low": "low",
+    "volume": "volume",
+}
+
+
+class LazySeriesContext(MutableMapping):
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._values: dict[str, Any] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        self._factories[name] = factory
+        self._values.pop(name, None)
+
+    @property
+    def materialized(self) -> set[str]:
+        return set(self._values)
+
+    def __getitem__(self, name: str):
+        if name in self._values:
+            return self._values[name]
+        factory = self._factories.get(name)
+        if factory is None:
+            raise KeyError(name)
+        value = factory()
+        self._values[name] = value
+        return value
+
+    def __setitem__(self, name: str, value: Any):
+        self._factories.pop(name, None)
+        self._values[name] = value
+
+    def __delitem__(self, name: str):
+        found = name in self._values or name in self._factories
+        self._values.pop(name, None)
+        self._factories.pop(name, None)
+        if not found:
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in self._values or name in self._factories
+
+    def __iter__(self):
+        return iter(set(self._factories) | set(self._values))
+
+    def __len__(self):
+        return len(set(self._factories) | set(self._values))
 
 
 def build_series_context(
     bars: list[models.DailyBar],
     indicators: list[models.IndicatorDef],
     current_price: float | None = None,
+    references: set[str] | None = None,
+    columns: BarColumns | None = None,
 ):
     if not bars:
         raise ValueError("No bars available")
 
-    bars_sorted = sorted(bars, key=lambda b: b.bar_date)
-    bars_desc = list(reversed(bars_sorted))
-
-    adjusted_close_values = [bar.adjusted_close or bar.close for bar in bars_desc]
-    close_series = SeriesAccessor([bar.close for bar in bars_desc])
-    adjusted_close_series = SeriesAccessor(adjusted_close_values)
-    open_series = SeriesAccessor([bar.open for bar in bars_desc])
-    high_series = SeriesAccessor([bar.high for bar in bars_desc])
-    low_series = SeriesAccessor([bar.low for bar in bars_desc])
-    volume_series = SeriesAccessor([bar.volume for bar in bars_desc])
-
-    context: dict[str, Any] = {
-        "Close": close_series,
-        "Open": open_series,
-        "High": high_series,
-        "Low": low_series,
-        "Volume": volume_series,
-        "price.close": close_series,
-        "price.adjusted_close": adjusted_close_series,
-        "price.open": open_series,
-        "price.high": high_series,
-        "price.low": low_series,
-        "volume": volume_series,
-    }
+    columns = columns if columns is not None else BarColumns.from_bars(bars)
+
+    def wanted(name: str) -> bool:
+        return references is None or name in references
+
+    context = LazySeriesContext()
+    shared: dict[str, SeriesAccessor] = {}
+
+    def price_series(field: str):
+        if field not in shared:
+            head = current_price if field == "close" else None
+            shared[field] = columns.series(field, head=head)
+        return shared[field]
 
-    if current_price is not None and close_series.values:
-        close_series.values[0] = current_price
+    for name, field in PRICE_FIELDS.items():
+        if wanted(name):
+            context.register(name, lambda field=field: price_series(field))
 
     for indicator in indicators:
-        series_asc = indicator_engine.compute_indicator_series(indicator, bars_sorted)
-        series_desc = list(reversed(series_asc))
-        context[f"ind.{indicator.indicator_id}"] = SeriesAccessor(series_desc)
+        name = f"ind.{indicator.indicator_id}"
+        if not wanted(name):
+            continue
+
+        def indicator_series(indicator=indicator):
+            price_field = "adjusted_close" if indicator.price_field == "adjusted_close" else "close"
+            series_asc = indicator_engine.compute_indicator_values(
+                indicator, columns.column(price_field), columns.column("volume")
+            )
+            return SeriesAccessor.view(series_asc)
+
+        context.register(name, indicator_series)
 
     return context
 
 
-def build_functions(bars: list[models.DailyBar]):
-    bars_sorted = sorted(bars, key=lambda b: b.bar_date)
+class SeriesMemo:
+    def __init__(self):
+        self._values: dict[tuple, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: tuple, factory: Callable[[], Any]):
+        if key in self._values:
+            self.hits += 1
+            _record_memo_lookup(hit=True)
+            return self._values[key]
+        self.misses += 1
+        _record_memo_lookup(hit=False)
+        value = factory()
+        self._values[key] = value
+        return value
+
+    def stats(self) -> dict[str, Any]:
+        return _format_stats(self.hits, self.misses)
+
+
+_MEMO_TOTALS = {"hits": 0, "misses": 0}
+_MEMO_LOCK = threading.Lock()
+
+
+def _record_memo_lookup(hit: bool):
+    with _MEMO_LOCK:
+        _MEMO_TOTALS["hits" if hit else "misses"] += 1
+
+
+def _format_stats(hits: int, misses: int) -> dict[str, Any]:
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else None,
+    }
+
+
+def memo_stats() -> dict[str, Any]:
+    with _MEMO_LOCK:
+        return _format_stats(_MEMO_TOTALS["hits"], _MEMO_TOTALS["misses"])
+
+
+def reset_memo_stats():
+    with _MEMO_LOCK:
+        _MEMO_TOTALS["hits"] = 0
+        _MEMO_TOTALS["misses"] = 0
+
+
+def build_functions(
+    bars: list[models.DailyBar],
+    memo: SeriesMemo | None = None,
+    columns: BarColumns | None = None,
+):
+    columns = columns if columns is not None else BarColumns.from_bars(bars)
+    memo = memo if memo is not None else SeriesMemo()
+
+    def closes():
+        return columns.column("close")
+
+    def volumes():
+        return columns.column("volume")
+
+    def _indicator(name: str, period: float, compute: Callable[[], list]):
+        key = (name, "close", int(period))
+        return memo.get_or_compute(key, lambda: SeriesAccessor.view(compute()))
 
     def sma(period: float):
-        return SeriesAccessor(
-            list(
-                reversed(
-                    indicator_engine.compute_sma([bar.close for bar in bars_sorted], int(period))
-                )
-            )
+        return _indicator(
+            "SMA", period, lambda: indicator_engine.compute_sma(closes(), int(period))
         )
 
     def ema(period: float):
-        return SeriesAccessor(
-            list(
-                reversed(
-                    indicator_engine.compute_ema([bar.close for bar in bars_sorted], int(period))
-                )
-            )
+        return _indicator(
+            "EMA", period, lambda: indicator_engine.compute_ema(closes(), int(period))
         )
 
     def rsi(period: float):
-        return SeriesAccessor(
-            list(
-                reversed(
-                    indicator_engine.compute_rsi([bar.close for bar in bars_sorted], int(period))
-                )
-            )
+        return _indicator(
+            "RSI", period, lambda: indicator_engine.compute_rsi(closes(), int(period))
         )
 
     def vwap(period: float):
-        prices = [bar.close for bar in bars_sorted]
-        volumes = [bar.volume for bar in bars_sorted]
-        return SeriesAccessor(
-            list(reversed(indicator_engine.compute_vwap(prices, volumes, int(period))))
+        return _indicator(
+            "VWAP",
+            period,
+            lambda: indicator_engine.compute_vwap(closes(), volumes(), int(period)),
         )
 
     def highest(series: SeriesAccessor, period: float):
-        values = series.values[: int(period)]
-        values = [v for v in values if v is not None]
+        values = [v for v in series.window(int(period)) if v is not None]
         return max(values) if values else None
 
     def lowest(series: SeriesAccessor, period: float):
-        values = series.values[: int(period)]
-        values = [v for v in values if v is not None]
+        values = [v for v in series.window(int(period)) if v is not None]
         return min(values) if values else None
 
     def change(series: SeriesAccessor):
@@ -1,9 +1,11 @@
+import operator
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Callable
 
-from . import models
-from .rule_context import build_functions, build_series_context
-from .series import SeriesAccessor
+from . import indicator_engine, models
+from .rule_context import PRICE_FIELDS, build_functions, build_series_context
+from .series import BarColumns, SeriesAccessor
 
 
 @dataclass
@@ -324,6 +326,252 @@ def apply_comparison(op: str, left_node, right_node, evaluator: ExpressionEvalua
     raise ValueError(f"Unknown comparison: {op}")
 
 
+EXPRESSION_CACHE_SIZE = 1024
+
+_BINARY_OPS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+}
+
+_COMPARISON_OPS = {
+    ">": operator.gt,
+    "GT": operator.gt,
+    "ABOVE": operator.gt,
+    ">=": operator.ge,
+    "GTE": operator.ge,
+    "<": operator.lt,
+    "LT": operator.lt,
+    "BELOW": operator.lt,
+    "<=": operator.le,
+    "LTE": operator.le,
+    "==": operator.eq,
+    "EQ": operator.eq,
+    "!=": operator.ne,
+    "NE": operator.ne,
+}
+
+
+class EvaluationScope:
+    __slots__ = ("context", "functions")
+
+    def __init__(self, context: dict[str, Any], functions: dict[str, Callable]):
+        self.context = context
+        self.functions = functions
+
+
+class ExpressionCompiler:
+    def compile(self, node, preserve_series: bool = False):
+        kind = node[0]
+        if kind == "number":
+            return self._compile_number(node)
+        if kind == "ident":
+            return self._compile_ident(node, preserve_series)
+        if kind == "call":
+            return self._compile_call(node, preserve_series)
+        if kind == "index":
+            return self._compile_index(node)
+        if kind == "unary":
+            return self._compile_unary(node)
+        if kind == "bin":
+            return self._compile_binary(node)
+        if kind == "cmp":
+            return self._compile_comparison(node)
+        if kind == "and":
+            return self._compile_and(node)
+        if kind == "or":
+            return self._compile_or(node)
+        if kind == "not":
+            return self._compile_not(node)
+        raise ValueError(f"Unknown node: {node}")
+
+    def _compile_number(self, node):
+        value = node[1]
+
+        def number(scope, offset):
+            return value
+
+        return number
+
+    def _compile_ident(self, node, preserve_series: bool):
+        name = node[1]
+
+        if preserve_series:
+            def ident_series(scope, offset):
+                return scope.context.get(name)
+
+            return ident_series
+
+        def ident(scope, offset):
+            value = scope.context.get(name)
+            if isinstance(value, SeriesAccessor):
+                return value.value_at(offset)
+            return value
+
+        return ident
+
+    def _compile_call(self, node, preserve_series: bool):
+        name = node[1]
+        args = [self.compile(arg, preserve_series=True) for arg in node[2]]
+
+        def call(scope, offset):
+            values = [arg(scope, offset) for arg in args]
+            func = scope.functions.get(name)
+            if not func:
+                raise ValueError(f"Unknown function: {name}")
+            value = func(*values)
+            if not preserve_series and isinstance(value, SeriesAccessor):
+                return value.value_at(offset)
+            return value
+
+        return call
+
+    def _compile_index(self, node):
+        base = self.compile(node[1], preserve_series=True)
+
+        if node[2][0] == "number":
+            fixed = int(node[2][1])
+
+            def index_fixed(scope, offset):
+                series = base(scope, offset)
+                if not isinstance(series, SeriesAccessor):
+                    raise ValueError("Indexing requires a series")
+                return series.value_at(fixed + offset)
+
+            return index_fixed
+
+        index_fn = self.compile(node[2])
+
+        def index(scope, offset):
+            series = base(scope, offset)
+            if not isinstance(series, SeriesAccessor):
+                raise ValueError("Indexing requires a series")
+            return series.value_at(int(index_fn(scope, offset)) + offset)
+
+        return index
+
+    def _compile_unary(self, node):
+        operand = self.compile(node[2])
+        negate = node[1] != "+"
+
+        def unary(scope, offset):
+            value = operand(scope, offset)
+            if value is None:
+                return None
+            return -value if negate else value
+
+        return unary
+
+    def _compile_binary(self, node):
+        op = node[1]
+        left = self.compile(node[2])
+        right = self.compile(node[3])
+
+        if op == "/":
+            def divide(scope, offset):
+                lhs = left(scope, offset)
+                rhs = right(scope, offset)
+                if lhs is None or rhs is None:
+                    return None
+                if rhs == 0:
+                    raise ValueError("Division by zero")
+                return lhs / rhs
+
+            return divide
+
+        func = _BINARY_OPS.get(op)
+        if func is None:
+            raise ValueError(f"Unknown operator: {op}")
+
+        def binary(scope, offset):
+            lhs = left(scope, offset)
+            rhs = right(scope, offset)
+            if lhs is None or rhs is None:
+                return None
+            return func(lhs, rhs)
+
+        return binary
+
+    def _compile_comparison(self, node):
+        op = node[1]
+        op_upper = op.upper()
+        left = self.compile(node[2])
+        right = self.compile(node[3])
+
+        if op_upper in {"CROSSOVER", "CROSSUNDER"}:
+            crossover = op_upper == "CROSSOVER"
+
+            def cross(scope, offset):
+                left_now = left(scope, offset)
+                right_now = right(scope, offset)
+                left_prev = left(scope, offset + 1)
+                right_prev = right(scope, offset + 1)
+                if None in {left_now, right_now, left_prev, right_prev}:
+                    return False
+                if crossover:
+                    return left_now > right_now and left_prev <= right_prev
+                return left_now < right_now and left_prev >= right_prev
+
+            return cross
+
+        func = _COMPARISON_OPS.get(op_upper)
+
+        def compare(scope, offset):
+            lhs = left(scope, offset)
+            rhs = right(scope, offset)
+            if lhs is None or rhs is None:
+                return False
+            if func is None:
+                raise ValueError(f"Unknown comparison: {op}")
+            return func(lhs, rhs)
+
+        return compare
+
+    def _compile_and(self, node):
+        left = self.compile(node[1])
+        right = self.compile(node[2])
+
+        def and_(scope, offset):
+            return bool(left(scope, offset)) and bool(right(scope, offset))
+
+        return and_
+
+    def _compile_or(self, node):
+        left = self.compile(node[1])
+        right = self.compile(node[2])
+
+        def or_(scope, offset):
+            return bool(left(scope, offset)) or bool(right(scope, offset))
+
+        return or_
+
+    def _compile_not(self, node):
+        operand = self.compile(node[1])
+
+        def not_(scope, offset):
+            return not bool(operand(scope, offset))
+
+        return not_
+
+
+class CompiledExpression:
+    def __init__(self, source: str, tree):
+        self.source = source
+        self.tree = tree
+        self._fn = ExpressionCompiler().compile(tree)
+
+    def evaluate(
+        self,
+        context: dict[str, Any],
+        functions: dict[str, Callable],
+        offset: int = 0,
+    ):
+        return self._fn(EvaluationScope(context, functions), offset)
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r})"
+
+
 def parse_expression(expr: str):
     lexer = Lexer(expr)
     tokens = lexer.tokenize()
@@ -331,12 +579,559 @@ def parse_expression(expr: str):
     return parser.parse()
 
 
-def evaluate_expression(expr: str, context: dict[str, Any], functions: dict[str, Callable]):
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(expr: str, declared: frozenset[str] = frozenset()) -> CompiledExpression:
+    return CompiledExpression(expr, reorder_by_cost(parse_expression(expr), declared))
+
+
+PLAN_CACHE_SIZE = 256
+
+_MEMO_KINDS = frozenset({"call", "value", "index", "unary", "bin", "cmp", "cross", "and", "or", "not"})
+
+
+class PlanScope:
+    __slots__ = ("context", "functions", "graph", "memo")
+
+    def __init__(self, graph: "PlanGraph", context: dict[str, Any], functions: dict[str, Callable]):
+        self.graph = graph
+        self.context = context
+        self.functions = functions
+        self.memo: dict[tuple[int, int], Any] = {}
+
+    def value(self, node_id: int, offset: int):
+        key = (node_id, 0 if self.graph.invariant[node_id] else offset)
+        memo = self.memo
+        if key in memo:
+            return memo[key]
+        result = self.graph.fns[node_id](self, offset)
+        memo[key] = result
+        return result
+
+    def evaluate(self, expr: str):
+        error = self.graph.errors.get(expr)
+        if error is not None:
+            raise ValueError(error)
+        return self.graph.getters[self.graph.roots[expr]](self, 0)
+
+
+class PlanGraph:
+    def __init__(
+        self,
+        expressions: tuple[str, ...],
+        reorder: bool = True,
+        declared: frozenset[str] = frozenset(),
+    ):
+        self.keys: list[tuple] = []
+        self.invariant: list[bool] = []
+        self.roots: dict[str, int] = {}
+        self.errors: dict[str, str] = {}
+        self.tree_nodes = 0
+        self._index: dict[tuple, int] = {}
+        self._specs: list[tuple[Callable, tuple, tuple[int, ...]]] = []
+        for expr in expressions:
+            if expr in self.roots or expr in self.errors:
+                continue
+            try:
+                tree = parse_expression(expr)
+                self.roots[expr] = self._add(reorder_by_cost(tree, declared) if reorder else tree)
+            except ValueError as exc:
+                self.errors[expr] = str(exc)
+        self._link()
+
+    def scope(self, context: dict[str, Any], functions: dict[str, Callable]) -> PlanScope:
+        return PlanScope(self, context, functions)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "expressions": len(self.roots) + len(self.errors),
+            "tree_nodes": self.tree_nodes,
+            "dag_nodes": len(self.keys),
+            "deduplicated": self.tree_nodes - len(self.keys),
+            "memoized_nodes": sum(1 for memoized in self.memoized if memoized),
+        }
+
+    def _intern(
+        self,
+        key: tuple,
+        factory: Callable,
+        args: tuple = (),
+        children: tuple[int, ...] = (),
+        invariant: bool = False,
+    ) -> int:
+        self.tree_nodes += 1
+        node_id = self._index.get(key)
+        if node_id is None:
+            node_id = len(self.keys)
+            self._index[key] = node_id
+            self.keys.append(key)
+            self._specs.append((factory, args, children))
+            self.invariant.append(invariant)
+        return node_id
+
+    def _link(self):
+        references = [0] * len(self.keys)
+        for root in self.roots.values():
+            references[root] += 1
+        for _, _, children in self._specs:
+            for child in children:
+                references[child] += 1
+        self.memoized = [
+            key[0] == "call" or (references[node_id] > 1 and key[0] in _MEMO_KINDS)
+            for node_id, key in enumerate(self.keys)
+        ]
+        self.fns: list[Callable] = []
+        self.getters: list[Callable] = []
+        for node_id, (factory, args, children) in enumerate(self._specs):
+            fn = factory(*args, *(self.getters[child] for child in children))
+            self.fns.append(fn)
+            self.getters.append(_plan_memoized(node_id) if self.memoized[node_id] else fn)
+        del self._specs
+
+    def _add(self, node, preserve_series: bool = False) -> int:
+        kind = node[0]
+        if kind == "number":
+            return self._intern(("number", node[1]), _plan_number, (node[1],), invariant=True)
+        if kind in {"ident", "call"}:
+            series_id = self._add_series(node)
+            if preserve_series:
+                return series_id
+            return self._intern(("value", series_id), _plan_value, children=(series_id,))
+        if kind == "index":
+            base = self._add(node[1], preserve_series=True)
+            if node[2][0] == "number":
+                fixed = int(node[2][1])
+                return self._intern(("index", base, fixed), _plan_index_fixed, (fixed,), (base,))
+            index = self._add(node[2])
+            return self._intern(("index", base, ("node", index)), _plan_index, children=(base, index))
+        if kind == "unary":
+            operand = self._add(node[2])
+            negate = node[1] != "+"
+            return self._intern(("unary", negate, operand), _plan_unary, (negate,), (operand,))
+        if kind == "bin":
+            op = node[1]
+            if op != "/" and op not in _BINARY_OPS:
+                raise ValueError(f"Unknown operator: {op}")
+            children = (self._add(node[2]), self._add(node[3]))
+            return self._intern(("bin", op, *children), _plan_binary, (op,), children)
+        if kind == "cmp":
+            op = node[1]
+            op_upper = op.upper()
+            children = (self._add(node[2]), self._add(node[3]))
+            if op_upper in {"CROSSOVER", "CROSSUNDER"}:
+                crossover = op_upper == "CROSSOVER"
+                return self._intern(("cross", crossover, *children), _plan_cross, (crossover,), children)
+            func = _COMPARISON_OPS.get(op_upper)
+            return self._intern(("cmp", func or op, *children), _plan_compare, (op, func), children)
+        if kind in {"and", "or"}:
+            children = (self._add(node[1]), self._add(node[2]))
+            factory = _plan_and if kind == "and" else _plan_or
+            return self._intern((kind, *children), factory, children=children)
+        if kind == "not":
+            operand = self._add(node[1])
+            return self._intern(("not", operand), _plan_not, children=(operand,))
+        raise ValueError(f"Unknown node: {node}")
+
+    def _add_series(self, node) -> int:
+        name = node[1]
+        if node[0] == "ident":
+            return self._intern(("ident", name), _plan_ident, (name,), invariant=True)
+        args = tuple(self._add(arg, preserve_series=True) for arg in node[2])
+        invariant = all(self.invariant[arg] for arg in args)
+        return self._intern(("call", name, args), _plan_call, (name,), args, invariant)
+
+
+def _plan_memoized(node_id: int):
+    def memoized(scope, offset):
+        return scope.value(node_id, offset)
+
+    return memoized
+
+
+def _plan_number(value: float):
+    def number(scope, offset):
+        return value
+
+    return number
+
+
+def _plan_ident(name: str):
+    def ident(scope, offset):
+        return scope.context.get(name)
+
+    return ident
+
+
+def _plan_call(name: str, *args: Callable):
+    def call(scope, offset):
+        values = [arg(scope, offset) for arg in args]
+        func = scope.functions.get(name)
+        if not func:
+            raise ValueError(f"Unknown function: {name}")
+        return func(*values)
+
+    return call
+
+
+def _plan_value(series):
+    def value(scope, offset):
+        result = series(scope, offset)
+        if isinstance(result, SeriesAccessor):
+            return result.value_at(offset)
+        return result
+
+    return value
+
+
+def _plan_index_fixed(fixed: int, base):
+    def index_fixed(scope, offset):
+        series = base(scope, offset)
+        if not isinstance(series, SeriesAccessor):
+            raise ValueError("Indexing requires a series")
+        return series.value_at(fixed + offset)
+
+    return index_fixed
+
+
+def _plan_index(base, index_fn):
+    def index(scope, offset):
+        series = base(scope, offset)
+        if not isinstance(series, SeriesAccessor):
+            raise ValueError("Indexing requires a series")
+        return series.value_at(int(index_fn(scope, offset)) + offset)
+
+    return index
+
+
+def _plan_unary(negate: bool, operand):
+    def unary(scope, offset):
+        value = operand(scope, offset)
+        if value is None:
+            return None
+        return -value if negate else value
+
+    return unary
+
+
+def _plan_binary(op: str, left, right):
+    func = _BINARY_OPS.get(op)
+
+    def binary(scope, offset):
+        lhs = left(scope, offset)
+        rhs = right(scope, offset)
+        if lhs is None or rhs is None:
+            return None
+        if func is None:
+            if rhs == 0:
+                raise ValueError("Division by zero")
+            return lhs / rhs
+        return func(lhs, rhs)
+
+    return binary
+
+
+def _plan_cross(crossover: bool, left, right):
+    def cross(scope, offset):
+        left_now = left(scope, offset)
+        right_now = right(scope, offset)
+        left_prev = left(scope, offset + 1)
+        right_prev = right(scope, offset + 1)
+        if None in {left_now, right_now, left_prev, right_prev}:
+            return False
+        if crossover:
+            return left_now > right_now and left_prev <= right_prev
+        return left_now < right_now and left_prev >= right_prev
+
+    return cross
+
+
+def _plan_compare(op: str, func, left, right):
+    def compare(scope, offset):
+        lhs = left(scope, offset)
+        rhs = right(scope, offset)
+        if lhs is None or rhs is None:
+            return False
+        if func is None:
+            raise ValueError(f"Unknown comparison: {op}")
+        return func(lhs, rhs)
+
+    return compare
+
+
+def _plan_and(left, right):
+    def and_(scope, offset):
+        return bool(left(scope, offset)) and bool(right(scope, offset))
+
+    return and_
+
+
+def _plan_or(left, right):
+    def or_(scope, offset):
+        return bool(left(scope, offset)) or bool(right(scope, offset))
+
+    return or_
+
+
+def _plan_not(operand):
+    def not_(scope, offset):
+        return not bool(operand(scope, offset))
+
+    return not_
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_plan_expressions(
+    expressions: tuple[str, ...], declared: frozenset[str] = frozenset()
+) -> PlanGraph:
+    return PlanGraph(expressions, declared=declared)
+
+
+def compile_plan(rule_plan: dict) -> PlanGraph:
+    return compile_plan_expressions(
+        tuple(iter_plan_expressions(rule_plan)), declared_indicators(rule_plan)
+    )
+
+
+def declared_indicators(rule_plan: dict) -> frozenset[str]:
+    return frozenset(
+        f"ind.{indicator['id']}"
+        for indicator in rule_plan.get("indicators", [])
+        if isinstance(indicator, dict) and indicator.get("id")
+    )
+
+
+def iter_plan_expressions(rule_plan: dict):
+    for rule in rule_plan.get("entry_rules", []):
+        yield from rule.get("constraints_expr", [])
+        if rule.get("condition_expr"):
+            yield rule["condition_expr"]
+    for rule in rule_plan.get("exit_rules", {}).get("conditions", []):
+        if rule.get("condition_expr"):
+            yield rule["condition_expr"]
+
+
+def iter_plan_conditions(rule_plan: dict):
+    for rule in rule_plan.get("entry_rules", []):
+        yield from rule.get("constraints", [])
+        if rule.get("condition"):
+            yield rule["condition"]
+    for rule in rule_plan.get("exit_rules", {}).get("conditions", []):
+        if rule.get("condition"):
+            yield rule["condition"]
+
+
+def _collect_tree_references(node, names: set[str]):
+    if node[0] == "ident":
+        names.add(node[1])
+        return
+    if node[0] == "call":
+        for arg in node[2]:
+            _collect_tree_references(arg, names)
+        return
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            _collect_tree_references(child, names)
+
+
+def _collect_condition_references(condition: dict, names: set[str]):
+    if "all" in condition or "any" in condition:
+        for item in condition.get("all", condition.get("any", [])):
+            _collect_condition_references(item, names)
+        return
+    if "not" in condition:
+        _collect_condition_references(condition["not"], names)
+        return
+    for side in ("left", "right"):
+        operand = condition.get(side)
+        if isinstance(operand, str):
+            names.add(operand)
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def expression_references(expr: str) -> frozenset[str]:
+    names: set[str] = set()
+    _collect_tree_references(compile_expression(expr).tree, names)
+    return frozenset(names)
+
+
+def collect_references(rule_plan: dict) -> set[str]:
+    names: set[str] = set()
+    for expr in iter_plan_expressions(rule_plan):
+        names.update(expression_references(expr))
+    for condition in iter_plan_conditions(rule_plan):
+        _collect_condition_references(condition, names)
+    return names
+
+
+SERIES_FUNCTIONS = frozenset({"SMA", "EMA", "RSI", "VWAP"})
+
+REFERENCE_COST = 1.0
+INDICATOR_REFERENCE_COST = 50.0
+UNKNOWN_CALL_COST = 1000.0
+
+
+def _fixed_number(node) -> float | None:
+    return node[1] if node[0] == "number" else None
+
+
+def _is_series_reference(node, declared: frozenset[str]) -> bool:
+    if node[0] == "ident":
+        return node[1] in PRICE_FIELDS or node[1] in declared
+    if node[0] == "call" and node[1] in SERIES_FUNCTIONS and len(node[2]) == 1:
+        period = _fixed_number(node[2][0])
+        return period is not None and period > 0
+    return False
+
+
+def node_cost(node, declared: frozenset[str] = frozenset()) -> tuple[float, bool]:
+    kind = node[0]
+    if kind == "number":
+        return 0.0, True
+    if kind == "ident":
+        cost = INDICATOR_REFERENCE_COST if node[1].startswith("ind.") else REFERENCE_COST
+        return cost, True
+    if kind == "call":
+        name, args = node[1], node[2]
+        costs = [node_cost(arg, declared) for arg in args]
+        total = sum(cost for cost, _ in costs) + REFERENCE_COST
+        safe = all(arg_safe for _, arg_safe in costs)
+        if name in SERIES_FUNCTIONS:
+            if not _is_series_reference(node, declared):
+                return total + UNKNOWN_CALL_COST, False
+            return total + indicator_engine.indicator_lookback(name, int(args[0][1])), True
+        if name in {"highest", "lowest"} and len(args) == 2:
+            period = _fixed_number(args[1])
+            safe = safe and _is_series_reference(args[0], declared) and period is not None and period > 0
+            return total + (period or 0), safe
+        if name in {"change", "diff"}:
+            return total + REFERENCE_COST, safe
+        return total + UNKNOWN_CALL_COST, False
+    if kind == "index":
+        base_cost, _ = node_cost(node[1], declared)
+        if node[2][0] == "number":
+            return base_cost + REFERENCE_COST, _is_series_reference(node[1], declared)
+        index_cost, _ = node_cost(node[2], declared)
+        return base_cost + index_cost + REFERENCE_COST, False
+    if kind == "bin" and node[1] == "/":
+        (left_cost, left_safe), (right_cost, right_safe) = (
+            node_cost(node[2], declared),
+            node_cost(node[3], declared),
+        )
+        divisor = _fixed_number(node[3])
+        return left_cost + right_cost + REFERENCE_COST, left_safe and bool(divisor)
+    children = [node_cost(child, declared) for child in node[1:] if isinstance(child, tuple)]
+    cost = sum(child_cost for child_cost, _ in children) + REFERENCE_COST
+    if kind == "cmp" and node[1].upper() in {"CROSSOVER", "CROSSUNDER"}:
+        cost *= 2
+    return cost, all(safe for _, safe in children)
+
+
+def _flatten(node, kind: str) -> list:
+    if node[0] != kind:
+        return [node]
+    return _flatten(node[1], kind) + _flatten(node[2], kind)
+
+
+def reorder_by_cost(node, declared: frozenset[str] = frozenset()):
+    kind = node[0]
+    if kind in {"and", "or"}:
+        operands = [reorder_by_cost(operand, declared) for operand in _flatten(node, kind)]
+        ordered = []
+        run: list[tuple[float, int, Any]] = []
+        for position, operand in enumerate(operands):
+            cost, safe = node_cost(operand, declared)
+            if safe:
+                run.append((cost, position, operand))
+                continue
+            ordered.extend(item[2] for item in sorted(run, key=lambda item: item[:2]))
+            run = []
+            ordered.append(operand)
+        ordered.extend(item[2] for item in sorted(run, key=lambda item: item[:2]))
+        tree = ordered[0]
+        for operand in ordered[1:]:
+            tree = (kind, tree, operand)
+        return tree
+    if kind == "call":
+        return ("call", node[1], [reorder_by_cost(arg, declared) for arg in node[2]])
+    return tuple(reorder_by_cost(child, declared) if isinstance(child, tuple) else child for child in node)
+
+
+def _tree_lookback(node, offset: int, series_lookback: dict[str, int]) -> int | None:
+    kind = node[0]
+    if kind == "number":
+        return 0
+    if kind == "ident":
+        needed = series_lookback.get(node[1])
+        return offset + needed if needed else 0
+    if kind == "index":
+        if node[2][0] != "number":
+            return None
+        return _tree_lookback(node[1], offset + int(node[2][1]), series_lookback)
+    if kind == "call":
+        name, args = node[1], node[2]
+        if name in SERIES_FUNCTIONS:
+            if not args or args[0][0] != "number":
+                return None
+            return offset + indicator_engine.indicator_lookback(name, int(args[0][1]))
+        if name in {"highest", "lowest"}:
+            if len(args) != 2 or args[1][0] != "number":
+                return None
+            return _tree_lookback(args[0], max(int(args[1][1]) - 1, 0), series_lookback)
+        if name == "change" and len(args) == 1:
+            return _tree_lookback(args[0], 1, series_lookback)
+        if name == "diff" and len(args) == 2:
+            return _max_lookback(_tree_lookback(arg, 0, series_lookback) for arg in args)
+        return None
+    if kind == "cmp" and node[1].upper() in {"CROSSOVER", "CROSSUNDER"}:
+        return _max_lookback(
+            _tree_lookback(child, at, series_lookback)
+            for child in node[2:]
+            for at in (offset, offset + 1)
+        )
+    return _max_lookback(
+        _tree_lookback(child, offset, series_lookback)
+        for child in node[1:]
+        if isinstance(child, tuple)
+    )
+
+
+def _max_lookback(values) -> int | None:
+    result = 0
+    for value in values:
+        if value is None:
+            return None
+        result = max(result, value)
+    return result
+
+
+def plan_lookback(rule_plan: dict, indicators: list[models.IndicatorDef]) -> int | None:
+    series_lookback = {name: 1 for name in PRICE_FIELDS}
+    for indicator in indicators:
+        series_lookback[f"ind.{indicator.indicator_id}"] = indicator_engine.indicator_def_lookback(
+            indicator
+        )
+
+    needed = [
+        _tree_lookback(compile_expression(expr).tree, 0, series_lookback)
+        for expr in iter_plan_expressions(rule_plan)
+    ]
+    names: set[str] = set()
+    for condition in iter_plan_conditions(rule_plan):
+        _collect_condition_references(condition, names)
+    needed.extend(series_lookback.get(name, 0) for name in names)
+    result = _max_lookback(needed)
+    return None if result is None else max(result, 1)
+
+
+def interpret_expression(expr: str, context: dict[str, Any], functions: dict[str, Callable]):
     tree = parse_expression(expr)
     evaluator = ExpressionEvaluator(context, functions)
     return evaluator.eval(tree, offset=0)
 
 
+def evaluate_expression(expr: str, context: dict[str, Any], functions: dict[str, Callable]):
+    return compile_expression(expr).evaluate(context, functions)
+
+
 def evaluate_condition(condition: dict, lookup: Callable[[str], float | None]):
     if "all" in condition:
         return all(evaluate_condition(item, lookup) for item in condition["all"])
@@ -409,6 +1204,7 @@ def evaluate_rule_plan(
 
     entry_rules = rule_plan.get("entry_rules", [])
     exit_rules = rule_plan.get("exit_rules", {})
+    program = compile_plan(rule_plan).scope(context, functions)
 
     if position_state == "flat":
         matching_rules = []
@@ -421,13 +1217,13 @@ def evaluate_rule_plan(
                     break
             constraints_expr = rule.get("constraints_expr", [])
             for expr in constraints_expr:
-                if not evaluate_expression(expr, context, functions):
+                if not program.evaluate(expr):
                     constraints_ok = False
                     break
 
             expr = rule.get("condition_expr")
             if expr:
-                if constraints_ok and evaluate_expression(expr, context, functions):
+                if constraints_ok and program.evaluate(expr):
                     matching_rules.append(rule)
             else:
                 condition = rule.get("condition")
@@ -456,7 +1252,7 @@ def evaluate_rule_plan(
     for rule in exit_conditions:
         expr = rule.get("condition_expr")
         if expr:
-            if evaluate_expression(expr, context, functions):
+            if program.evaluate(expr):
                 triggered_ids.append(rule.get("id", "EXIT"))
         else:
             condition = rule.get("condition")
@@ -485,9 +1281,16 @@ def evaluate_with_bars(
     risk_context: dict[str, Any] | None = None,
     current_price: float | None = None,
 ):
-    context = build_series_context(bars, indicators, current_price=current_price)
+    columns = BarColumns.from_bars(bars)
+    context = build_series_context(
+        bars,
+        indicators,
+        current_price=current_price,
+        references=collect_references(rule_plan),
+        columns=columns,
+    )
     if risk_context:
         for key, value in risk_context.items():
             context[key] = value
-    functions = build_functions(bars)
+    functions = build_functions(bars, columns=columns)
     return evaluate_rule_plan(rule_plan, context, functions, position_state)
@@ -1,3 +1,4 @@
+import logging
 import os
 from datetime import datetime, time
 from zoneinfo import ZoneInfo
@@ -5,11 +6,19 @@ from zoneinfo import ZoneInfo
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 
-from .db import SessionLocal
-from .jobs import ingest_daily_bars, market_monitor, update_indicators
+from .audit_maintenance import run_audit_maintenance
+from .audit_writer import flush_audit_log, get_audit_writer
+from .batch_evaluation import evaluate_all, notify_changes
+from .db import SessionLocal, init_db
+from .ingestion import record_audit
 from .market_calendar import load_holidays
-from .market_data import TwelveDataClient
+from .market_data import TwelveDataClient, fetch_intraday_prices_concurrently
 from .models import Stock
+from .pipeline import run_daily_pipeline
+from .price_cache import get_price_cache
+from .rate_limit import PRIORITY_HIGH
+
+logger = logging.getLogger(__name__)
 
 
 def _market_interval_minutes() -> int:
@@ -21,6 +30,13 @@ def _daily_job_time() -> time:
     hour_str, minute_str = raw.split(":")
     return time(hour=int(hour_str), minute=int(minute_str))
 
+
+def _audit_maintenance_time() -> time:
+    raw = os.getenv("AUDIT_MAINTENANCE_TIME", "03:00")
+    hour_str, minute_str = raw.split(":")
+    return time(hour=int(hour_str), minute=int(minute_str))
+
+
 def _market_timezone() -> ZoneInfo:
     return ZoneInfo(os.getenv("MARKET_TZ", "America/New_York"))
 
@@ -42,35 +58,71 @@ def is_trading_day(now: datetime) -> bool:
     return True
 
 
+def _flush_audit_log():
+    try:
+        flush_audit_log()
+    except Exception:
+        logger.exception("Audit flush failed; pending events stay queued for retry")
+
+
 def run_market_monitor():
     now = datetime.now(_market_timezone())
     if not is_trading_day(now):
         return
-    client = TwelveDataClient()
-    with SessionLocal() as db:
-        stocks = db.query(Stock).filter(Stock.status == "active").all()
-        for stock in stocks:
-            if stock.market.upper() != "US":
-                continue
-            market_monitor(db, stock, client, position_state=stock.position_state)
+    try:
+        with SessionLocal() as db:
+            stocks = db.query(Stock).filter(Stock.status == "active").all()
+            stocks = [stock for stock in stocks if stock.market.upper() == "US"]
+            quote_error = None
+            try:
+                prices = fetch_intraday_prices_concurrently(
+                    [stock.ticker for stock in stocks],
+                    priority=PRIORITY_HIGH,
+                )
+            except Exception as exc:
+                prices = {}
+                quote_error = str(exc)
+            priced = []
+            for stock in stocks:
+                if prices.get(stock.ticker) is None:
+                    payload = {"ticker": stock.ticker}
+                    if quote_error:
+                        payload["error"] = quote_error
+                    record_audit(db, stock.id, "INTRADAY_PRICE_MISSING", payload)
+                    continue
+                priced.append(stock)
+            result = evaluate_all(db, priced, prices=prices)
+            notify_changes(db, priced, result)
+    finally:
+        _flush_audit_log()
+    get_price_cache().prune()
 
 
 def run_daily_job():
     now = datetime.now(_market_timezone())
     if not is_trading_day(now):
         return
-    client = TwelveDataClient()
+    client = TwelveDataClient(priority=PRIORITY_HIGH)
+    try:
+        with SessionLocal() as db:
+            stocks = db.query(Stock).filter(Stock.status == "active").all()
+            stocks = [stock for stock in stocks if stock.market.upper() == "US"]
+            report = run_daily_pipeline(db, stocks, client)
+    finally:
+        _flush_audit_log()
+    print(report.format())
+    return report
+
+
+def run_audit_maintenance_job():
     with SessionLocal() as db:
-        stocks = db.query(Stock).filter(Stock.status == "active").all()
-        for stock in stocks:
-            if stock.market.upper() != "US":
-                continue
-            ingest_daily_bars(db, stock, client)
-            update_indicators(db, stock)
-            market_monitor(db, stock, client, position_state=stock.position_state)
+        result = run_audit_maintenance(db)
+    print(f"Audit maintenance: {result}")
+    return result
 
 
 def start_scheduler():
+    init_db()
     scheduler = BlockingScheduler(timezone=_market_timezone())
     scheduler.add_job(run_market_monitor, "interval", minutes=_market_interval_minutes())
 
@@ -80,7 +132,16 @@ def start_scheduler():
         CronTrigger(hour=daily_time.hour, minute=daily_time.minute),
     )
 
-    scheduler.start()
+    maintenance_time = _audit_maintenance_time()
+    scheduler.add_job(
+        run_audit_maintenance_job,
+        CronTrigger(hour=maintenance_time.hour, minute=maintenance_time.minute),
+    )
+
+    try:
+        scheduler.start()
+    finally:
+        get_audit_writer().close()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,92 @@
+from array import array
+from typing import Sequence
+
+
 class SeriesAccessor:
+    __slots__ = ("_values", "_column", "_length", "_head")
+
     def __init__(self, values: list):
-        self.values = values
+        self._values = values
+        self._column = None
+        self._length = len(values)
+        self._head = None
+
+    @classmethod
+    def view(cls, column: Sequence, length: int | None = None, head: float | None = None):
+        accessor = cls.__new__(cls)
+        accessor._values = None
+        accessor._column = column
+        accessor._length = len(column) if length is None else length
+        accessor._head = head
+        return accessor
+
+    @property
+    def values(self) -> list:
+        if self._values is None:
+            self._values = [self.value_at(offset) for offset in range(self._length)]
+        return self._values
+
+    def __len__(self):
+        return self._length
 
     def value_at(self, offset: int):
         if offset < 0:
             return None
-        if offset >= len(self.values):
+        if offset >= self._length:
+            return None
+        if self._column is None:
+            return self._values[offset]
+        if offset == 0 and self._head is not None:
+            return self._head
+        value = self._column[self._length - 1 - offset]
+        if value != value:
             return None
-        return self.values[offset]
+        return value
+
+    def window(self, count: int) -> list:
+        count = min(max(count, 0), self._length)
+        if self._column is None:
+            return self._values[:count]
+        if count == 0:
+            return []
+        values = list(reversed(self._column[self._length - count : self._length]))
+        if self._head is not None:
+            values[0] = self._head
+        return [None if value != value else value for value in values]
+
+
+class BarColumns:
+    FIELDS = ("open", "high", "low", "close", "adjusted_close", "volume")
+
+    def __init__(self, bars_sorted: list):
+        self._bars = bars_sorted
+        self._columns: dict[str, array] = {}
+        self.dates = [bar.bar_date for bar in bars_sorted]
+
+    @classmethod
+    def from_bars(cls, bars: list):
+        return cls(sorted(bars, key=lambda b: b.bar_date))
+
+    def __len__(self):
+        return len(self._bars)
+
+    def column(self, field: str) -> array:
+        if field not in self.FIELDS:
+            raise ValueError(f"Unknown bar field: {field}")
+        if field not in self._columns:
+            self._columns[field] = _to_array(self._field_values(field))
+        return self._columns[field]
+
+    def series(self, field: str, head: float | None = None) -> SeriesAccessor:
+        return SeriesAccessor.view(self.column(field), head=head)
+
+    def _field_values(self, field: str) -> list:
+        if field == "adjusted_close":
+            return [bar.adjusted_close or bar.close for bar in self._bars]
+        return [getattr(bar, field) for bar in self._bars]
+
+
+def _to_array(values: list) -> array:
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        return array("q", values)
+    return array("d", (float("nan") if value is None else value for value in values))
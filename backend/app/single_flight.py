@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable, Iterable
+
+_MISSING = object()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable):
+        results = self.do_many([key], lambda keys: {key: fn()})
+        if key in results:
+            return results[key]
+        return fn()
+
+    def do_many(self, keys: Iterable[Hashable], fn: Callable[[list], dict]) -> dict:
+        owned: dict[Hashable, Future] = {}
+        joined: dict[Hashable, Future] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._calls.get(key)
+                if future is None:
+                    future = Future()
+                    self._calls[key] = future
+                    owned[key] = future
+                else:
+                    joined[key] = future
+            self.leaders += bool(owned)
+            self.coalesced += len(joined)
+
+        results: dict = {}
+        if owned:
+            try:
+                fetched = fn(list(owned))
+            except BaseException as exc:
+                for future in owned.values():
+                    future.set_exception(exc)
+                raise
+            else:
+                for key, future in owned.items():
+                    future.set_result(fetched.get(key, _MISSING))
+                    if key in fetched:
+                        results[key] = fetched[key]
+            finally:
+                with self._lock:
+                    for key, future in owned.items():
+                        if self._calls.get(key) is future:
+                            del self._calls[key]
+
+        for key, future in joined.items():
+            value = future.result()
+            if value is not _MISSING:
+                results[key] = value
+        return results
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
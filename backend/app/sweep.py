@@ -0,0 +1,228 @@
+import copy
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date
+from multiprocessing import shared_memory
+from typing import Any, Iterator
+
+import numpy as np
+
+from .backtest import (
+    BacktestData,
+    plan_signals,
+    simulate,
+    summarize,
+    warm_series,
+)
+from .crud import indicator_defs_from_plan
+
+DEFAULT_METRIC = "total_return"
+LOWER_IS_BETTER = frozenset({"losses"})
+
+
+def _sweep_workers() -> int | None:
+    raw = os.getenv("SWEEP_WORKERS")
+    return int(raw) if raw else None
+
+
+@dataclass
+class SweepResult:
+    index: int
+    params: dict
+    summary: dict | None = None
+    error: str | None = None
+
+    def metric(self, name: str) -> float | None:
+        if self.summary is None:
+            return None
+        return self.summary.get(name)
+
+    def as_dict(self, metric: str | None = None) -> dict:
+        payload = {"index": self.index, "params": self.params}
+        if metric is not None:
+            payload["metric"] = self.metric(metric)
+        if self.error is not None:
+            payload["error"] = self.error
+        else:
+            payload["summary"] = self.summary
+        return payload
+
+
+def _set_path(plan: dict, path: str, value: Any):
+    parts = path.split(".")
+    target = plan
+    for part in parts[:-1]:
+        target = target[int(part)] if isinstance(target, list) else target[part]
+    last = parts[-1]
+    if isinstance(target, list):
+        target[int(last)] = value
+    else:
+        if last not in target:
+            raise ValueError(f"Unknown plan path: {path}")
+        target[last] = value
+
+
+def _fill_placeholders(node, values: dict[str, Any]):
+    if isinstance(node, str):
+        if node.startswith("{") and node.endswith("}") and node[1:-1] in values:
+            return values[node[1:-1]]
+        for name, value in values.items():
+            node = node.replace(f"{{{name}}}", str(value))
+        return node
+    if isinstance(node, list):
+        return [_fill_placeholders(item, values) for item in node]
+    if isinstance(node, dict):
+        return {key: _fill_placeholders(item, values) for key, item in node.items()}
+    return node
+
+
+def apply_params(base_plan: dict, params: dict[str, Any]) -> dict:
+    placeholders = {name: value for name, value in params.items() if "." not in name}
+    plan = _fill_placeholders(base_plan, placeholders) if placeholders else copy.deepcopy(base_plan)
+    for path, value in params.items():
+        if "." in path:
+            try:
+                _set_path(plan, path, value)
+            except (KeyError, IndexError) as exc:
+                raise ValueError(f"Unknown plan path: {path}") from exc
+    return plan
+
+
+def expand_grid(grid: dict[str, list]) -> list[dict[str, Any]]:
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def rank_results(
+    results: list[SweepResult], metric: str = DEFAULT_METRIC, descending: bool | None = None
+) -> list[SweepResult]:
+    if descending is None:
+        descending = metric not in LOWER_IS_BETTER
+    sign = -1.0 if descending else 1.0
+
+    def key(result: SweepResult):
+        value = result.metric(metric)
+        return (value is None, sign * (value or 0.0), result.index)
+
+    return sorted(results, key=key)
+
+
+def evaluate_variant(
+    data: BacktestData, base_plan: dict, index: int, params: dict, start_index: int = 0
+) -> SweepResult:
+    try:
+        plan = apply_params(base_plan, params)
+        variant = data.with_indicators(indicator_defs_from_plan(plan))
+        signals = plan_signals(plan, variant)
+        trades, equity = simulate(plan, variant, signals, start_index)
+    except (ValueError, KeyError, TypeError) as exc:
+        return SweepResult(index, params, error=str(exc))
+    return SweepResult(index, params, summarize(trades, equity, variant, start_index))
+
+
+def prepare_shared_data(
+    data: BacktestData, base_plan: dict, variants: list[dict]
+) -> BacktestData:
+    for params in variants:
+        try:
+            plan = apply_params(base_plan, params)
+            warm_series(plan, data.with_indicators(indicator_defs_from_plan(plan)))
+        except (ValueError, KeyError, TypeError):
+            continue
+    return data
+
+
+_WORKER: dict[str, Any] = {}
+
+
+def _attach_worker(
+    name: str, layout: list, length: int, dates: list[date], base_plan: dict, start_index: int
+):
+    block = shared_memory.SharedMemory(name=name)
+    matrix = np.ndarray((len(layout), length), dtype=float, buffer=block.buf)
+    columns = {}
+    series = {}
+    for row, (kind, key) in enumerate(layout):
+        view = matrix[row]
+        view.flags.writeable = False
+        if kind == "column":
+            columns[key] = view
+        else:
+            series[key] = view
+    data = BacktestData(dates, columns)
+    data.series_cache.update(series)
+    _WORKER.update(block=block, data=data, base_plan=base_plan, start_index=start_index)
+
+
+def _run_worker_batch(batch: list[tuple[int, dict]]) -> list[SweepResult]:
+    return [
+        evaluate_variant(_WORKER["data"], _WORKER["base_plan"], index, params, _WORKER["start_index"])
+        for index, params in batch
+    ]
+
+
+def _share(data: BacktestData):
+    layout = [("column", field) for field in data.columns]
+    layout += [("series", key) for key in data.series_cache]
+    length = len(data)
+    block = shared_memory.SharedMemory(create=True, size=max(len(layout) * length * 8, 8))
+    matrix = np.ndarray((len(layout), length), dtype=float, buffer=block.buf)
+    for row, (kind, key) in enumerate(layout):
+        matrix[row] = data.columns[key] if kind == "column" else data.series_cache[key]
+    return block, layout
+
+
+def iter_sweep(
+    data: BacktestData,
+    base_plan: dict,
+    grid: dict[str, list],
+    start: date | None = None,
+    workers: int | None = None,
+) -> Iterator[SweepResult]:
+    variants = expand_grid(grid)
+    start_index = 0
+    if start is not None:
+        start_index = next((idx for idx, day in enumerate(data.dates) if day >= start), len(data))
+    prepare_shared_data(data, base_plan, variants)
+
+    workers = workers if workers is not None else _sweep_workers()
+    if workers == 1:
+        for index, params in enumerate(variants):
+            yield evaluate_variant(data, base_plan, index, params, start_index)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    block, layout = _share(data)
+    pool = None
+    try:
+        pool = ProcessPoolExecutor(
+            workers,
+            initializer=_attach_worker,
+            initargs=(block.name, layout, len(data), data.dates, base_plan, start_index),
+        )
+        indexed = list(enumerate(variants))
+        batch_size = max(1, len(indexed) // (workers * 4))
+        futures = [
+            pool.submit(_run_worker_batch, indexed[offset : offset + batch_size])
+            for offset in range(0, len(indexed), batch_size)
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        block.close()
+        block.unlink()
+
+
+def run_sweep(
+    data: BacktestData,
+    base_plan: dict,
+    grid: dict[str, list],
+    metric: str = DEFAULT_METRIC,
+    start: date | None = None,
+    workers: int | None = None,
+) -> list[SweepResult]:
+    return rank_results(list(iter_sweep(data, base_plan, grid, start, workers)), metric)
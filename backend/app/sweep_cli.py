@@ -0,0 +1,130 @@
+import argparse
+import json
+import time
+from datetime import date
+from pathlib import Path
+
+from . import crud, models
+from .backtest import load_backtest_data
+from .db import SessionLocal
+from .sweep import DEFAULT_METRIC, iter_sweep, rank_results
+
+
+def _pct(value: float | None) -> str:
+    return "-" if value is None else f"{value * 100:.2f}%"
+
+
+def _parse_value(raw: str):
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return raw
+
+
+def _parse_param(raw: str) -> tuple[str, list]:
+    name, sep, values = raw.partition("=")
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError(f"Expected name=v1,v2,... got {raw!r}")
+    return name.strip(), [_parse_value(item.strip()) for item in values.split(",") if item.strip()]
+
+
+def _metric(value) -> str:
+    return f"{value:.4f}" if isinstance(value, float) else str(value)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Sweep rule plan parameters over stored daily bars and rank the variants."
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--stock-id", type=int)
+    target.add_argument("--ticker")
+    parser.add_argument("--plan", help="Base rule plan JSON file (defaults to the active plan)")
+    parser.add_argument("--grid", help="JSON file mapping parameter names to lists of values")
+    parser.add_argument(
+        "--param",
+        action="append",
+        type=_parse_param,
+        default=[],
+        help="Parameter values as name=v1,v2 ({name} placeholder or dotted plan path)",
+    )
+    parser.add_argument("--metric", default=DEFAULT_METRIC, help="Summary field to rank by")
+    order = parser.add_mutually_exclusive_group()
+    order.add_argument(
+        "--ascending", dest="descending", action="store_false", help="Rank lowest metric first"
+    )
+    order.add_argument(
+        "--descending", dest="descending", action="store_true", help="Rank highest metric first"
+    )
+    parser.set_defaults(descending=None)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--workers", type=int, help="Worker processes (1 runs in-process)")
+    parser.add_argument("--start", type=date.fromisoformat, help="First trading date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last bar date (YYYY-MM-DD)")
+    parser.add_argument("--jsonl", action="store_true", help="Stream every result as a JSON line")
+    args = parser.parse_args(argv)
+
+    grid: dict[str, list] = {}
+    if args.grid:
+        grid.update(json.loads(Path(args.grid).read_text(encoding="utf-8")))
+    grid.update(dict(args.param))
+    if not grid:
+        parser.error("Provide --grid or at least one --param")
+
+    rule_plan = None
+    if args.plan:
+        rule_plan = json.loads(Path(args.plan).read_text(encoding="utf-8"))
+
+    with SessionLocal() as db:
+        query = db.query(models.Stock)
+        if args.stock_id is not None:
+            stock = query.filter(models.Stock.id == args.stock_id).first()
+        else:
+            stock = query.filter(models.Stock.ticker == args.ticker.upper()).first()
+        if stock is None:
+            print("Stock not found")
+            return 1
+        if rule_plan is None:
+            plan = crud.get_active_rule_plan(db, stock.id)
+            if plan is None:
+                print("No active rule plan")
+                return 1
+            rule_plan = json.loads(plan.rules_json)
+        try:
+            data = load_backtest_data(db, stock.id, rule_plan, args.end)
+        except ValueError as exc:
+            print(f"Sweep failed: {exc}")
+            return 1
+
+    started = time.perf_counter()
+    results = []
+    try:
+        for result in iter_sweep(data, rule_plan, grid, start=args.start, workers=args.workers):
+            results.append(result)
+            if args.jsonl:
+                print(json.dumps(result.as_dict(args.metric)), flush=True)
+    except RuntimeError as exc:
+        print(f"Sweep failed: {exc}")
+        return 1
+    elapsed = time.perf_counter() - started
+    if args.jsonl:
+        return 0
+
+    ranked = rank_results(results, args.metric, args.descending)
+    failed = sum(1 for result in results if result.error is not None)
+    print(f"{stock.ticker}: {len(results)} variants over {len(data)} bars ({elapsed:.3f}s, {failed} failed)")
+    for position, result in enumerate(ranked[: args.top], start=1):
+        if result.error is not None:
+            print(f"  {position:>3}. error {result.error}  {json.dumps(result.params)}")
+            continue
+        summary = result.summary
+        print(
+            f"  {position:>3}. {args.metric}={_metric(result.metric(args.metric)):<10} "
+            f"return {_pct(summary['total_return'])} trades {summary['trades']} "
+            f"drawdown {_pct(summary['max_drawdown'])}  {json.dumps(result.params)}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
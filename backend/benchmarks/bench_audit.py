@@ -0,0 +1,118 @@
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.audit_maintenance import compact_audit_logs
+from app.db import Base
+
+EVENTS = [
+    ("INTRADAY_PRICE_FETCHED", 60),
+    ("RULE_EVALUATED", 30),
+    ("DAILY_BARS_INGESTED", 5),
+    ("INDICATORS_COMPUTED", 4),
+    ("APNS_SENT", 1),
+]
+
+
+def populate(engine, rows: int, stocks: int, days: int, start: datetime):
+    rng = random.Random(7)
+    names = [name for name, _ in EVENTS]
+    weights = [weight for _, weight in EVENTS]
+    span = days * 86400
+    table = models.AuditLog.__table__
+    with engine.begin() as connection:
+        for offset in range(0, rows, 50_000):
+            batch = []
+            for _ in range(min(50_000, rows - offset)):
+                batch.append(
+                    {
+                        "timestamp": start + timedelta(seconds=rng.randrange(span)),
+                        "stock_id": rng.randint(1, stocks),
+                        "event_type": rng.choices(names, weights)[0],
+                        "payload_json": '{"price": 100.0}',
+                    }
+                )
+            connection.execute(insert(table), batch)
+
+
+def time_queries(engine, stock_id: int, since: datetime, repeat: int) -> tuple[float, float]:
+    table = models.AuditLog.__table__
+    by_stock = (
+        select(table.c.id)
+        .where(table.c.stock_id == stock_id)
+        .order_by(table.c.timestamp.desc())
+        .limit(100)
+    )
+    by_type = select(table.c.id).where(
+        table.c.event_type == "DAILY_BARS_INGESTED", table.c.timestamp >= since
+    )
+    results = []
+    with engine.connect() as connection:
+        for statement in (by_stock, by_type):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                connection.execute(statement).all()
+            results.append((time.perf_counter() - start) / repeat)
+    return results[0], results[1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Audit log queries with/without indexes and compaction.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--stocks", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime(2024, 6, 1)
+    start = now - timedelta(days=args.days)
+    since = now - timedelta(days=7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'audit.db'}")
+        Base.metadata.create_all(bind=engine)
+        for index in models.AuditLog.__table__.indexes:
+            index.drop(bind=engine)
+
+        begin = time.perf_counter()
+        populate(engine, args.rows, args.stocks, args.days, start)
+        print(f"{args.rows} audit rows, {args.stocks} stocks, {args.days} days")
+        print(f"{'populate':<34} {time.perf_counter() - begin:8.2f}s")
+
+        stock_plain, type_plain = time_queries(engine, 42, since, args.repeat)
+
+        begin = time.perf_counter()
+        for index in models.AuditLog.__table__.indexes:
+            index.create(bind=engine)
+        print(f"{'create indexes':<34} {time.perf_counter() - begin:8.2f}s")
+
+        stock_indexed, type_indexed = time_queries(engine, 42, since, args.repeat)
+        print(f"{'stock by time (no index)':<34} {stock_plain * 1000:8.2f}ms")
+        print(f"{'stock by time (indexed)':<34} {stock_indexed * 1000:8.2f}ms")
+        print(f"{'event type since T (no index)':<34} {type_plain * 1000:8.2f}ms")
+        print(f"{'event type since T (indexed)':<34} {type_indexed * 1000:8.2f}ms")
+
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with SessionLocal() as db:
+            begin = time.perf_counter()
+            result = compact_audit_logs(db, now=now, after_days=2)
+            elapsed = time.perf_counter() - begin
+        with engine.connect() as connection:
+            remaining = connection.execute(select(models.AuditLog.__table__.c.id)).all()
+        print(f"{'compaction':<34} {elapsed:8.2f}s")
+        print(
+            f"  {result['compacted']} rows -> {result['summaries']} summaries, "
+            f"{len(remaining)} rows remain"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,40 @@
+import argparse
+import time
+
+from app import rule_engine
+from app.backtest import BacktestData, run_backtest
+from app.crud import indicator_defs_from_plan
+
+from .synthetic import load_example_plan, make_bars
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Vectorized backtest vs per-bar re-evaluation.")
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--sample", type=int, default=200, help="Bars to time for the per-bar loop")
+    args = parser.parse_args()
+
+    plan = load_example_plan()
+    bars = make_bars(252 * args.years)
+    indicators = indicator_defs_from_plan(plan)
+
+    start = time.perf_counter()
+    data = BacktestData.from_bars(bars, indicators)
+    result = run_backtest(plan, data)
+    vectorized = time.perf_counter() - start
+
+    sample = min(args.sample, len(bars))
+    start = time.perf_counter()
+    for idx in range(len(bars) - sample, len(bars)):
+        rule_engine.evaluate_with_bars(plan, bars[: idx + 1], indicators, "flat")
+    per_bar = (time.perf_counter() - start) / sample
+
+    summary = result.summary
+    print(f"{len(bars)} bars ({args.years} years), {summary['trades']} trades")
+    print(f"{'vectorized backtest':<28} {vectorized:8.3f}s")
+    print(f"{'per-bar evaluate (est.)':<28} {per_bar * len(bars):8.3f}s  ({per_bar * 1000:.2f} ms/bar)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+from app import models, rule_engine
+from app.rule_context import build_functions, build_series_context
+
+from .synthetic import load_example_plan, make_bars
+
+
+def wide_indicator_defs(count: int) -> list[models.IndicatorDef]:
+    defs = []
+    for idx in range(count):
+        period = 5 + idx * 10
+        indicator_type, params = [
+            ("MA", {"ma_type": "SMA", "period": period}),
+            ("MA", {"ma_type": "EMA", "period": period}),
+            ("RSI", {"period": period}),
+            ("VWAP", {"period": period}),
+        ][idx % 4]
+        defs.append(
+            models.IndicatorDef(
+                stock_id=1,
+                rule_plan_id=1,
+                indicator_id=f"ind{idx}",
+                indicator_type=indicator_type,
+                params_json=json.dumps(params),
+                timeframe="1D",
+                price_field="close",
+                use_eod_only=True,
+            )
+        )
+    return defs
+
+
+def evaluate_eager(plan, bars, indicators):
+    context = build_series_context(bars, indicators)
+    for name in list(context):
+        context[name]
+    functions = build_functions(bars)
+    return rule_engine.evaluate_rule_plan(plan, context, functions, "flat")
+
+
+def evaluate_lazy(plan, bars, indicators):
+    return rule_engine.evaluate_with_bars(plan, bars, indicators, "flat")
+
+
+def measure(label: str, func, iterations: int):
+    func()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = (time.perf_counter() - start) / iterations * 1000
+    print(f"{label:<6} {elapsed:8.2f} ms/eval  peak {peak / 1024:8.1f} KiB")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Eager vs lazy series context construction.")
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--indicators", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    plan = load_example_plan()
+    bars = make_bars(args.bars)
+    indicators = wide_indicator_defs(args.indicators)
+    print(
+        f"{args.bars} bars, {args.indicators} declared indicators, "
+        f"referenced: {sorted(rule_engine.collect_references(plan))}"
+    )
+
+    eager = measure("eager", lambda: evaluate_eager(plan, bars, indicators), args.iterations)
+    lazy = measure("lazy", lambda: evaluate_lazy(plan, bars, indicators), args.iterations)
+    print(f"speedup {eager / lazy:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
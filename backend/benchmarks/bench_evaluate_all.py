@@ -0,0 +1,64 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, ingestion, jobs, models, notifications, schemas
+from app.audit_writer import flush_audit_log
+from app.batch_evaluation import evaluate_all
+from app.db import Base
+
+from .synthetic import load_example_plan, make_bar_rows
+
+
+def seed(path: Path, tickers: int, bars: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    plan = load_example_plan()
+    with SessionLocal() as db:
+        for idx in range(tickers):
+            stock = models.Stock(ticker=f"SYN{idx:04d}", market="US", currency="USD")
+            db.add(stock)
+            db.commit()
+            crud.create_rule_plan(db, stock, schemas.RulePlanCreate(version=1, is_active=True, rules=plan))
+            ingestion.upsert_daily_bars(db, stock.id, make_bar_rows(bars, seed=idx), source="synthetic")
+    return engine, SessionLocal
+
+
+def per_stock(db, prices: dict[str, float]):
+    for stock in db.query(models.Stock).all():
+        jobs.market_monitor(db, stock, None, stock.position_state, price=prices[stock.ticker])
+    flush_audit_log()
+
+
+def batched(db, prices: dict[str, float]):
+    evaluate_all(db, prices=prices)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-stock evaluate_rules vs one batched pass.")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--bars", type=int, default=300)
+    args = parser.parse_args()
+
+    notifications.send_decision_change = lambda db, stock, payload: None
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, run in (("per-stock evaluate_rules", per_stock), ("batched evaluate_all", batched)):
+            engine, SessionLocal = seed(Path(tmp) / f"{run.__name__}.db", args.tickers, args.bars)
+            statements = []
+            event.listen(engine, "before_cursor_execute", lambda *a: statements.append(1))
+            prices = {f"SYN{idx:04d}": 100.0 for idx in range(args.tickers)}
+            with SessionLocal() as db:
+                start = time.perf_counter()
+                run(db, prices)
+                elapsed = time.perf_counter() - start
+            print(f"{label:<26} {elapsed:8.3f}s  {len(statements):>6} statements")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
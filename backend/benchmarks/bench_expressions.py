@@ -0,0 +1,90 @@
+import argparse
+import time
+
+from app import rule_engine
+from app.crud import indicator_defs_from_plan
+from app.rule_context import build_functions, build_series_context
+
+from .synthetic import load_example_plan, make_bars
+
+SPEC_EXPRESSIONS = [
+    "Close[1]",
+    "(Close[0] / Close[5] - 1) * 100",
+    "RSI(14)[0] gt RSI(14)[1]",
+    "SMA(5)[0] gt SMA(20)[0] AND SMA(5)[1] lte SMA(20)[1]",
+    "Volume[0] gt Volume[1] * 1.5",
+    "(Volume / Volume[1] - 1) * 100 > 50",
+]
+
+
+def precomputed(functions: dict) -> dict:
+    cache: dict = {}
+
+    def wrap(name, func):
+        def cached(*args):
+            key = (name, *args)
+            if key not in cache:
+                cache[key] = func(*args)
+            return cache[key]
+
+        return cached
+
+    return {name: wrap(name, func) for name, func in functions.items()}
+
+
+def timed(label: str, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / iterations * 1_000_000
+    print(f"{label:<12} {iterations:>7} runs  {elapsed:8.3f}s  {per_call:9.2f} us/run")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Interpreted vs compiled rule expressions.")
+    parser.add_argument("--bars", type=int, default=300)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    plan = load_example_plan()
+    bars = make_bars(args.bars)
+    context = build_series_context(bars, indicator_defs_from_plan(plan, stock_id=1, rule_plan_id=1))
+    functions = precomputed(build_functions(bars))
+    expressions = list(rule_engine.iter_plan_expressions(plan)) + SPEC_EXPRESSIONS
+
+    for expr in expressions:
+        interpreted = rule_engine.interpret_expression(expr, context, functions)
+        compiled = rule_engine.evaluate_expression(expr, context, functions)
+        if interpreted != compiled:
+            raise SystemExit(f"Mismatch for {expr!r}: {interpreted} != {compiled}")
+
+    print(f"{len(expressions)} expressions, {args.bars} bars (indicator series precomputed)")
+
+    def run_interpreted():
+        for expr in expressions:
+            rule_engine.interpret_expression(expr, context, functions)
+
+    def run_compiled():
+        for expr in expressions:
+            rule_engine.evaluate_expression(expr, context, functions)
+
+    graph = rule_engine.compile_plan_expressions(tuple(expressions))
+
+    def run_plan():
+        scope = graph.scope(context, functions)
+        for expr in expressions:
+            scope.evaluate(expr)
+
+    baseline = timed("interpreted", run_interpreted, args.iterations)
+    optimized = timed("compiled", run_compiled, args.iterations)
+    shared = timed("plan dag", run_plan, args.iterations)
+    print(f"speedup      {baseline / optimized:.1f}x compiled, {baseline / shared:.1f}x plan dag")
+    print(f"plan dag     {graph.stats()}")
+    print(f"cache        {rule_engine.compile_expression.cache_info()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
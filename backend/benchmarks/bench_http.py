@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import time
+
+import requests
+
+from app.market_data import AsyncTwelveDataClient, TwelveDataClient
+from app.rate_limit import CreditRateLimiter
+from tests.twelvedata_stub import TwelveDataStub
+
+
+class FreshConnectionSession:
+    def get(self, *args, **kwargs):
+        return requests.get(*args, **kwargs)
+
+
+def client_kwargs(stub: TwelveDataStub) -> dict:
+    return {
+        "api_key": "bench",
+        "base_url": stub.base_url,
+        "limiter": CreditRateLimiter(per_minute=100000, per_day=10000000),
+    }
+
+
+def run(label: str, stub: TwelveDataStub, fetch) -> float:
+    stub.connections = 0
+    start = time.perf_counter()
+    prices = fetch()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.2f}s  connections={stub.connections:<4} prices={len(prices)}")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Twelve Data client latency against a stub server.")
+    parser.add_argument("--symbols", type=int, default=40)
+    parser.add_argument("--chunk-size", type=int, default=1)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--connect-delay", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    symbols = [f"SYM{index:03d}" for index in range(args.symbols)]
+    prices = {symbol: 100.0 + index for index, symbol in enumerate(symbols)}
+
+    async def fetch_async(stub):
+        async with AsyncTwelveDataClient(
+            **client_kwargs(stub), max_concurrency=args.concurrency
+        ) as client:
+            return await client.fetch_intraday_prices(symbols, args.chunk_size)
+
+    with TwelveDataStub(prices, delay=args.delay, connect_delay=args.connect_delay) as stub:
+        fresh = TwelveDataClient(**client_kwargs(stub), session=FreshConnectionSession())
+        pooled = TwelveDataClient(**client_kwargs(stub), session=requests.Session())
+        baseline = run(
+            "requests.get per call",
+            stub,
+            lambda: fresh.fetch_intraday_prices(symbols, args.chunk_size),
+        )
+        pooled_elapsed = run(
+            "pooled session",
+            stub,
+            lambda: pooled.fetch_intraday_prices(symbols, args.chunk_size),
+        )
+        async_elapsed = run(
+            f"async x{args.concurrency}",
+            stub,
+            lambda: asyncio.run(fetch_async(stub)),
+        )
+
+    print(f"pooled speedup: {baseline / pooled_elapsed:.1f}x")
+    print(f"async speedup:  {baseline / async_elapsed:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
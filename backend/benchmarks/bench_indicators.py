@@ -0,0 +1,74 @@
+import argparse
+import time
+from array import array
+
+from app import indicator_engine
+
+from .synthetic import make_bar_rows
+
+SIZES = (100, 5_000, 50_000)
+
+
+def max_relative_error(expected: list, actual: list) -> float:
+    worst = 0.0
+    for left, right in zip(expected, actual):
+        if (left is None) != (right is None):
+            return float("inf")
+        if left is not None:
+            worst = max(worst, abs(left - right) / max(1.0, abs(left)))
+    return worst
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def cases(closes: array, volumes: array, period: int):
+    engine = indicator_engine
+    return [
+        ("SMA", lambda: engine._compute_sma_python(closes, period), lambda: engine._compute_sma_numpy(closes, period)),
+        ("EMA", lambda: engine._compute_ema_python(closes, period), lambda: engine._compute_ema_numpy(closes, period)),
+        ("RSI", lambda: engine._compute_rsi_python(closes, period), lambda: engine._compute_rsi_numpy(closes, period)),
+        (
+            "VWAP",
+            lambda: engine._compute_vwap_python(closes, volumes, period),
+            lambda: engine._compute_vwap_numpy(closes, volumes, period),
+        ),
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Pure-Python vs NumPy indicator engine.")
+    parser.add_argument("--period", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(SIZES))
+    args = parser.parse_args()
+
+    if not indicator_engine.NUMPY_AVAILABLE:
+        print("NumPy is not installed; only the pure-Python engine is available.")
+        return 1
+
+    print(f"period={args.period}, best of {args.repeat}")
+    print(f"{'bars':>7} {'indicator':<9} {'python ms':>10} {'numpy ms':>10} {'speedup':>8} {'max rel err':>12}")
+    for size in args.sizes:
+        rows = make_bar_rows(size)
+        closes = array("d", (row["close"] for row in rows))
+        volumes = array("q", (row["volume"] for row in rows))
+        for name, python_impl, numpy_impl in cases(closes, volumes, args.period):
+            error = max_relative_error(python_impl(), numpy_impl())
+            python_time = best_of(python_impl, args.repeat) * 1000
+            numpy_time = best_of(numpy_impl, args.repeat) * 1000
+            print(
+                f"{size:>7} {name:<9} {python_time:>10.3f} {numpy_time:>10.3f} "
+                f"{python_time / numpy_time:>7.1f}x {error:>12.2e}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
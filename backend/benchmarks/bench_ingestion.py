@@ -0,0 +1,94 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import ingestion, models
+from app.db import Base
+
+from .synthetic import make_bar_rows
+
+
+def legacy_upsert_daily_bars(db, stock_id: int, bars: list[dict], source: str):
+    for bar in bars:
+        existing = (
+            db.query(models.DailyBar)
+            .filter(
+                models.DailyBar.stock_id == stock_id,
+                models.DailyBar.bar_date == bar["bar_date"],
+            )
+            .first()
+        )
+        if existing:
+            existing.open = bar["open"]
+            existing.high = bar["high"]
+            existing.low = bar["low"]
+            existing.close = bar["close"]
+            existing.adjusted_close = bar.get("adjusted_close")
+            existing.volume = bar["volume"]
+            existing.source = source
+            continue
+        db.add(models.DailyBar(stock_id=stock_id, source=source, **bar))
+    db.commit()
+
+
+def session_factory(path: Path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def run(label: str, path: Path, payloads: dict[int, list[dict]], ingest) -> float:
+    SessionLocal = session_factory(path)
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        ingest(db, payloads)
+        elapsed = time.perf_counter() - start
+    print(f"{label:<26} {elapsed:8.2f}s")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Row-by-row vs bulk daily bar upserts.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=100)
+    args = parser.parse_args()
+
+    initial = {
+        stock_id: make_bar_rows(args.bars + 1, seed=stock_id)[:-1]
+        for stock_id in range(1, args.tickers + 1)
+    }
+    nightly = {
+        stock_id: make_bar_rows(args.bars + 1, seed=stock_id)[1:]
+        for stock_id in range(1, args.tickers + 1)
+    }
+
+    def legacy(db, payloads):
+        for stock_id, bars in payloads.items():
+            legacy_upsert_daily_bars(db, stock_id, bars, source="bench")
+
+    def per_stock_bulk(db, payloads):
+        for stock_id, bars in payloads.items():
+            ingestion.upsert_daily_bars(db, stock_id, bars, source="bench")
+
+    def all_stocks_bulk(db, payloads):
+        ingestion.upsert_daily_bars_bulk(db, payloads, source="bench")
+
+    print(f"{args.tickers} tickers x {args.bars} bars")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, ingest in [
+            ("legacy row-by-row", legacy),
+            ("bulk per stock", per_stock_bulk),
+            ("bulk all stocks", all_stocks_bulk),
+        ]:
+            path = Path(tmp) / f"{label.replace(' ', '_')}.db"
+            run(f"{label} (initial)", path, initial, ingest)
+            run(f"{label} (nightly)", path, nightly, ingest)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,58 @@
+import argparse
+import time
+
+from app.rule_context import build_functions, build_series_context
+from app.rule_engine import PlanGraph
+from app.series import BarColumns
+
+from .synthetic import make_bars
+
+MIXED_EXPRESSIONS = [
+    "RSI(14) lt 30 and Close gt 100000",
+    "VWAP(50) gt Close and Volume lt 0",
+    "EMA(50)[1] lt SMA(200)[1] or Close gt 0",
+    "RSI(21)[1] lt 25 and EMA(100) gt Close and Close lt 1",
+    "not (RSI(28) gt 70 or Close lt 0) and Volume[1] lt 0",
+]
+
+
+def timed(label: str, graph: PlanGraph, bars, columns: BarColumns, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        context = build_series_context(bars, [], columns=columns)
+        scope = graph.scope(context, build_functions(bars, columns=columns))
+        for expr in MIXED_EXPRESSIONS:
+            scope.evaluate(expr)
+    elapsed = time.perf_counter() - start
+    per_run = elapsed / iterations * 1000
+    print(f"{label:<18} {iterations:>6} runs  {elapsed:8.3f}s  {per_run:8.3f} ms/run")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Left-to-right vs cost-ordered AND/OR operands.")
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    bars = make_bars(args.bars)
+    columns = BarColumns.from_bars(bars)
+    written = PlanGraph(tuple(MIXED_EXPRESSIONS), reorder=False)
+    ordered = PlanGraph(tuple(MIXED_EXPRESSIONS))
+
+    context = build_series_context(bars, [], columns=columns)
+    functions = build_functions(bars, columns=columns)
+    left, right = written.scope(context, functions), ordered.scope(context, functions)
+    for expr in MIXED_EXPRESSIONS:
+        if left.evaluate(expr) != right.evaluate(expr):
+            raise SystemExit(f"Mismatch for {expr!r}")
+
+    print(f"{len(MIXED_EXPRESSIONS)} mixed cheap/expensive expressions, {args.bars} bars")
+    baseline = timed("left-to-right", written, bars, columns, args.iterations)
+    optimized = timed("cost-ordered", ordered, bars, columns, args.iterations)
+    print(f"speedup            {baseline / optimized:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
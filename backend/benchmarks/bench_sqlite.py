@@ -0,0 +1,122 @@
+import argparse
+import multiprocessing
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base, create_db_engine
+
+
+def default_engine(url: str):
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+ENGINES = {"default (journal)": default_engine, "tuned (WAL)": create_db_engine}
+
+
+def writer(label: str, url: str, stocks: int, deadline: float, results):
+    engine = ENGINES[label](url)
+    bars = models.DailyBar.__table__
+    day = date(2000, 1, 1)
+    writes = errors = 0
+    while time.time() < deadline:
+        rows = [
+            {
+                "stock_id": stock_id,
+                "bar_date": day,
+                "open": 1.0,
+                "high": 1.0,
+                "low": 1.0,
+                "close": 1.0,
+                "volume": 1,
+                "source": "bench",
+            }
+            for stock_id in range(1, stocks + 1)
+        ]
+        try:
+            with engine.begin() as connection:
+                connection.execute(insert(bars), rows)
+            writes += 1
+        except Exception:
+            errors += 1
+        day += timedelta(days=1)
+    results.put(("write", writes, errors, []))
+
+
+def reader(label: str, url: str, deadline: float, results):
+    engine = ENGINES[label](url)
+    bars = models.DailyBar.__table__
+    stocks = select(models.Stock.__table__)
+    recent = select(bars.c.close).where(bars.c.stock_id == 1).order_by(bars.c.bar_date.desc()).limit(50)
+    latencies = []
+    errors = 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                connection.execute(stocks).all()
+                connection.execute(recent).all()
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    results.put(("read", len(latencies), errors, latencies))
+
+
+def run(label: str, path: Path, args) -> None:
+    url = f"sqlite:///{path}"
+    engine = ENGINES[label](url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        for idx in range(args.stocks):
+            db.add(models.Stock(ticker=f"T{idx}", market="US", currency="USD", status="active"))
+        db.commit()
+    engine.dispose()
+
+    results = multiprocessing.Queue()
+    deadline = time.time() + args.seconds
+    processes = [multiprocessing.Process(target=writer, args=(label, url, args.stocks, deadline, results))]
+    processes += [
+        multiprocessing.Process(target=reader, args=(label, url, deadline, results))
+        for _ in range(args.readers)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    writes = sum(count for kind, count, _, _ in collected if kind == "write")
+    write_errors = sum(errors for kind, _, errors, _ in collected if kind == "write")
+    read_errors = sum(errors for kind, _, errors, _ in collected if kind == "read")
+    latencies = sorted(value for kind, _, _, values in collected if kind == "read" for value in values)
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+    print(
+        f"{label:<18} reads {len(latencies):7d}  writes {writes:6d}  "
+        f"locked r/w {read_errors:4d}/{write_errors:<4d} "
+        f"p50 {p50:7.2f}ms  p99 {p99:7.2f}ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Default vs tuned SQLite engine under concurrent load.")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--stocks", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"1 writer process, {args.readers} reader processes, {args.stocks} stocks, {args.seconds}s")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ENGINES:
+            run(label, Path(tmp) / f"{label.split()[0]}.db", args)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+import argparse
+import os
+import time
+
+from app.backtest import BacktestData, run_backtest
+from app.crud import indicator_defs_from_plan
+from app.sweep import apply_params, expand_grid, iter_sweep
+
+from .synthetic import load_example_plan, make_bars
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Parameter sweep: per-variant rebuild vs shared data.")
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    plan = load_example_plan()
+    plan["entry_rules"][0]["condition_expr"] = "Close[0] lte SMA({period})[0] - {offset}"
+    grid = {
+        "period": [20, 50, 100, 150, 200],
+        "offset": [0, 2, 5, 10],
+        "exit_rules.hard_stop.value": [0.08, 0.12],
+        "exit_rules.trailing_stop.value": [0.04, 0.06, 0.08],
+    }
+    variants = expand_grid(grid)
+    bars = make_bars(252 * args.years)
+
+    start = time.perf_counter()
+    for params in variants:
+        variant = apply_params(plan, params)
+        run_backtest(variant, BacktestData.from_bars(bars, indicator_defs_from_plan(variant)))
+    rebuild = time.perf_counter() - start
+
+    start = time.perf_counter()
+    list(iter_sweep(BacktestData.from_bars(bars), plan, grid, workers=1))
+    shared = time.perf_counter() - start
+
+    start = time.perf_counter()
+    list(iter_sweep(BacktestData.from_bars(bars), plan, grid, workers=args.workers))
+    pooled = time.perf_counter() - start
+
+    print(f"{len(variants)} variants x {len(bars)} bars ({args.years} years)")
+    print(f"{'rebuild data per variant':<32} {rebuild:8.3f}s")
+    print(f"{'shared series, sequential':<32} {shared:8.3f}s")
+    print(f"{f'shared memory, {args.workers} workers':<32} {pooled:8.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,11 @@
+import json
+from pathlib import Path
+
+from tests.synthetic_bars import make_bar_rows, make_bars
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def load_example_plan() -> dict:
+    path = PROJECT_ROOT / "rule_plan.example.json"
+    return json.loads(path.read_text(encoding="utf-8"))
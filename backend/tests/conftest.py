@@ -1,5 +1,7 @@
 import json
+import os
 import sys
+import tempfile
 from pathlib import Path
 
 import pytest
@@ -10,10 +12,29 @@ from sqlalchemy.orm import sessionmaker
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(PROJECT_ROOT / "backend"))
 
+_DATABASE_DIR = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_DATABASE_DIR.name) / 'discipline_stock.db'}"
+
+from app import audit_writer, price_cache
 from app.db import Base, get_db
 from app.main import app
 
 
+@pytest.fixture(autouse=True)
+def isolated_price_cache(monkeypatch):
+    cache = price_cache.PriceCache()
+    monkeypatch.setattr(price_cache, "_CACHE", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_audit_writer(monkeypatch):
+    writer = audit_writer.AuditWriter()
+    monkeypatch.setattr(audit_writer, "_WRITER", writer)
+    yield writer
+    writer.close()
+
+
 @pytest.fixture()
 def db_session(tmp_path):
     db_path = tmp_path / "test.db"
@@ -0,0 +1,68 @@
+import random
+from datetime import date, timedelta
+
+from app import models
+
+
+def trading_days(count: int, end: date | None = None) -> list[date]:
+    day = end or date(2025, 12, 31)
+    days: list[date] = []
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return list(reversed(days))
+
+
+def make_bar_rows(count: int, seed: int = 7, start_price: float = 100.0) -> list[dict]:
+    rng = random.Random(seed)
+    price = start_price
+    rows = []
+    for bar_date in trading_days(count):
+        open_price = price
+        price = max(1.0, price * (1 + rng.gauss(0.0003, 0.015)))
+        high = max(open_price, price) * (1 + abs(rng.gauss(0, 0.004)))
+        low = min(open_price, price) * (1 - abs(rng.gauss(0, 0.004)))
+        rows.append(
+            {
+                "bar_date": bar_date,
+                "open": round(open_price, 4),
+                "high": round(high, 4),
+                "low": round(low, 4),
+                "close": round(price, 4),
+                "adjusted_close": round(price, 4),
+                "volume": rng.randint(500_000, 5_000_000),
+            }
+        )
+    return rows
+
+
+def make_bars(count: int, seed: int = 7, stock_id: int = 1) -> list[models.DailyBar]:
+    return [
+        models.DailyBar(stock_id=stock_id, source="synthetic", **row)
+        for row in make_bar_rows(count, seed=seed)
+    ]
+
+
+def make_close_rows(
+    closes: list[float], volumes: list[int] | None = None, start: date = date(2025, 1, 1)
+) -> list[dict]:
+    volumes = volumes or [1000 + idx for idx in range(len(closes))]
+    return [
+        {
+            "bar_date": start + timedelta(days=idx),
+            "open": close,
+            "high": close + 1,
+            "low": close - 1,
+            "close": close,
+            "adjusted_close": None,
+            "volume": volume,
+        }
+        for idx, (close, volume) in enumerate(zip(closes, volumes))
+    ]
+
+
+def make_close_bars(
+    closes: list[float], volumes: list[int] | None = None, start: date = date(2025, 1, 1)
+) -> list[models.DailyBar]:
+    return [models.DailyBar(**row) for row in make_close_rows(closes, volumes, start)]
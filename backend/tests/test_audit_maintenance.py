@@ -0,0 +1,91 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect
+
+from app import models
+from app.audit_maintenance import SUMMARY_EVENT, apply_retention, compact_audit_logs
+from app.audit_writer import get_audit_writer
+
+NOW = datetime(2024, 3, 10, 12, 0)
+
+
+def _add(db, event_type, timestamp, stock_id=1, payload=None):
+    db.add(
+        models.AuditLog(
+            timestamp=timestamp,
+            stock_id=stock_id,
+            event_type=event_type,
+            payload_json=json.dumps(payload or {}),
+        )
+    )
+
+
+def test_audit_log_indexes_exist(db_session):
+    inspector = inspect(db_session.get_bind())
+    indexes = {index["name"]: index["column_names"] for index in inspector.get_indexes("audit_logs")}
+    assert indexes["ix_audit_logs_stock_timestamp"] == ["stock_id", "timestamp"]
+    assert indexes["ix_audit_logs_event_timestamp"] == ["event_type", "timestamp"]
+
+
+def test_compaction_rolls_old_high_frequency_events_into_daily_summaries(db_session):
+    old_day = datetime(2024, 3, 1, 14, 0)
+    for minute in range(3):
+        _add(db_session, "INTRADAY_PRICE_FETCHED", old_day + timedelta(minutes=minute), payload={"price": minute})
+    _add(db_session, "INTRADAY_PRICE_FETCHED", old_day, stock_id=2, payload={"price": 9})
+    _add(db_session, "RULE_EVALUATED", old_day - timedelta(days=1))
+    _add(db_session, "DAILY_BARS_INGESTED", old_day)
+    _add(db_session, "INTRADAY_PRICE_FETCHED", NOW - timedelta(hours=1))
+    db_session.commit()
+
+    result = compact_audit_logs(db_session, now=NOW, after_days=2)
+
+    assert result["summaries"] == 3
+    assert result["compacted"] == 5
+    summaries = (
+        db_session.query(models.AuditLog)
+        .filter(models.AuditLog.event_type == SUMMARY_EVENT)
+        .order_by(models.AuditLog.timestamp, models.AuditLog.stock_id)
+        .all()
+    )
+    payloads = [json.loads(row.payload_json) for row in summaries]
+    assert [(p["event_type"], p["date"], p["count"]) for p in payloads] == [
+        ("RULE_EVALUATED", "2024-02-29", 1),
+        ("INTRADAY_PRICE_FETCHED", "2024-03-01", 1),
+        ("INTRADAY_PRICE_FETCHED", "2024-03-01", 3),
+    ]
+    assert payloads[2]["last_payload"] == {"price": 2}
+    remaining = {row.event_type for row in db_session.query(models.AuditLog).all()}
+    assert remaining == {SUMMARY_EVENT, "DAILY_BARS_INGESTED", "INTRADAY_PRICE_FETCHED"}
+
+    assert compact_audit_logs(db_session, now=NOW, after_days=2)["summaries"] == 0
+
+
+def test_retention_applies_per_event_policy(db_session):
+    _add(db_session, "APNS_SENT", NOW - timedelta(days=40))
+    _add(db_session, "APNS_SENT", NOW - timedelta(days=5))
+    _add(db_session, SUMMARY_EVENT, NOW - timedelta(days=40))
+    _add(db_session, "DAILY_BARS_INGESTED", NOW - timedelta(days=400))
+    db_session.commit()
+
+    deleted = apply_retention(
+        db_session,
+        now=NOW,
+        policy={"*": 30, SUMMARY_EVENT: 90, "DAILY_BARS_INGESTED": 0},
+    )
+
+    assert deleted == {"*": 1, SUMMARY_EVENT: 0}
+    remaining = sorted(row.event_type for row in db_session.query(models.AuditLog).all())
+    assert remaining == ["APNS_SENT", "AUDIT_DAILY_SUMMARY", "DAILY_BARS_INGESTED"]
+
+
+def test_maintenance_endpoint_flushes_pending_events(client, db_session):
+    get_audit_writer().record(
+        db_session.get_bind(), 1, "INTRADAY_PRICE_FETCHED", {"price": 1.0}
+    )
+    response = client.post("/jobs/audit-maintenance")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert body["compaction"]["summaries"] == 0
+    assert db_session.query(models.AuditLog).count() == 1
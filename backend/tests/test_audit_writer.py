@@ -0,0 +1,112 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, event
+
+from app import models
+from app.audit_writer import AuditWriter
+
+
+def _commit_counter(engine):
+    commits = []
+    event.listen(engine, "commit", lambda connection: commits.append(1))
+    return commits
+
+
+def test_events_are_buffered_until_flush(db_session):
+    engine = db_session.get_bind()
+    commits = _commit_counter(engine)
+    writer = AuditWriter(batch_size=100, flush_interval=60)
+    for idx in range(5):
+        writer.record(engine, None, "RULE_EVALUATED", {"idx": idx})
+
+    assert db_session.query(models.AuditLog).count() == 0
+    assert writer.flush() == 5
+    assert len(commits) == 1
+    rows = db_session.query(models.AuditLog).order_by(models.AuditLog.id).all()
+    assert [row.payload_json for row in rows] == [f'{{"idx": {idx}}}' for idx in range(5)]
+    writer.close()
+
+
+def test_background_thread_flushes_on_interval_and_batch_size(db_session):
+    engine = db_session.get_bind()
+    writer = AuditWriter(batch_size=3, flush_interval=0.05)
+    writer.record(engine, None, "A", {})
+    deadline = time.monotonic() + 2
+    while writer.stats()["written"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.stats()["written"] == 1
+
+    writer.flush_interval = 60
+    time.sleep(0.1)
+    for _ in range(3):
+        writer.record(engine, None, "B", {})
+    deadline = time.monotonic() + 2
+    while writer.stats()["written"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.stats()["written"] == 4
+    writer.close()
+
+
+def test_failed_flush_keeps_events_for_retry(tmp_path, db_session):
+    broken = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    writer = AuditWriter(batch_size=100, flush_interval=60)
+    writer.record(broken, None, "A", {})
+    writer.record(db_session.get_bind(), None, "B", {})
+
+    with pytest.raises(Exception):
+        writer.flush()
+    assert writer.pending() == 1
+    assert db_session.query(models.AuditLog).count() == 1
+    assert writer.stats()["failures"] == 1
+
+
+def test_events_are_dropped_after_max_retries(tmp_path, caplog):
+    broken = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    writer = AuditWriter(batch_size=100, flush_interval=60, max_retries=2)
+    writer.record(broken, None, "A", {})
+
+    with pytest.raises(Exception):
+        writer.flush()
+    assert writer.pending() == 1
+    with pytest.raises(Exception):
+        writer.flush()
+    assert writer.pending() == 0
+    assert writer.stats()["dropped"] == 1
+    assert "Dropped 1 audit events" in caplog.text
+
+
+def test_pending_queue_is_bounded(db_session):
+    writer = AuditWriter(batch_size=100, flush_interval=60, max_pending=3)
+    engine = db_session.get_bind()
+    for idx in range(5):
+        writer.record(engine, None, "A", {"idx": idx})
+
+    assert writer.pending() == 3
+    assert writer.stats()["dropped"] == 2
+    assert writer.flush() == 3
+    rows = db_session.query(models.AuditLog).order_by(models.AuditLog.id).all()
+    assert [row.payload_json for row in rows] == [f'{{"idx": {idx}}}' for idx in (2, 3, 4)]
+    writer.close()
+
+
+def test_monitor_tick_commits_audits_once(db_session, monkeypatch):
+    from app import scheduler
+
+    for ticker in ("AAPL", "MSFT", "NVDA", "AMD"):
+        db_session.add(models.Stock(ticker=ticker, market="US", currency="USD", status="active"))
+    db_session.commit()
+    commits = _commit_counter(db_session.get_bind())
+
+    monkeypatch.setattr(scheduler, "SessionLocal", lambda: db_session)
+    monkeypatch.setattr(scheduler, "is_trading_day", lambda now: True)
+    monkeypatch.setattr(
+        scheduler,
+        "fetch_intraday_prices_concurrently",
+        lambda symbols, **kwargs: {symbol: 1.0 for symbol in symbols},
+    )
+
+    scheduler.run_market_monitor()
+
+    assert len(commits) == 1
+    assert db_session.query(models.AuditLog).filter_by(event_type="INTRADAY_PRICE_FETCHED").count() == 4
@@ -0,0 +1,181 @@
+import copy
+import json
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import backtest_cli, crud, ingestion, models, rule_engine, schemas
+from app.backtest import BacktestData, plan_signals, run_backtest
+from app.crud import indicator_defs_from_plan
+from synthetic_bars import make_bars
+
+START = date(2020, 1, 1)
+
+
+def _bar(idx: int, open_: float, high: float, low: float, close: float) -> models.DailyBar:
+    return models.DailyBar(
+        bar_date=START + timedelta(days=idx),
+        open=open_,
+        high=high,
+        low=low,
+        close=close,
+        adjusted_close=None,
+        volume=1000 + idx,
+    )
+
+
+def _ohlc(closes: list[float]) -> list[models.DailyBar]:
+    return [_bar(idx, close, close, close, close) for idx, close in enumerate(closes)]
+
+
+def _plan(entry: str, exit_rules: dict | None = None, **extra) -> dict:
+    return {
+        "entry_rules": [{"id": "E1", "condition_expr": entry}],
+        "exit_rules": exit_rules or {},
+        "indicators": [
+            {"id": "ma20", "type": "MA", "ma_type": "SMA", "period": 20},
+            {"id": "rsi14", "type": "RSI", "period": 14},
+        ],
+        **extra,
+    }
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        "Close[0] lte SMA(20)[0] - 1",
+        "Close crossover SMA(10)",
+        "RSI(14) lt 45 and Close gt lowest(Low, 20)",
+        "EMA(5)[1] gt EMA(12)[2] or not (Volume gt 1100)",
+        "diff(Close, SMA(5)) gt 0 and change(Close) gt 0.5",
+        "ind.ma20 gt ind.rsi14 * 2 and Close / Open gt 1.01",
+        "highest(High, 10) - Close lt 2",
+    ],
+)
+def test_vectorized_signals_match_per_bar_evaluation(expr):
+    bars = make_bars(150)
+    plan = _plan(expr)
+    indicators = indicator_defs_from_plan(plan)
+    signals = plan_signals(plan, BacktestData.from_bars(bars, indicators))
+    for idx in range(len(bars)):
+        result = rule_engine.evaluate_with_bars(plan, bars[: idx + 1], indicators, "flat")
+        assert (result.action == "BUY") == bool(signals.entry[idx]), idx
+
+
+def test_hard_stop_exits_at_stop_price():
+    bars = _ohlc([100, 100, 90, 95, 80, 82])
+    plan = _plan("Close lt 95", {"hard_stop": {"type": "pct_below_entry", "value": 0.1}})
+    result = run_backtest(plan, BacktestData.from_bars(bars))
+
+    trade = result.trades[0]
+    assert trade["entry_price"] == 90
+    assert trade["exit_reason"] == "HARD_STOP"
+    assert trade["exit_price"] == 80
+    assert trade["return_pct"] == pytest.approx(80 / 90 - 1)
+    assert result.summary["trades"] == 1
+
+
+def test_take_profits_scale_out_and_trailing_stop_closes():
+    closes = [100, 90, 95, 100, 110, 105, 98, 97]
+    plan = _plan(
+        "Close lt 95",
+        {
+            "take_profits": [
+                {"id": "TP1", "pct_gain": 0.1, "size_pct": 0.5},
+                {"id": "TP2", "pct_gain": 0.5, "size_pct": 0.5},
+            ],
+            "trailing_stop": {"type": "pct_from_peak", "value": 0.1},
+        },
+    )
+    result = run_backtest(plan, BacktestData.from_bars(_ohlc(closes)))
+
+    trade = result.trades[0]
+    assert [fill["reason"] for fill in trade["fills"]] == ["TP1", "TRAILING_STOP"]
+    assert trade["fills"][0]["price"] == 100
+    assert trade["fills"][1]["price"] == 98
+    assert trade["return_pct"] == pytest.approx(0.5 * (100 / 90 - 1) + 0.5 * (98 / 90 - 1))
+
+
+def test_exit_condition_time_stop_and_cooldown():
+    closes = [100, 90, 91, 92, 93, 94, 90, 90, 90, 90]
+    plan = _plan(
+        "Close lte 90",
+        {
+            "conditions": [{"id": "X1", "condition_expr": "Close gte 94"}],
+            "time_stop": {"max_holding_days": 2},
+        },
+        position_intent={"cooldown_days_after_exit": 2},
+    )
+    result = run_backtest(plan, BacktestData.from_bars(_ohlc(closes)))
+
+    assert [(t["entry_date"], t["exit_reason"]) for t in result.trades] == [
+        ("2020-01-02", "TIME_STOP"),
+        ("2020-01-07", "TIME_STOP"),
+    ]
+    assert result.summary["trades"] == 2
+
+    plan["exit_rules"]["time_stop"] = {"max_holding_days": 30}
+    result = run_backtest(plan, BacktestData.from_bars(_ohlc(closes)))
+    assert result.trades[0]["exit_reason"] == "X1"
+    assert result.trades[0]["exit_date"] == "2020-01-06"
+
+
+def test_twenty_years_backtests_quickly():
+    import time
+
+    bars = make_bars(252 * 20)
+    plan = _plan(
+        "Close[0] lte SMA(250)[0] - 15 and ind.rsi14 lt 40",
+        {
+            "hard_stop": {"type": "pct_below_entry", "value": 0.15},
+            "trailing_stop": {"type": "pct_from_peak", "value": 0.06},
+            "take_profits": [{"id": "TP1", "pct_gain": 0.13, "size_pct": 0.5}],
+            "time_stop": {"max_holding_days": 60},
+        },
+    )
+    start = time.perf_counter()
+    data = BacktestData.from_bars(bars, indicator_defs_from_plan(plan))
+    result = run_backtest(plan, data)
+    assert time.perf_counter() - start < 1.0
+    assert result.summary["bars"] == 252 * 20
+
+
+@pytest.fixture()
+def backtest_stock(db_session, rule_plan_payload):
+    stock = models.Stock(ticker="MSFT", market="US", currency="USD")
+    db_session.add(stock)
+    db_session.commit()
+    plan = copy.deepcopy(rule_plan_payload)
+    plan["entry_rules"][0]["condition_expr"] = "Close lt SMA(20)"
+    crud.create_rule_plan(db_session, stock, schemas.RulePlanCreate(version=1, is_active=True, rules=plan))
+    fields = ("bar_date", "open", "high", "low", "close", "adjusted_close", "volume")
+    rows = [{field: getattr(bar, field) for field in fields} for bar in make_bars(300)]
+    ingestion.upsert_daily_bars(db_session, stock.id, rows, source="fixture")
+    return stock, plan
+
+
+def test_backtest_endpoint(client, backtest_stock):
+    stock, _ = backtest_stock
+    response = client.get(f"/stocks/{stock.id}/backtest", params={"start_date": "2025-03-03"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["summary"]["start"] == "2025-03-03"
+    assert body["summary"]["trades"] > 0
+    assert all(trade["entry_date"] >= "2025-03-03" for trade in body["trades"])
+
+    assert client.get("/stocks/999/backtest").status_code == 404
+
+
+def test_backtest_cli(db_session, backtest_stock, monkeypatch, tmp_path, capsys):
+    stock, plan = backtest_stock
+    monkeypatch.setattr(backtest_cli, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    plan["entry_rules"][0]["condition_expr"] = "Close lt 0"
+    plan_path = tmp_path / "plan.json"
+    plan_path.write_text(json.dumps(plan), encoding="utf-8")
+
+    assert backtest_cli.main(["--ticker", "msft", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)["summary"]["trades"] > 0
+
+    assert backtest_cli.main(["--stock-id", str(stock.id), "--plan", str(plan_path)]) == 0
+    assert "trades        0 closed, 0 open" in capsys.readouterr().out
@@ -0,0 +1,140 @@
+import copy
+
+import pytest
+from sqlalchemy import event
+
+from app import batch_evaluation, crud, ingestion, jobs, models, rule_engine, schemas
+from app.audit_writer import flush_audit_log
+from app.batch_evaluation import evaluate_all
+from synthetic_bars import make_bar_rows
+
+
+def _add_stocks(db, plan: dict, count: int, offset: int = 0) -> list[models.Stock]:
+    stocks = []
+    for idx in range(offset, offset + count):
+        stock = models.Stock(ticker=f"T{idx}", market="US", currency="USD", status="active")
+        db.add(stock)
+        db.commit()
+        crud.create_rule_plan(db, stock, schemas.RulePlanCreate(version=1, is_active=True, rules=plan))
+        ingestion.upsert_daily_bars(db, stock.id, make_bar_rows(120, seed=idx), source="fixture")
+        stocks.append(stock)
+    return stocks
+
+
+def _query_counter(engine):
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+@pytest.fixture()
+def plan(rule_plan_payload):
+    plan = copy.deepcopy(rule_plan_payload)
+    plan["entry_rules"][0]["condition_expr"] = "Close lt SMA(20)"
+    return plan
+
+
+def test_batch_matches_per_stock_evaluation(db_session, plan):
+    stocks = _add_stocks(db_session, plan, 3)
+    prices = {stock.ticker: 95.0 + idx for idx, stock in enumerate(stocks)}
+
+    result = evaluate_all(db_session, stocks, prices=prices)
+
+    assert result.evaluated == 3
+    assert sorted(result.changed) == [stock.id for stock in stocks]
+    for stock in stocks:
+        bars = (
+            db_session.query(models.DailyBar)
+            .filter_by(stock_id=stock.id)
+            .order_by(models.DailyBar.bar_date)
+            .all()
+        )
+        indicators = db_session.query(models.IndicatorDef).filter_by(stock_id=stock.id).all()
+        expected = rule_engine.evaluate_with_bars(
+            plan, bars, indicators, stock.position_state, current_price=prices[stock.ticker]
+        )
+        assert result.decisions[stock.id] == jobs.decision_payload(expected)
+
+        decision, changed = jobs.evaluate_rules(
+            db_session, stock, stock.position_state, current_price=prices[stock.ticker]
+        )
+        assert decision == result.decisions[stock.id]
+        assert changed is False
+
+    flush_audit_log()
+    audits = db_session.query(models.AuditLog)
+    assert audits.filter_by(event_type="RULE_EVALUATED").count() == 3
+    assert audits.filter_by(event_type="INTRADAY_PRICE_FETCHED").count() == 3
+
+
+def test_query_count_does_not_grow_with_watchlist(db_session, plan):
+    engine = db_session.get_bind()
+    _add_stocks(db_session, plan, 2)
+    statements = _query_counter(engine)
+    evaluate_all(db_session)
+    small_count = len(statements)
+
+    db_session.query(models.DecisionState).delete()
+    db_session.commit()
+    _add_stocks(db_session, plan, 6, offset=2)
+    statements.clear()
+    result = evaluate_all(db_session)
+
+    assert result.evaluated == 8
+    assert len(statements) == small_count
+
+
+def test_single_transaction_and_cached_rerun(db_session, plan):
+    stocks = _add_stocks(db_session, plan, 3)
+    missing_plan = models.Stock(ticker="NOPLAN", market="US", currency="USD", status="active")
+    db_session.add(missing_plan)
+    db_session.commit()
+    commits = []
+    event.listen(db_session.get_bind(), "commit", lambda connection: commits.append(1))
+
+    first = evaluate_all(db_session, stocks + [missing_plan])
+    assert len(commits) == 1
+    assert first.failures == {missing_plan.id: "No active rule plan"}
+
+    second = evaluate_all(db_session, stocks)
+    assert second.evaluated == 0
+    assert second.changed == []
+    assert second.decisions == {stock.id: first.decisions[stock.id] for stock in stocks}
+
+
+def test_process_pool_matches_in_process(db_session, plan, monkeypatch):
+    stocks = _add_stocks(db_session, plan, 3)
+    expected = evaluate_all(db_session, stocks).decisions
+    db_session.query(models.DecisionState).delete()
+    db_session.commit()
+
+    monkeypatch.setenv("EVALUATE_PROCESS_MIN_STOCKS", "1")
+    result = evaluate_all(db_session, stocks, workers=2)
+    assert result.evaluated == 3
+    assert result.decisions == expected
+
+
+def test_evaluate_all_endpoint(client, db_session, plan, monkeypatch):
+    stocks = _add_stocks(db_session, plan, 2)
+    notified = []
+    monkeypatch.setattr(
+        batch_evaluation.notifications,
+        "send_decision_change",
+        lambda db, stock, payload: notified.append(stock.ticker),
+    )
+
+    response = client.post("/jobs/evaluate-all")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["evaluated"] == 2
+    assert sorted(notified) == sorted(stock.ticker for stock in stocks)
+    assert set(body["decisions"]) == {str(stock.id) for stock in stocks}
+
+    body = client.post("/jobs/evaluate-all").json()
+    assert body["evaluated"] == 0
+    assert body["cached"] == 2
+    assert body["changed"] == []
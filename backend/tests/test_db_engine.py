@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import insert, inspect, text
+from sqlalchemy.exc import OperationalError
+
+from app import models
+from app.db import (
+    Base,
+    create_db_engine,
+    ensure_audit_indexes,
+    ensure_decision_state_columns,
+    ensure_stock_columns,
+    init_db,
+    sqlite_pragmas,
+)
+
+
+def test_engine_applies_pragmas_on_every_connection(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    connections = [engine.connect() for _ in range(2)]
+    try:
+        for connection in connections:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            assert connection.execute(text("PRAGMA cache_size")).scalar() == -65536
+    finally:
+        for connection in connections:
+            connection.close()
+        engine.dispose()
+
+
+def test_pragmas_are_configurable(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "FULL")
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "250")
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'custom.db'}")
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 2
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 250
+    engine.dispose()
+
+
+def _hold_write_lock(engine):
+    writer = engine.raw_connection()
+    cursor = writer.cursor()
+    cursor.execute("BEGIN EXCLUSIVE")
+    cursor.execute("UPDATE stocks SET position_qty = 5")
+    return writer
+
+
+@pytest.mark.parametrize(("journal_mode", "blocked"), [("WAL", False), ("DELETE", True)])
+def test_readers_are_not_blocked_by_an_open_write_transaction(tmp_path, journal_mode, blocked):
+    pragmas = {**sqlite_pragmas(), "journal_mode": journal_mode, "busy_timeout": "0"}
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'shared.db'}", pragmas=pragmas)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(models.Stock.__table__),
+            {"ticker": "AAPL", "market": "US", "currency": "USD", "position_qty": 0},
+        )
+
+    reader = engine.connect()
+    writer = _hold_write_lock(engine)
+    try:
+        query = text("SELECT position_qty FROM stocks")
+        if blocked:
+            with pytest.raises(OperationalError, match="locked"):
+                reader.execute(query)
+        else:
+            assert reader.execute(query).scalar() == 0
+    finally:
+        writer.rollback()
+        writer.close()
+        reader.close()
+        engine.dispose()
+
+
+def test_ensure_helpers_add_missing_columns_and_indexes(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE stocks (id INTEGER PRIMARY KEY, ticker TEXT)"))
+        connection.execute(text("CREATE TABLE decision_states (id INTEGER PRIMARY KEY)"))
+    init_db(engine)
+
+    for _ in range(2):
+        ensure_stock_columns(engine)
+        ensure_decision_state_columns(engine)
+        ensure_audit_indexes(engine)
+
+    inspector = inspect(engine)
+    stock_columns = {column["name"] for column in inspector.get_columns("stocks")}
+    assert {"avg_entry_price", "position_qty"} <= stock_columns
+    assert "input_fingerprint" in {column["name"] for column in inspector.get_columns("decision_states")}
+    assert {"ix_audit_logs_stock_timestamp", "ix_audit_logs_event_timestamp"} <= {
+        index["name"] for index in inspector.get_indexes("audit_logs")
+    }
+    engine.dispose()
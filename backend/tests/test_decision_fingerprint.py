@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import crud, ingestion, jobs, models, schemas
+from app.audit_writer import flush_audit_log
+
+
+@pytest.fixture()
+def evaluated_stock(db_session, rule_plan_payload, daily_bars_payload):
+    stock = models.Stock(ticker="AAPL", market="US", currency="USD")
+    db_session.add(stock)
+    db_session.commit()
+    crud.create_rule_plan(
+        db_session,
+        stock,
+        schemas.RulePlanCreate(version=1, is_active=True, rules=rule_plan_payload),
+    )
+    rows = [
+        {
+            "bar_date": date.fromisoformat(bar["bar_date"]),
+            "open": bar["open"],
+            "high": bar["high"],
+            "low": bar["low"],
+            "close": bar["close"],
+            "adjusted_close": bar["adjusted_close"],
+            "volume": bar["volume"],
+        }
+        for bar in daily_bars_payload
+    ]
+    ingestion.upsert_daily_bars(db_session, stock.id, rows, source="fixture")
+    jobs.update_indicators(db_session, stock)
+    return stock, rows
+
+
+def _evaluations(db):
+    flush_audit_log()
+    return db.query(models.AuditLog).filter(models.AuditLog.event_type == "RULE_EVALUATED").count()
+
+
+def test_unchanged_inputs_reuse_cached_decision(db_session, evaluated_stock):
+    stock, _ = evaluated_stock
+    first, _ = jobs.evaluate_rules(db_session, stock, "flat", current_price=100.0)
+    second, changed = jobs.evaluate_rules(db_session, stock, "flat", current_price=100.0)
+
+    assert second == first
+    assert changed is False
+    assert _evaluations(db_session) == 1
+    assert crud.get_decision_state(db_session, stock.id).input_fingerprint
+
+
+def test_changed_inputs_trigger_reevaluation(db_session, evaluated_stock):
+    stock, rows = evaluated_stock
+    jobs.evaluate_rules(db_session, stock, "flat", current_price=100.0)
+
+    jobs.evaluate_rules(db_session, stock, "flat", current_price=101.0)
+    assert _evaluations(db_session) == 2
+
+    jobs.evaluate_rules(db_session, stock, "holding", current_price=101.0)
+    assert _evaluations(db_session) == 3
+
+    corrected = {**rows[-1], "close": rows[-1]["close"] + 1}
+    ingestion.upsert_daily_bars(db_session, stock.id, [corrected], source="fixture")
+    jobs.evaluate_rules(db_session, stock, "holding", current_price=101.0)
+    assert _evaluations(db_session) == 4
+
+    new_bar = {**rows[-1], "bar_date": rows[-1]["bar_date"] + timedelta(days=1)}
+    ingestion.upsert_daily_bars(db_session, stock.id, [new_bar], source="fixture")
+    jobs.evaluate_rules(db_session, stock, "holding", current_price=101.0)
+    assert _evaluations(db_session) == 5
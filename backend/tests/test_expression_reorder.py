@@ -0,0 +1,112 @@
+import itertools
+
+import pytest
+
+from app.rule_context import build_functions
+from app.rule_engine import (
+    compile_expression,
+    compile_plan,
+    evaluate_expression,
+    interpret_expression,
+    node_cost,
+    parse_expression,
+    reorder_by_cost,
+)
+from app.series import SeriesAccessor
+from synthetic_bars import make_bars
+
+
+@pytest.mark.parametrize(
+    ("source", "expected"),
+    [
+        ("RSI(14) lt 30 and Close gt 100", "Close gt 100 and RSI(14) lt 30"),
+        ("RSI(14) lt 30 and SMA(50) gt 1 and Close gt 1", "Close gt 1 and SMA(50) gt 1 and RSI(14) lt 30"),
+        ("(VWAP(20) gt 1 or ind.ma20 gt 2) or Close gt 3", "Close gt 3 or VWAP(20) gt 1 or ind.ma20 gt 2"),
+        ("not (EMA(10) gt 1 and Volume gt 1)", "not (Volume gt 1 and EMA(10) gt 1)"),
+        (
+            "Close / Volume gt 1 and RSI(14) lt 30 and Close gt 1",
+            "Close / Volume gt 1 and Close gt 1 and RSI(14) lt 30",
+        ),
+        ("NOPE(1) gt 1 or Close gt 1", "NOPE(1) gt 1 or Close gt 1"),
+        ("Close[Volume] gt 1 and Close gt 1", "Close[Volume] gt 1 and Close gt 1"),
+        ("SMA(250)[0] lt 0 and ind.missing[0] gt 1", "SMA(250)[0] lt 0 and ind.missing[0] gt 1"),
+        ("SMA(250) lt 0 or highest(ind.missing, 5) gt 1", "SMA(250) lt 0 or highest(ind.missing, 5) gt 1"),
+    ],
+)
+def test_boolean_operands_are_ordered_cheapest_first(source, expected):
+    assert reorder_by_cost(parse_expression(source)) == parse_expression(expected)
+
+
+def test_cost_reflects_indicator_period_and_safety():
+    assert node_cost(parse_expression("SMA(50)"))[0] > node_cost(parse_expression("SMA(5)"))[0]
+    assert node_cost(parse_expression("RSI(14)"))[0] > node_cost(parse_expression("SMA(20)"))[0]
+    assert node_cost(parse_expression("Close / 2"))[1] is True
+    assert node_cost(parse_expression("Close / Volume"))[1] is False
+    assert node_cost(parse_expression("highest(Close, 20)"))[1] is True
+    assert node_cost(parse_expression("highest(Close + 1, 20)"))[1] is False
+    assert node_cost(parse_expression("ind.ma20[1]"))[1] is False
+    assert node_cost(parse_expression("ind.ma20[1]"), frozenset({"ind.ma20"}))[1] is True
+
+
+def test_undeclared_indicators_are_not_moved_ahead_of_a_short_circuit():
+    context = {"Close": SeriesAccessor([bar.close for bar in reversed(make_bars(40))])}
+    functions = build_functions(make_bars(40))
+    for expr in (
+        "SMA(250)[0] lt 0 and ind.missing[0] gt 1",
+        "SMA(250)[0] lt 0 and highest(ind.missing, 5) gt 1",
+    ):
+        assert interpret_expression(expr, context, functions) is False
+        assert evaluate_expression(expr, context, functions) is False
+
+
+def test_declared_indicators_are_reordered_within_a_plan():
+    plan = {
+        "entry_rules": [{"id": "E1", "condition_expr": "SMA(250)[0] lt 0 and ind.ma20[0] gt 1"}],
+        "indicators": [{"id": "ma20", "type": "MA", "ma_type": "SMA", "period": 20}],
+    }
+    assert compile_plan(plan).keys[0] == ("ident", "ind.ma20")
+    assert compile_plan({**plan, "indicators": []}).keys[0] == ("number", 250.0)
+    assert reorder_by_cost(
+        parse_expression("SMA(250)[0] lt 0 and ind.ma20[0] gt 1"), frozenset({"ind.ma20"})
+    ) == parse_expression("ind.ma20[0] gt 1 and SMA(250)[0] lt 0")
+
+
+def test_reordered_results_match_left_to_right_with_missing_values():
+    operands = ["Close gt 100", "RSI(14) lt 50", "SMA(5) gt SMA(20)", "Volume[3] gt 1", "Missing lt 1"]
+    expressions = [
+        f" {joiner} ".join(combo)
+        for joiner in ("and", "or")
+        for combo in itertools.permutations(operands, 3)
+    ]
+    expressions += [f"not ({a} and {b}) or {c}" for a, b, c in itertools.permutations(operands, 3)]
+    bars = make_bars(60)
+    for end in (3, 15, 30, 60):
+        window = bars[:end]
+        context = {
+            "Close": SeriesAccessor([bar.close for bar in reversed(window)]),
+            "Volume": SeriesAccessor([bar.volume for bar in reversed(window)]),
+        }
+        functions = build_functions(window)
+        for expr in expressions:
+            assert evaluate_expression(expr, context, functions) == interpret_expression(
+                expr, context, functions
+            )
+
+
+def test_cheap_operand_short_circuits_expensive_indicator():
+    calls = []
+    functions = build_functions(make_bars(60))
+    rsi = functions["RSI"]
+    functions["RSI"] = lambda period: calls.append(period) or rsi(period)
+    context = {"Close": SeriesAccessor([100.0])}
+
+    assert evaluate_expression("RSI(14) lt 101 and Close gt 1000", context, functions) is False
+    assert evaluate_expression("RSI(14) lt 0 or Close gt 1", context, functions) is True
+    assert calls == []
+    assert compile_expression("RSI(14) lt 101 and Close gt 1000").tree[1] == parse_expression("Close gt 1000")
+
+
+def test_division_errors_are_not_hidden_by_reordering():
+    context = {"Close": SeriesAccessor([100.0]), "Zero": SeriesAccessor([0.0])}
+    with pytest.raises(ValueError, match="Division by zero"):
+        evaluate_expression("Close / Zero gt 1 and Close gt 1000", context, {})
@@ -1,4 +1,8 @@
+import pytest
+
+from app import indicator_engine
 from app.indicator_engine import compute_ema, compute_rsi, compute_sma, compute_vwap
+from synthetic_bars import make_bar_rows
 
 
 def test_compute_sma():
@@ -27,3 +31,52 @@ def test_compute_vwap():
     volumes = [1, 1, 1, 1]
     result = compute_vwap(prices, volumes, 2)
     assert result == [None, 15.0, 25.0, 35.0]
+
+
+def _random_walk(count, seed=3):
+    rows = make_bar_rows(count, seed=seed)
+    prices = [row["close"] for row in rows]
+    volumes = [row["volume"] for row in rows]
+    for idx in range(40, min(count, 60)):
+        volumes[idx] = 0
+    return prices, volumes
+
+
+def _assert_close(expected, actual, tolerance=1e-9):
+    assert len(expected) == len(actual)
+    for left, right in zip(expected, actual):
+        assert (left is None) == (right is None)
+        if left is not None:
+            assert abs(left - right) <= tolerance * max(1.0, abs(left))
+
+
+@pytest.mark.skipif(not indicator_engine.NUMPY_AVAILABLE, reason="numpy not installed")
+@pytest.mark.parametrize("count", [0, 3, 300, 5000])
+@pytest.mark.parametrize("period", [1, 2, 14, 250])
+def test_numpy_engine_matches_python(count, period):
+    prices, volumes = _random_walk(count)
+    _assert_close(
+        indicator_engine._compute_sma_python(prices, period),
+        indicator_engine._compute_sma_numpy(prices, period),
+    )
+    _assert_close(
+        indicator_engine._compute_ema_python(prices, period),
+        indicator_engine._compute_ema_numpy(prices, period),
+    )
+    _assert_close(
+        indicator_engine._compute_rsi_python(prices, period),
+        indicator_engine._compute_rsi_numpy(prices, period),
+    )
+    _assert_close(
+        indicator_engine._compute_vwap_python(prices, volumes, period),
+        indicator_engine._compute_vwap_numpy(prices, volumes, period),
+    )
+
+
+def test_dispatch_falls_back_to_python(monkeypatch):
+    monkeypatch.setattr(indicator_engine, "NUMPY_AVAILABLE", False)
+    prices, volumes = _random_walk(500)
+    assert compute_sma(prices, 20) == indicator_engine._compute_sma_python(prices, 20)
+    assert compute_vwap(prices, volumes, 20) == indicator_engine._compute_vwap_python(
+        prices, volumes, 20
+    )
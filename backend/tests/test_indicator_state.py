@@ -0,0 +1,112 @@
+import json
+from datetime import date
+
+import pytest
+
+from app import indicator_engine, ingestion, models
+from synthetic_bars import make_bar_rows, make_close_rows
+
+
+@pytest.mark.parametrize("kind", ["SMA", "EMA", "RSI", "VWAP"])
+@pytest.mark.parametrize("period", [1, 3, 14])
+def test_streaming_state_matches_full_series(kind, period):
+    rows = make_bar_rows(60, seed=5)
+    prices = [row["close"] for row in rows]
+    volumes = [row["volume"] for row in rows]
+    expected = {
+        "SMA": lambda: indicator_engine._compute_sma_python(prices, period),
+        "EMA": lambda: indicator_engine._compute_ema_python(prices, period),
+        "RSI": lambda: indicator_engine._compute_rsi_python(prices, period),
+        "VWAP": lambda: indicator_engine._compute_vwap_python(prices, volumes, period),
+    }[kind]()
+
+    state = indicator_engine.new_indicator_state()
+    streamed = []
+    for price, volume in zip(prices, volumes):
+        state = json.loads(json.dumps(state))
+        streamed.append(
+            indicator_engine.advance_indicator_state(kind, period, state, price, volume)
+        )
+
+    for left, right in zip(expected, streamed):
+        assert (left is None) == (right is None)
+        if left is not None:
+            assert right == pytest.approx(left, rel=1e-12)
+
+
+def _setup_stock(db):
+    stock = models.Stock(ticker="MSFT", market="US", currency="USD")
+    db.add(stock)
+    db.commit()
+    plan = models.RulePlan(stock_id=stock.id, version=1, is_active=True, rules_json="{}")
+    db.add(plan)
+    db.commit()
+    for indicator_id, indicator_type, params in [
+        ("ma5", "MA", {"ma_type": "SMA", "period": 5}),
+        ("ema5", "MA", {"ma_type": "EMA", "period": 5}),
+        ("rsi3", "RSI", {"period": 3}),
+        ("vwap4", "VWAP", {"period": 4}),
+    ]:
+        db.add(
+            models.IndicatorDef(
+                stock_id=stock.id,
+                rule_plan_id=plan.id,
+                indicator_id=indicator_id,
+                indicator_type=indicator_type,
+                params_json=json.dumps(params),
+                timeframe="1D",
+                price_field="close",
+                use_eod_only=True,
+            )
+        )
+    db.commit()
+    return stock
+
+
+def _latest_values(db, stock_id):
+    rows = (
+        db.query(models.IndicatorValue)
+        .filter(models.IndicatorValue.stock_id == stock_id)
+        .all()
+    )
+    latest = max(row.as_of_date for row in rows)
+    return {row.indicator_id: row.value for row in rows if row.as_of_date == latest}
+
+
+def _full_recompute(db, stock_id):
+    db.query(models.IndicatorState).delete()
+    db.commit()
+    return indicator_engine.compute_indicators_for_stock(db, stock_id)
+
+
+def test_new_bar_advances_state_incrementally(db_session):
+    stock = _setup_stock(db_session)
+    rows = make_bar_rows(40, seed=5)
+    ingestion.upsert_daily_bars(db_session, stock.id, rows[:39], source="test")
+    summary = indicator_engine.compute_indicators_for_stock(db_session, stock.id)
+    assert summary == {"incremental": 0, "recomputed": 4}
+
+    ingestion.upsert_daily_bars(db_session, stock.id, rows[30:], source="test")
+    summary = indicator_engine.compute_indicators_for_stock(db_session, stock.id)
+    assert summary == {"incremental": 4, "recomputed": 0}
+    incremental = _latest_values(db_session, stock.id)
+
+    _full_recompute(db_session, stock.id)
+    assert _latest_values(db_session, stock.id) == pytest.approx(incremental)
+
+
+def test_revised_history_forces_full_recompute(db_session):
+    stock = _setup_stock(db_session)
+    rows = make_bar_rows(30, seed=5)
+    ingestion.upsert_daily_bars(db_session, stock.id, rows, source="test")
+    indicator_engine.compute_indicators_for_stock(db_session, stock.id)
+
+    revised = dict(rows[-3], close=rows[-3]["close"] + 5)
+    ingestion.upsert_daily_bars(db_session, stock.id, [revised], source="test")
+    summary = indicator_engine.compute_indicators_for_stock(db_session, stock.id)
+    assert summary == {"incremental": 0, "recomputed": 4}
+
+    backfill = make_close_rows([10.0], [100], start=date(2023, 12, 1))
+    ingestion.upsert_daily_bars(db_session, stock.id, backfill, source="test")
+    summary = indicator_engine.compute_indicators_for_stock(db_session, stock.id)
+    assert summary == {"incremental": 0, "recomputed": 4}
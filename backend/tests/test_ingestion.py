@@ -0,0 +1,131 @@
+from datetime import date, timedelta
+
+from app import ingestion, jobs, market_data, models
+
+
+def _rows(count, close=100.0, start=date(2025, 1, 1)):
+    return [
+        {
+            "bar_date": start + timedelta(days=idx),
+            "open": close,
+            "high": close + 1,
+            "low": close - 1,
+            "close": close + idx,
+            "adjusted_close": None,
+            "volume": 1000,
+        }
+        for idx in range(count)
+    ]
+
+
+def test_bulk_upsert_reports_inserted_and_changed(db_session):
+    rows = _rows(5)
+    result = ingestion.upsert_daily_bars(db_session, 1, rows, source="test")
+    assert result.as_dict() == {"inserted": 5, "updated": 0, "unchanged": 0}
+
+    revised = [dict(row) for row in rows] + _rows(1, start=date(2025, 1, 6))
+    revised[1]["close"] = 555.0
+    revised[2]["adjusted_close"] = 102.0
+    result = ingestion.upsert_daily_bars(db_session, 1, revised, source="revised")
+    assert result.as_dict() == {"inserted": 1, "updated": 2, "unchanged": 3}
+
+    stored = {
+        bar.bar_date: bar
+        for bar in db_session.query(models.DailyBar).filter(models.DailyBar.stock_id == 1)
+    }
+    assert len(stored) == 6
+    assert stored[date(2025, 1, 2)].close == 555.0
+    assert stored[date(2025, 1, 2)].source == "revised"
+    assert stored[date(2025, 1, 3)].adjusted_close == 102.0
+    assert stored[date(2025, 1, 1)].source == "test"
+
+
+def test_bulk_upsert_many_stocks_in_chunks(db_session, monkeypatch):
+    monkeypatch.setattr(ingestion, "BULK_UPSERT_ROWS", 7)
+    result = ingestion.upsert_daily_bars_bulk(
+        db_session, {stock_id: _rows(10) for stock_id in (1, 2, 3)}, source="test"
+    )
+    assert result.inserted == 30
+    assert db_session.query(models.DailyBar).count() == 30
+
+    revised = _rows(10)
+    revised[0]["close"] += 1
+    results = ingestion.upsert_daily_bars_by_stock(
+        db_session, {1: revised, 2: _rows(10) + _rows(1, start=date(2025, 2, 1))}, source="test"
+    )
+    assert results[1].as_dict() == {"inserted": 0, "updated": 1, "unchanged": 9}
+    assert results[2].as_dict() == {"inserted": 1, "updated": 0, "unchanged": 10}
+
+
+class FakeDailyClient:
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def fetch_daily_bars(self, symbol, start_date=None, end_date=None, outputsize=100):
+        self.calls.append({"start_date": start_date, "end_date": end_date, "outputsize": outputsize})
+        selected = [
+            bar
+            for bar in self.bars
+            if (start_date is None or bar.bar_date >= start_date)
+            and (end_date is None or bar.bar_date <= end_date)
+        ]
+        return selected[-outputsize:]
+
+
+def _market_bars(count, start=date(2025, 1, 1)):
+    return [
+        market_data.DailyBar(
+            bar_date=start + timedelta(days=idx),
+            open=10.0,
+            high=11.0,
+            low=9.0,
+            close=10.0 + idx,
+            adjusted_close=None,
+            volume=100,
+        )
+        for idx in range(count)
+    ]
+
+
+def _stock(db):
+    stock = models.Stock(ticker="AAPL", market="US", currency="USD")
+    db.add(stock)
+    db.commit()
+    return stock
+
+
+def test_ingest_requests_only_missing_range(db_session, monkeypatch):
+    monkeypatch.setenv("DAILY_BARS_OVERLAP_DAYS", "2")
+    stock = _stock(db_session)
+    client = FakeDailyClient(_market_bars(30))
+    ingestion.upsert_daily_bars(
+        db_session, stock.id, [{**vars(bar)} for bar in client.bars[:20]], source="test"
+    )
+
+    result = jobs.ingest_daily_bars(db_session, stock, client, as_of=date(2025, 1, 30))
+    assert client.calls == [
+        {"start_date": date(2025, 1, 18), "end_date": None, "outputsize": 13}
+    ]
+    assert result.as_dict() == {"inserted": 10, "updated": 0, "unchanged": 3}
+
+    result = jobs.ingest_daily_bars(db_session, stock, client, as_of=date(2025, 1, 30))
+    assert len(client.calls) == 1
+    assert result.inserted == 0
+
+
+def test_backfill_pages_backwards(db_session):
+    stock = _stock(db_session)
+    client = FakeDailyClient(_market_bars(25))
+    ingestion.upsert_daily_bars(
+        db_session, stock.id, [{**vars(bar)} for bar in client.bars[-3:]], source="test"
+    )
+
+    result = jobs.backfill_daily_bars(db_session, stock, client, page_size=10)
+    assert result.inserted == 22
+    assert [call["end_date"] for call in client.calls] == [
+        date(2025, 1, 22),
+        date(2025, 1, 12),
+        date(2025, 1, 2),
+    ]
+    assert db_session.query(models.DailyBar).count() == 25
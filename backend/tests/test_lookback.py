@@ -0,0 +1,121 @@
+import copy
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, indicator_engine, ingestion, jobs, models, rule_engine, schemas
+from synthetic_bars import make_bar_rows
+
+
+def _indicator(indicator_id: str, indicator_type: str, **params) -> models.IndicatorDef:
+    return models.IndicatorDef(
+        stock_id=1,
+        rule_plan_id=1,
+        indicator_id=indicator_id,
+        indicator_type=indicator_type,
+        params_json=json.dumps(params),
+        timeframe="1D",
+        price_field="close",
+        use_eod_only=True,
+    )
+
+
+def _plan(*exprs: str, conditions: list[dict] | None = None) -> dict:
+    return {
+        "entry_rules": [{"id": f"E{idx}", "condition_expr": expr} for idx, expr in enumerate(exprs)],
+        "exit_rules": {"conditions": [{"id": "X", "condition": c} for c in conditions or []]},
+    }
+
+
+@pytest.mark.parametrize(
+    "expr, expected",
+    [
+        ("Close[0] lte SMA(250)[0] - 15", 250),
+        ("Close[5] gt highest(Close, 20)", 20),
+        ("Close[30] gt lowest(High, 20)", 31),
+        ("SMA(5)[3] crossover SMA(10)", 11),
+        ("EMA(10)[2] gt Close", 10 * 20 + 1 + 2),
+        ("change(Close) gt 0", 2),
+        ("Volume gt 100", 1),
+    ],
+)
+def test_expression_lookback(expr, expected):
+    assert rule_engine.plan_lookback(_plan(expr), []) == expected
+
+
+def test_dynamic_index_is_unbounded():
+    assert rule_engine.plan_lookback(_plan("Close[SMA(2)[0]] gt 1"), []) is None
+
+
+def test_plan_lookback_includes_indicator_definitions(monkeypatch):
+    monkeypatch.setenv("LOOKBACK_WARMUP_PERIODS", "5")
+    indicators = [_indicator("ma50", "MA", period=50, ma_type="SMA"), _indicator("rsi14", "RSI", period=14)]
+    plan = _plan(
+        "Close gt ind.ma50[10]",
+        conditions=[{"op": "lt", "left": "ind.rsi14", "right": "Close"}],
+    )
+    assert rule_engine.plan_lookback(plan, indicators) == 14 * 5 + 1
+
+
+@pytest.fixture()
+def deep_history_stock(db_session, rule_plan_payload):
+    stock = models.Stock(ticker="DEEP", market="US", currency="USD")
+    db_session.add(stock)
+    db_session.commit()
+    plan = copy.deepcopy(rule_plan_payload)
+    plan["entry_rules"][0]["condition_expr"] = "Close[0] lte SMA(50)[0] and ind.rsi14 lt 60"
+    crud.create_rule_plan(db_session, stock, schemas.RulePlanCreate(version=1, is_active=True, rules=plan))
+    ingestion.upsert_daily_bars(db_session, stock.id, make_bar_rows(3000, seed=3), source="fixture")
+    return stock, plan
+
+
+def test_evaluation_loads_only_the_lookback_window(db_session, deep_history_stock):
+    stock, plan = deep_history_stock
+    loaded = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT daily_bars.id"):
+            loaded.append((statement, parameters))
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        decision, _ = jobs.evaluate_rules(db_session, stock, "flat", current_price=90.0)
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+
+    assert len(loaded) == 1
+    statement, parameters = loaded[0]
+    assert "LIMIT" in statement
+    assert 14 * 20 + 1 in parameters
+
+    bars = jobs.load_recent_bars(db_session, stock.id, None)
+    indicators = db_session.query(models.IndicatorDef).filter_by(stock_id=stock.id).all()
+    full = rule_engine.evaluate_with_bars(plan, bars, indicators, "flat", current_price=90.0)
+    assert decision["state_key"] == full.state_key
+
+
+def test_indicator_recompute_replays_only_the_warmup_window(db_session, deep_history_stock):
+    stock, _ = deep_history_stock
+    work = indicator_engine.prepare_indicator_work(db_session, stock.id)
+    by_id = {item["indicator_id"]: item for item in work.items}
+    assert len(by_id["ma20"]["prices"]) == 20
+    assert len(by_id["rsi14"]["prices"]) == 14 * 20 + 1
+
+    states = indicator_engine.replay_indicator_items(work.items)
+    bars = jobs.load_recent_bars(db_session, stock.id, None)
+    closes = [bar.close for bar in bars]
+    for item, state in zip(work.items, states):
+        assert state["count"] == 3000
+        if item["kind"] == "SMA":
+            expected = indicator_engine.compute_sma(closes, item["lookback"])[-1]
+            assert state["value"] == pytest.approx(expected, rel=1e-12)
+        else:
+            expected = indicator_engine.compute_rsi(closes, item["lookback"])[-1]
+            assert state["value"] == pytest.approx(expected, abs=1e-6)
+
+    indicator_engine.apply_indicator_work(db_session, work, states)
+    db_session.commit()
+    resumed = indicator_engine.prepare_indicator_work(db_session, stock.id)
+    assert resumed.summary == {"incremental": 3, "recomputed": 0}
@@ -0,0 +1,205 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+import requests
+
+from app import models, scheduler
+from app.batch_evaluation import BatchEvaluation
+from app.market_data import (
+    AsyncTwelveDataClient,
+    TwelveDataClient,
+    fetch_intraday_prices_concurrently,
+    get_http_session,
+)
+from app.rate_limit import CreditRateLimiter, RateLimitError
+from twelvedata_stub import TwelveDataStub
+
+
+@pytest.fixture()
+def stub():
+    with TwelveDataStub({"AAPL": 190.5, "MSFT": 410.25, "NVDA": 120.0}) as server:
+        yield server
+
+
+def _client(stub, **kwargs):
+    return TwelveDataClient(**stub.client_kwargs(), **kwargs)
+
+
+def test_fetch_intraday_prices_parses_multi_symbol_response(stub):
+    prices = _client(stub).fetch_intraday_prices(["AAPL", "MSFT", "NVDA"], chunk_size=10)
+    assert prices == {"AAPL": 190.5, "MSFT": 410.25, "NVDA": 120.0}
+    assert len(stub.requests) == 1
+    assert stub.requests[0][1]["symbol"] == "AAPL,MSFT,NVDA"
+
+
+def test_fetch_intraday_prices_chunks_and_skips_unknown(stub):
+    prices = _client(stub).fetch_intraday_prices(
+        ["AAPL", "MSFT", "AAPL", "ZZZZ", "NVDA"], chunk_size=2
+    )
+    assert prices == {"AAPL": 190.5, "MSFT": 410.25, "NVDA": 120.0}
+    assert [params["symbol"] for _, params in stub.requests] == ["AAPL,MSFT", "ZZZZ,NVDA"]
+
+
+def test_fetch_intraday_prices_keeps_chunks_fetched_before_a_failure():
+    with TwelveDataStub({"AAPL": 1.0, "MSFT": 2.0, "NVDA": 3.0}, failing={"MSFT"}) as failing:
+        client = TwelveDataClient(**failing.client_kwargs())
+        prices = client.fetch_intraday_prices(["AAPL", "MSFT", "NVDA"], chunk_size=1)
+        assert prices == {"AAPL": 1.0, "NVDA": 3.0}
+        with pytest.raises(requests.HTTPError):
+            client.fetch_intraday_prices(["MSFT"])
+
+
+def test_fetch_intraday_prices_keeps_chunks_fetched_before_rate_limit(stub):
+    limiter = CreditRateLimiter(per_minute=2, per_day=1000, timeout=0.1)
+    client = TwelveDataClient(api_key="test", base_url=stub.base_url, limiter=limiter)
+    prices = client.fetch_intraday_prices(["AAPL", "MSFT", "NVDA"], chunk_size=2)
+    assert prices == {"AAPL": 190.5, "MSFT": 410.25}
+    with pytest.raises(RateLimitError):
+        client.fetch_intraday_prices(["NVDA"])
+
+
+def test_fetch_intraday_prices_single_symbol_shape(stub):
+    client = _client(stub)
+    assert client.fetch_intraday_prices(["MSFT"]) == {"MSFT": 410.25}
+    assert client.fetch_intraday_prices(["ZZZZ"]) == {}
+    assert client.fetch_intraday_price("AAPL") == 190.5
+
+
+def test_clients_share_pooled_session(stub):
+    first = _client(stub)
+    second = _client(stub)
+    assert first.session is second.session is get_http_session()
+
+
+def test_async_client_fans_out_with_bounded_concurrency():
+    with TwelveDataStub({"AAPL": 1.0, "MSFT": 2.0, "NVDA": 3.0, "AMD": 4.0}, delay=0.2) as slow:
+
+        async def fetch(max_concurrency):
+            async with AsyncTwelveDataClient(
+                **slow.client_kwargs(), max_concurrency=max_concurrency
+            ) as client:
+                started = time.perf_counter()
+                prices = await client.fetch_intraday_prices(
+                    ["AAPL", "MSFT", "NVDA", "AMD"], chunk_size=1
+                )
+                return prices, time.perf_counter() - started
+
+        prices, parallel = asyncio.run(fetch(4))
+        assert prices == {"AAPL": 1.0, "MSFT": 2.0, "NVDA": 3.0, "AMD": 4.0}
+        _, bounded = asyncio.run(fetch(2))
+        assert parallel < 0.6
+        assert bounded >= 0.4
+
+
+def test_fetch_intraday_prices_concurrently(stub):
+    prices = fetch_intraday_prices_concurrently(
+        ["AAPL", "MSFT", "ZZZZ"], chunk_size=1, **stub.client_kwargs()
+    )
+    assert prices == {"AAPL": 190.5, "MSFT": 410.25}
+    assert len(stub.requests) == 3
+
+
+def test_async_quotes_keep_successful_chunks_when_one_fails():
+    with TwelveDataStub({"AAPL": 1.0, "MSFT": 2.0, "NVDA": 3.0}, failing={"MSFT"}) as failing:
+        prices = fetch_intraday_prices_concurrently(
+            ["AAPL", "MSFT", "NVDA"], chunk_size=1, **failing.client_kwargs()
+        )
+        assert prices == {"AAPL": 1.0, "NVDA": 3.0}
+
+        async def fetch_all_failing():
+            async with AsyncTwelveDataClient(**failing.client_kwargs()) as client:
+                return await client.fetch_intraday_prices(["MSFT"])
+
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(fetch_all_failing())
+
+
+def test_async_quotes_keep_chunks_fetched_before_rate_limit(stub):
+    limiter = CreditRateLimiter(per_minute=2, per_day=1000, timeout=0.1)
+    prices = fetch_intraday_prices_concurrently(
+        ["AAPL", "MSFT", "NVDA", "AMD"],
+        chunk_size=2,
+        api_key="test",
+        base_url=stub.base_url,
+        limiter=limiter,
+        max_concurrency=1,
+    )
+    assert prices == {"AAPL": 190.5, "MSFT": 410.25}
+
+
+def test_run_market_monitor_survives_quote_failure(db_session, monkeypatch):
+    for ticker in ("AAPL", "MSFT"):
+        db_session.add(models.Stock(ticker=ticker, market="US", currency="USD", status="active"))
+    db_session.commit()
+
+    def failing_fetch(symbols, **kwargs):
+        raise RateLimitError("Twelve Data rate limit: timed out in queue")
+
+    evaluated = []
+    monkeypatch.setattr(scheduler, "SessionLocal", lambda: db_session)
+    monkeypatch.setattr(scheduler, "is_trading_day", lambda now: True)
+    monkeypatch.setattr(scheduler, "fetch_intraday_prices_concurrently", failing_fetch)
+    monkeypatch.setattr(
+        scheduler,
+        "evaluate_all",
+        lambda db, stocks, prices=None: evaluated.extend(stocks) or BatchEvaluation(),
+    )
+
+    scheduler.run_market_monitor()
+
+    assert evaluated == []
+    missing = db_session.query(models.AuditLog).filter_by(event_type="INTRADAY_PRICE_MISSING").all()
+    assert len(missing) == 2
+    assert all("timed out in queue" in row.payload_json for row in missing)
+
+
+def test_run_market_monitor_uses_batch_quotes(db_session, stub, monkeypatch):
+    for ticker in ("AAPL", "MSFT", "ZZZZ"):
+        db_session.add(models.Stock(ticker=ticker, market="US", currency="USD", status="active"))
+    db_session.commit()
+
+    calls = []
+
+    def fake_evaluate_all(db, stocks, prices=None):
+        calls.extend((stock.ticker, prices[stock.ticker]) for stock in stocks)
+        return BatchEvaluation()
+
+    monkeypatch.setattr(scheduler, "SessionLocal", lambda: db_session)
+    def fetch_prices(symbols, **kwargs):
+        return fetch_intraday_prices_concurrently(symbols, **stub.client_kwargs(), **kwargs)
+
+    monkeypatch.setattr(scheduler, "TwelveDataClient", lambda **kwargs: _client(stub, **kwargs))
+    monkeypatch.setattr(scheduler, "fetch_intraday_prices_concurrently", fetch_prices)
+    monkeypatch.setattr(scheduler, "is_trading_day", lambda now: True)
+    monkeypatch.setattr(scheduler, "evaluate_all", fake_evaluate_all)
+
+    scheduler.run_market_monitor()
+
+    assert calls == [("AAPL", 190.5), ("MSFT", 410.25)]
+    assert len(stub.requests) == 1
+    missing = db_session.query(models.AuditLog).filter_by(event_type="INTRADAY_PRICE_MISSING").all()
+    assert len(missing) == 1
+
+
+def test_run_market_monitor_keeps_its_error_when_audit_flush_fails(db_session, monkeypatch):
+    db_session.add(models.Stock(ticker="AAPL", market="US", currency="USD", status="active"))
+    db_session.commit()
+
+    def failing_evaluate_all(db, stocks, prices=None):
+        raise RuntimeError("evaluation failed")
+
+    def failing_flush():
+        raise RuntimeError("audit flush failed")
+
+    monkeypatch.setattr(scheduler, "SessionLocal", lambda: db_session)
+    monkeypatch.setattr(scheduler, "is_trading_day", lambda now: True)
+    monkeypatch.setattr(
+        scheduler, "fetch_intraday_prices_concurrently", lambda symbols, **kwargs: {"AAPL": 1.0}
+    )
+    monkeypatch.setattr(scheduler, "evaluate_all", failing_evaluate_all)
+    monkeypatch.setattr(scheduler, "flush_audit_log", failing_flush)
+
+    with pytest.raises(RuntimeError, match="evaluation failed"):
+        scheduler.run_market_monitor()
@@ -0,0 +1,169 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from app import batch_evaluation, market_data, models, scheduler
+from app.audit_writer import flush_audit_log
+from app.batch_evaluation import BatchEvaluation
+from app.pipeline import PipelineReport, run_daily_pipeline
+
+
+class PipelineClient:
+    def __init__(self, bars_by_ticker, failing=()):
+        self.bars_by_ticker = bars_by_ticker
+        self.failing = set(failing)
+
+    def fetch_daily_bars(self, symbol, start_date=None, end_date=None, outputsize=100):
+        if symbol in self.failing:
+            raise ValueError(f"Unexpected response for {symbol}")
+        return self.bars_by_ticker[symbol][-outputsize:]
+
+
+def _bars(count, start=date(2025, 1, 1)):
+    return [
+        market_data.DailyBar(
+            bar_date=start + timedelta(days=idx),
+            open=10.0,
+            high=11.0,
+            low=9.0,
+            close=10.0 + (idx % 7),
+            adjusted_close=None,
+            volume=100 + idx,
+        )
+        for idx in range(count)
+    ]
+
+
+def _stocks(db, tickers):
+    stocks = []
+    for ticker in tickers:
+        stock = models.Stock(ticker=ticker, market="US", currency="USD")
+        db.add(stock)
+        db.commit()
+        plan = models.RulePlan(stock_id=stock.id, version=1, is_active=True, rules_json="{}")
+        db.add(plan)
+        db.commit()
+        db.add(
+            models.IndicatorDef(
+                stock_id=stock.id,
+                rule_plan_id=plan.id,
+                indicator_id="ma5",
+                indicator_type="MA",
+                params_json=json.dumps({"ma_type": "SMA", "period": 5}),
+                timeframe="1D",
+                price_field="close",
+                use_eod_only=True,
+            )
+        )
+        db.commit()
+        stocks.append(stock)
+    return stocks
+
+
+@pytest.fixture()
+def monitored(monkeypatch):
+    calls = []
+
+    def fake_evaluate_all(db, stocks, prices=None):
+        calls.extend((stock.ticker, prices[stock.ticker]) for stock in stocks)
+        failures = {stock.id: "no active rule plan" for stock in stocks if stock.ticker == "NOPLAN"}
+        return BatchEvaluation(evaluated=len(stocks) - len(failures), failures=failures)
+
+    monkeypatch.setattr(batch_evaluation, "evaluate_all", fake_evaluate_all)
+    return calls
+
+
+def _quotes(symbols, priority=None):
+    return {symbol: 100.0 for symbol in symbols}
+
+
+def test_pipeline_isolates_per_stock_failures(db_session, monitored):
+    stocks = _stocks(db_session, ["AAPL", "MSFT", "BAD"])
+    client = PipelineClient({"AAPL": _bars(30), "MSFT": _bars(30)}, failing={"BAD"})
+
+    report = run_daily_pipeline(
+        db_session, stocks, client, as_of=date(2025, 1, 30), quote_fetcher=_quotes
+    )
+
+    assert report.failures == {"BAD": {"stage": "fetch", "error": "Unexpected response for BAD"}}
+    assert sorted(report.succeeded) == ["AAPL", "MSFT"]
+    assert sorted(monitored) == [("AAPL", 100.0), ("MSFT", 100.0)]
+    assert report.counts["bars_inserted"] == 60
+    assert db_session.query(models.DailyBar).count() == 60
+    flush_audit_log()
+    ingested = db_session.query(models.AuditLog).filter_by(event_type="DAILY_BARS_INGESTED").all()
+    assert [json.loads(row.payload_json)["inserted"] for row in ingested] == [30, 30]
+    values = db_session.query(models.IndicatorValue).all()
+    assert {value.stock_id for value in values} == {stocks[0].id, stocks[1].id}
+    assert all(value.as_of_date == date(2025, 1, 30) for value in values)
+
+    summary = report.format()
+    for stage in ("plan", "fetch", "write", "indicators", "quotes", "monitor", "total"):
+        assert stage in summary
+    assert "FAILED BAD at fetch" in summary
+
+
+def test_pipeline_skips_up_to_date_and_reports_missing_quotes(db_session, monitored):
+    stocks = _stocks(db_session, ["AAPL", "MSFT"])
+    client = PipelineClient({"AAPL": _bars(30), "MSFT": _bars(30)})
+    run_daily_pipeline(db_session, stocks, client, as_of=date(2025, 1, 30), quote_fetcher=_quotes)
+    monitored.clear()
+
+    report = run_daily_pipeline(
+        db_session,
+        stocks,
+        client,
+        as_of=date(2025, 1, 30),
+        quote_fetcher=lambda symbols, priority=None: {"AAPL": 101.0},
+    )
+
+    assert report.counts["up_to_date"] == 2
+    assert report.counts["indicators_incremental"] == 2
+    assert monitored == [("AAPL", 101.0)]
+    assert report.failures["MSFT"]["stage"] == "quotes"
+
+
+def test_pipeline_replays_large_histories_in_process_pool(db_session, monitored, monkeypatch):
+    monkeypatch.setenv("PIPELINE_PROCESS_MIN_BARS", "1")
+    monkeypatch.setenv("PIPELINE_PROCESS_WORKERS", "2")
+    stocks = _stocks(db_session, ["AAPL", "MSFT"])
+    client = PipelineClient({"AAPL": _bars(40), "MSFT": _bars(40)})
+
+    report = run_daily_pipeline(
+        db_session, stocks, client, as_of=date(2025, 2, 9), quote_fetcher=_quotes
+    )
+
+    assert report.failures == {}
+    assert report.counts["indicators_in_process_pool"] == 2
+    values = db_session.query(models.IndicatorValue).all()
+    assert len(values) == 2
+    expected = sum(10.0 + (idx % 7) for idx in range(35, 40)) / 5
+    assert all(value.value == pytest.approx(expected) for value in values)
+
+
+def test_pipeline_monitors_the_watchlist_in_one_batch(db_session, monitored):
+    stocks = _stocks(db_session, ["AAPL", "MSFT", "NOPLAN"])
+    client = PipelineClient({ticker: _bars(30) for ticker in ("AAPL", "MSFT", "NOPLAN")})
+
+    report = run_daily_pipeline(
+        db_session, stocks, client, as_of=date(2025, 1, 30), quote_fetcher=_quotes
+    )
+
+    assert monitored == [("AAPL", 100.0), ("MSFT", 100.0), ("NOPLAN", 100.0)]
+    assert report.counts["evaluated"] == 2
+    assert report.failures == {"NOPLAN": {"stage": "monitor", "error": "no active rule plan"}}
+
+
+def test_daily_job_prints_its_report_when_audit_flush_fails(db_session, monkeypatch, capsys):
+    def failing_flush():
+        raise RuntimeError("audit flush failed")
+
+    monkeypatch.setattr(scheduler, "SessionLocal", lambda: db_session)
+    monkeypatch.setattr(scheduler, "is_trading_day", lambda now: True)
+    monkeypatch.setattr(scheduler, "TwelveDataClient", lambda **kwargs: None)
+    monkeypatch.setattr(scheduler, "run_daily_pipeline", lambda db, stocks, client: PipelineReport())
+    monkeypatch.setattr(scheduler, "flush_audit_log", failing_flush)
+
+    assert isinstance(scheduler.run_daily_job(), PipelineReport)
+    assert "Daily pipeline summary" in capsys.readouterr().out
@@ -0,0 +1,143 @@
+import copy
+
+import pytest
+
+from app import crud, models, schemas
+from app.rule_context import build_functions
+from app.rule_engine import (
+    compile_plan,
+    compile_plan_expressions,
+    evaluate_expression,
+    evaluate_rule_plan,
+)
+from app.series import SeriesAccessor
+from synthetic_bars import make_bars
+
+
+def _counting(functions: dict) -> tuple[dict, dict]:
+    calls: dict[str, int] = {}
+
+    def wrap(name, func):
+        def counted(*args):
+            calls[name] = calls.get(name, 0) + 1
+            return func(*args)
+
+        return counted
+
+    return {name: wrap(name, func) for name, func in functions.items()}, calls
+
+
+def _context(bars: list[models.DailyBar]) -> dict:
+    recent = list(reversed(bars))
+    return {
+        "Close": SeriesAccessor([bar.close for bar in recent]),
+        "Volume": SeriesAccessor([bar.volume for bar in recent]),
+    }
+
+
+PLAN = {
+    "entry_rules": [
+        {
+            "id": "E1",
+            "constraints_expr": ["Close gt SMA(20)", "Close / Close[20] gt 0.9"],
+            "condition_expr": "SMA(5) crossover SMA(20) or Close / Close[20] gt 1.05",
+        },
+        {"id": "E2", "condition_expr": "Close lt SMA(20) * 0.98 and RSI(14) lt 40"},
+    ],
+    "exit_rules": {
+        "conditions": [
+            {"id": "X1", "condition_expr": "Close lt SMA(20) or RSI(14) gt 70"},
+            {"id": "X2", "condition_expr": "Close / Close[20] lt 0.95"},
+        ]
+    },
+}
+
+
+def test_plan_graph_deduplicates_shared_subexpressions():
+    graph = compile_plan(PLAN)
+    stats = graph.stats()
+    assert stats["expressions"] == 6
+    assert stats["dag_nodes"] < stats["tree_nodes"]
+    assert stats["deduplicated"] == stats["tree_nodes"] - stats["dag_nodes"]
+    assert 0 < stats["memoized_nodes"] < stats["dag_nodes"]
+
+    alias = compile_plan_expressions(("Close gt SMA(20)", "Close > SMA(20)", "Close above SMA(20)"))
+    assert len(set(alias.roots.values())) == 1
+
+
+@pytest.mark.parametrize("position_state", ["flat", "holding"])
+def test_plan_graph_matches_per_expression_evaluation(position_state):
+    bars = make_bars(40)
+    for end in range(21, len(bars) + 1):
+        window = bars[:end]
+        context = _context(window)
+        functions = build_functions(window)
+        graph = compile_plan(PLAN)
+        scope = graph.scope(context, functions)
+        for expr in graph.roots:
+            assert scope.evaluate(expr) == evaluate_expression(expr, context, functions)
+
+        def check(expr):
+            return evaluate_expression(expr, context, functions)
+
+        result = evaluate_rule_plan(copy.deepcopy(PLAN), context, functions, position_state)
+        if position_state == "flat":
+            expected = [
+                rule["id"]
+                for rule in PLAN["entry_rules"]
+                if all(check(expr) for expr in rule.get("constraints_expr", []))
+                and check(rule["condition_expr"])
+            ]
+        else:
+            expected = [
+                rule["id"] for rule in PLAN["exit_rules"]["conditions"] if check(rule["condition_expr"])
+            ]
+        assert result.decision == ("ALLOW" if expected else "BLOCK")
+        if expected:
+            assert result.reasons[0]["source"] == expected[0]
+
+
+def test_plan_scope_evaluates_each_subexpression_once():
+    bars = make_bars(40)
+    functions, calls = _counting(build_functions(bars))
+    scope = compile_plan(PLAN).scope(_context(bars), functions)
+    for expr in scope.graph.roots:
+        scope.evaluate(expr)
+    assert calls == {"SMA": 2, "RSI": 1}
+
+    functions, calls = _counting(build_functions(bars))
+    for expr in scope.graph.roots:
+        evaluate_expression(expr, _context(bars), functions)
+    assert calls["SMA"] > 2
+
+
+def test_plan_scope_keeps_short_circuit_and_lazy_errors():
+    graph = compile_plan_expressions(("Close gt 1 or NOPE(3) gt 1", "Close gt (", "NOPE(3) gt 1"))
+    scope = graph.scope({"Close": SeriesAccessor([5.0])}, {})
+    assert scope.evaluate("Close gt 1 or NOPE(3) gt 1") is True
+    with pytest.raises(ValueError, match="Unknown function"):
+        scope.evaluate("NOPE(3) gt 1")
+    raised = []
+    for _ in range(2):
+        with pytest.raises(ValueError) as caught:
+            scope.evaluate("Close gt (")
+        raised.append(caught.value)
+    assert raised[0] is not raised[1]
+    assert str(raised[0]) == str(raised[1]) == graph.errors["Close gt ("]
+
+
+def test_debug_rule_plan_graph(client, db_session):
+    stock = models.Stock(ticker="AAPL", market="US", currency="USD")
+    db_session.add(stock)
+    db_session.commit()
+    plan = crud.create_rule_plan(
+        db_session, stock, schemas.RulePlanCreate(version=1, is_active=True, rules=PLAN)
+    )
+
+    body = client.get(f"/debug/rule-plans/{plan.id}/graph").json()
+    assert body["expressions"] == 6
+    assert body["dag_nodes"] < body["tree_nodes"]
+    assert body["errors"] == {}
+    assert body["costs"]["Close / Close[20] lt 0.95"] < body["costs"]["Close lt SMA(20) or RSI(14) gt 70"]
+    assert client.get("/debug/rule-plans/999/graph").status_code == 404
+    assert "plan_cache" in client.get("/debug/evaluation-stats").json()
@@ -0,0 +1,100 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+
+from app import ingestion, models
+from app.audit_maintenance import compact_audit_logs
+from app.db import (
+    Base,
+    create_db_engine,
+    ensure_audit_indexes,
+    ensure_decision_state_columns,
+    ensure_stock_columns,
+)
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+
+
+@pytest.fixture()
+def pg_session():
+    engine = create_db_engine(POSTGRES_URL)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+def _bars(count: int, close: float = 10.0) -> list[dict]:
+    start = date(2024, 1, 1)
+    return [
+        {
+            "bar_date": start + timedelta(days=idx),
+            "open": close,
+            "high": close,
+            "low": close,
+            "close": close,
+            "adjusted_close": None,
+            "volume": 100,
+        }
+        for idx in range(count)
+    ]
+
+
+def test_engine_is_pooled(pg_session):
+    engine = pg_session.get_bind()
+    assert engine.dialect.name == "postgresql"
+    assert engine.pool.size() == 5
+
+
+def test_bulk_upsert_on_postgres(pg_session):
+    stock = models.Stock(ticker="PG", market="US", currency="USD", status="active")
+    pg_session.add(stock)
+    pg_session.commit()
+
+    first = ingestion.upsert_daily_bars(pg_session, stock.id, _bars(5), source="test")
+    assert first.as_dict() == {"inserted": 5, "updated": 0, "unchanged": 0}
+
+    changed = _bars(6)
+    changed[-2]["close"] = 11.0
+    second = ingestion.upsert_daily_bars(pg_session, stock.id, changed, source="test")
+    assert second.as_dict() == {"inserted": 1, "updated": 1, "unchanged": 4}
+    assert pg_session.query(models.DailyBar).count() == 6
+
+
+def test_ensure_helpers_are_idempotent_on_postgres(pg_session):
+    engine = pg_session.get_bind()
+    for _ in range(2):
+        ensure_stock_columns(engine)
+        ensure_decision_state_columns(engine)
+        ensure_audit_indexes(engine)
+    index_names = {index["name"] for index in inspect(engine).get_indexes("audit_logs")}
+    assert "ix_audit_logs_stock_timestamp" in index_names
+
+
+def test_audit_compaction_on_postgres(pg_session):
+    day = datetime(2024, 3, 1, 14, 0)
+    for minute in range(3):
+        pg_session.add(
+            models.AuditLog(
+                timestamp=day + timedelta(minutes=minute),
+                stock_id=1,
+                event_type="RULE_EVALUATED",
+                payload_json=json.dumps({"minute": minute}),
+            )
+        )
+    pg_session.commit()
+
+    result = compact_audit_logs(pg_session, now=datetime(2024, 3, 10), after_days=2)
+    assert result == {"summaries": 1, "compacted": 3, "cutoff": "2024-03-08T00:00:00"}
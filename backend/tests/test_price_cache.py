@@ -0,0 +1,76 @@
+import time
+
+from app import models
+from app.price_cache import FRESH, MISS, STALE, PriceCache
+
+
+def test_ttl_and_stale_window():
+    cache = PriceCache(ttl_seconds=60, stale_seconds=300)
+    now = time.time()
+    cache.set("AAPL", 190.0, fetched_at=now - 30)
+    cache.set("MSFT", 410.0, fetched_at=now - 120)
+    cache.set("NVDA", 120.0, fetched_at=now - 600)
+
+    assert cache.lookup("AAPL") == (190.0, FRESH)
+    assert cache.lookup("MSFT") == (410.0, STALE)
+    assert cache.lookup("NVDA") == (None, MISS)
+    assert cache.get("MSFT") is None
+    assert cache.get("MSFT", ttl_seconds=180) == 410.0
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["stale"] == 2
+    assert stats["misses"] == 1
+    assert stats["size"] == 2
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = PriceCache(max_entries=2)
+    cache.set("AAPL", 1.0)
+    cache.set("MSFT", 2.0)
+    assert cache.get("AAPL") == 1.0
+    cache.set("NVDA", 3.0)
+
+    assert cache.get("MSFT") is None
+    assert cache.get("AAPL") == 1.0
+    assert cache.get("NVDA") == 3.0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_shared_backend_between_processes(tmp_path):
+    path = str(tmp_path / "prices.db")
+    scheduler_cache = PriceCache(path=path)
+    api_cache = PriceCache(path=path)
+
+    assert api_cache.get("AAPL") is None
+    scheduler_cache.set("AAPL", 190.5)
+    assert api_cache.get("AAPL") == 190.5
+    assert api_cache.stats()["shared_hits"] == 1
+
+    scheduler_cache.set("AAPL", 191.0, fetched_at=time.time() - 1000)
+    assert api_cache.get("AAPL") == 190.5
+
+
+def test_prune_drops_expired_shared_rows(tmp_path):
+    cache = PriceCache(ttl_seconds=10, stale_seconds=10, path=str(tmp_path / "prices.db"))
+    cache.set("OLD", 1.0, fetched_at=time.time() - 100)
+    cache.set("NEW", 2.0)
+    assert cache.prune() == 1
+    assert PriceCache(path=cache.path).lookup("OLD") == (None, MISS)
+
+
+def test_stock_prices_serves_stale_and_refreshes(client, db_session, isolated_price_cache, monkeypatch):
+    from app import main
+
+    db_session.add(models.Stock(ticker="AAPL", market="US", currency="USD", status="active"))
+    db_session.commit()
+    isolated_price_cache.set("AAPL", 189.0, fetched_at=time.time() - 120)
+
+    refreshed = []
+    monkeypatch.setattr(main, "_refresh_prices", lambda symbols: refreshed.append(symbols))
+
+    response = client.get("/stocks/prices")
+    assert response.status_code == 200
+    assert response.json()[0]["price"] == 189.0
+    assert refreshed == [["AAPL"]]
+    assert client.get("/debug/price-cache").json()["stale"] == 1
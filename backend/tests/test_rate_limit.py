@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from app import rate_limit
+from app.rate_limit import PRIORITY_HIGH, PRIORITY_LOW, CreditRateLimiter, RateLimitError
+
+
+def test_minute_bucket_blocks_when_exhausted():
+    limiter = CreditRateLimiter(per_minute=3, per_day=100)
+    limiter.acquire(2)
+    limiter.acquire(1)
+    with pytest.raises(RateLimitError) as exc:
+        limiter.acquire(1, timeout=0.05)
+    assert "rate limit" in str(exc.value).lower()
+    assert limiter.snapshot()["day_used"] == 3
+
+
+def test_daily_limit_fails_fast():
+    limiter = CreditRateLimiter(per_minute=10, per_day=2)
+    limiter.acquire(2)
+    started = time.monotonic()
+    with pytest.raises(RateLimitError):
+        limiter.acquire(1, timeout=5)
+    assert time.monotonic() - started < 1
+
+
+def test_low_priority_leaves_reserve_for_scheduler():
+    limiter = CreditRateLimiter(per_minute=4, per_day=100, reserve_pct=0.5)
+    limiter.acquire(2, priority=PRIORITY_LOW)
+    with pytest.raises(RateLimitError):
+        limiter.acquire(1, priority=PRIORITY_LOW, timeout=0.05)
+    limiter.acquire(1, priority=PRIORITY_HIGH, timeout=0.05)
+    limiter.acquire(1, priority=PRIORITY_HIGH, timeout=0.05)
+
+
+def test_limiters_share_file_state(tmp_path):
+    path = str(tmp_path / "rate_limit.db")
+    api = CreditRateLimiter(per_minute=4, per_day=100, path=path)
+    scheduler = CreditRateLimiter(per_minute=4, per_day=100, path=path)
+    api.acquire(3)
+    with pytest.raises(RateLimitError):
+        scheduler.acquire(2, timeout=0.05)
+    snapshot = scheduler.snapshot()
+    assert snapshot["day_used"] == 3
+    assert snapshot["minute_utilisation"] > 0.7
+
+
+def test_high_priority_waiter_goes_first():
+    limiter = CreditRateLimiter(per_minute=600, per_day=10000)
+    limiter.drain()
+    order = []
+
+    def worker(label, priority):
+        limiter.acquire(1, priority=priority, timeout=5)
+        order.append(label)
+
+    low = threading.Thread(target=worker, args=("low", PRIORITY_LOW))
+    high = threading.Thread(target=worker, args=("high", PRIORITY_HIGH))
+    low.start()
+    time.sleep(0.02)
+    high.start()
+    low.join()
+    high.join()
+    assert order == ["high", "low"]
+
+
+def test_debug_rate_limit_endpoint(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "_LIMITER", CreditRateLimiter(per_minute=8, per_day=800))
+    rate_limit.get_rate_limiter().acquire(2)
+    response = client.get("/debug/rate-limit")
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["day_used"] == 2
+    assert payload["per_minute"] == 8
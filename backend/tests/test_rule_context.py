@@ -0,0 +1,67 @@
+import json
+
+from app import models
+from app.rule_context import LazySeriesContext, build_series_context
+from app.rule_engine import collect_references, evaluate_with_bars
+from synthetic_bars import make_close_bars
+
+
+def _bars(count):
+    return make_close_bars([100.0 + idx for idx in range(count)])
+
+
+def _indicator(indicator_id, period):
+    return models.IndicatorDef(
+        stock_id=1,
+        rule_plan_id=1,
+        indicator_id=indicator_id,
+        indicator_type="MA",
+        params_json=json.dumps({"ma_type": "SMA", "period": period}),
+        timeframe="1D",
+        price_field="close",
+        use_eod_only=True,
+    )
+
+
+def test_collect_references(rule_plan_payload):
+    plan = dict(rule_plan_payload)
+    plan["exit_rules"] = {
+        "conditions": [
+            {"id": "X1", "condition": {"op": "lt", "left": "price.close", "right": "ind.ma20"}},
+            {"id": "X2", "condition_expr": "highest(High, 5) gt Close[1]"},
+        ]
+    }
+    assert collect_references(plan) == {"Close", "High", "price.close", "ind.ma20"}
+
+
+def test_lazy_context_only_materializes_accessed_series():
+    bars = _bars(30)
+    indicators = [_indicator("ma5", 5), _indicator("ma20", 20)]
+    context = build_series_context(
+        bars, indicators, current_price=200.0, references={"Close", "price.close", "ind.ma5"}
+    )
+
+    assert isinstance(context, LazySeriesContext)
+    assert "ind.ma20" not in context
+    assert context.get("Open") is None
+    assert context.materialized == set()
+
+    assert context["Close"].value_at(0) == 200.0
+    assert context["price.close"] is context["Close"]
+    assert context["ind.ma5"].value_at(0) == 127.0
+    assert context.materialized == {"Close", "price.close", "ind.ma5"}
+
+
+def test_lazy_context_adjusted_close_falls_back_to_close():
+    context = build_series_context(_bars(3), [])
+    assert context["price.adjusted_close"].values == [102.0, 101.0, 100.0]
+
+
+def test_evaluate_with_bars_uses_referenced_series(rule_plan_payload):
+    bars = _bars(260)
+    result = evaluate_with_bars(rule_plan_payload, bars, [_indicator("ma20", 20)], "flat")
+    assert result.decision == "BLOCK"
+    result = evaluate_with_bars(
+        rule_plan_payload, bars, [_indicator("ma20", 20)], "flat", current_price=50.0
+    )
+    assert result.decision == "ALLOW"
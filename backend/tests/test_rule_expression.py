@@ -1,6 +1,9 @@
 import math
+from datetime import date, timedelta
 
-from app.rule_engine import evaluate_expression
+from app import models
+from app.rule_context import SeriesMemo, build_functions
+from app.rule_engine import compile_expression, evaluate_expression, interpret_expression
 from app.series import SeriesAccessor
 
 
@@ -77,3 +80,69 @@ def test_expression_division_by_zero():
         assert "Division by zero" in str(exc)
     else:
         raise AssertionError("Expected division by zero error")
+
+
+def test_compiled_expression_matches_interpreter():
+    context = {
+        "Close": SeriesAccessor([105.0, 100.0, 98.0, 101.0]),
+        "Volume": SeriesAccessor([1600.0, 1000.0, 900.0, None]),
+        "Fast": SeriesAccessor([105.0, 100.0]),
+        "Slow": SeriesAccessor([102.0, 101.0]),
+    }
+    functions = {
+        "highest": lambda series, n: max(series.values[: int(n)]),
+    }
+    expressions = [
+        "(Close[0] / Close[2] - 1) * 100",
+        "-Close[1] + +Close",
+        "Volume[0] gt Volume[1] * 1.5 AND NOT Close lt 90",
+        "Volume[3] gt 1 OR Close[1 + 1] lte 98",
+        "Fast crossover Slow",
+        "Fast crossunder Slow",
+        "highest(Close, 3) eq Close[0]",
+        "Missing gt 1",
+    ]
+    for expr in expressions:
+        assert evaluate_expression(expr, context, functions) == interpret_expression(
+            expr, context, functions
+        )
+
+
+def test_compiled_expression_is_cached():
+    compile_expression.cache_clear()
+    first = compile_expression("Close[0] gt Close[1]")
+    second = compile_expression("Close[0] gt Close[1]")
+    assert first is second
+    assert compile_expression.cache_info().hits == 1
+
+
+def test_compiled_expression_unknown_function():
+    try:
+        evaluate_expression("NOPE(3)", {}, {})
+    except ValueError as exc:
+        assert "Unknown function" in str(exc)
+    else:
+        raise AssertionError("Expected unknown function error")
+
+
+def test_indicator_functions_are_memoized_per_context():
+    start = date(2025, 1, 1)
+    bars = [
+        models.DailyBar(
+            bar_date=start + timedelta(days=idx),
+            open=100.0 + idx,
+            high=101.0 + idx,
+            low=99.0 + idx,
+            close=100.0 + idx,
+            volume=1000,
+        )
+        for idx in range(30)
+    ]
+    memo = SeriesMemo()
+    functions = build_functions(bars, memo=memo)
+    expr = "SMA(5)[0] gt SMA(20)[0] AND SMA(5)[1] gte SMA(20)[1] AND SMA(5) crossover SMA(20)"
+    evaluate_expression(expr, {}, functions)
+
+    assert memo.misses == 2
+    assert memo.hits > 0
+    assert memo.stats()["hit_rate"] > 0.5
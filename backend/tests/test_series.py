@@ -0,0 +1,38 @@
+from app.series import BarColumns, SeriesAccessor
+from synthetic_bars import make_close_bars
+
+
+def test_view_indexes_from_latest_without_copying():
+    column = [1.0, 2.0, 3.0, 4.0]
+    series = SeriesAccessor.view(column)
+    assert series.value_at(0) == 4.0
+    assert series.value_at(3) == 1.0
+    assert series.value_at(4) is None
+    assert series.value_at(-1) is None
+    assert series.values == [4.0, 3.0, 2.0, 1.0]
+
+
+def test_view_head_override_and_missing_values():
+    series = SeriesAccessor.view([None, float("nan"), 3.0, 4.0], head=9.0)
+    assert series.value_at(0) == 9.0
+    assert series.value_at(1) == 3.0
+    assert series.value_at(2) is None
+    assert series.value_at(3) is None
+    assert series.window(3) == [9.0, 3.0, None]
+    assert series.window(10) == [9.0, 3.0, None, None]
+    assert series.window(0) == []
+
+
+def test_list_and_view_windows_agree():
+    column = [5.0, 6.0, 7.0]
+    assert SeriesAccessor.view(column).window(2) == SeriesAccessor([7.0, 6.0, 5.0]).window(2)
+
+
+def test_bar_columns_share_one_store_per_field():
+    bars = make_close_bars([10.0, 11.0, 12.0], [100, 200, 300])
+    columns = BarColumns.from_bars(list(reversed(bars)))
+    assert list(columns.column("close")) == [10.0, 11.0, 12.0]
+    assert list(columns.column("adjusted_close")) == [10.0, 11.0, 12.0]
+    assert list(columns.column("volume")) == [100, 200, 300]
+    assert columns.series("close").value_at(1) == 11.0
+    assert columns.column("close") is columns.column("close")
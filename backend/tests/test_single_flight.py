@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.market_data import TwelveDataClient, fetch_intraday_prices_concurrently
+from app.single_flight import SingleFlight
+from twelvedata_stub import TwelveDataStub
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: flight.do("AAPL", slow), range(8)))
+
+    assert results == [42] * 8
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 7}
+
+
+def test_error_is_shared_with_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "AAPL", failing)
+        started.wait()
+        follower = pool.submit(flight.do, "AAPL", lambda: 1)
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="upstream down"):
+                future.result()
+    assert flight.in_flight() == 0
+
+
+def test_do_many_only_fetches_keys_not_in_flight():
+    flight = SingleFlight()
+    started = threading.Event()
+    batches = []
+
+    def fetch(keys):
+        batches.append(sorted(keys))
+        started.set()
+        time.sleep(0.1)
+        return {key: key.lower() for key in keys}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(flight.do_many, ["AAPL", "MSFT"], fetch)
+        started.wait()
+        second = pool.submit(flight.do_many, ["MSFT", "NVDA"], fetch)
+        assert first.result() == {"AAPL": "aapl", "MSFT": "msft"}
+        assert second.result() == {"MSFT": "msft", "NVDA": "nvda"}
+    assert batches == [["AAPL", "MSFT"], ["NVDA"]]
+
+
+def test_single_call_refetches_key_missing_from_joined_batch():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fetch(keys):
+        started.set()
+        time.sleep(0.1)
+        return {"AAPL": 1.0}
+
+    def unknown():
+        raise ValueError("Unexpected response for ZZZZ")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        batch = pool.submit(flight.do_many, ["AAPL", "ZZZZ"], fetch)
+        started.wait()
+        refetched = pool.submit(flight.do, "ZZZZ", lambda: 2.0)
+        failing = pool.submit(flight.do, "ZZZZ", unknown)
+        assert batch.result() == {"AAPL": 1.0}
+        assert refetched.result() == 2.0
+        with pytest.raises(ValueError, match="ZZZZ"):
+            failing.result()
+    assert flight.stats()["coalesced"] == 2
+
+
+def test_cached_price_lookups_coalesce_upstream_requests():
+    with TwelveDataStub({"AAPL": 190.5}, delay=0.2) as stub:
+        client = TwelveDataClient(**stub.client_kwargs())
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            prices = list(pool.map(lambda _: client.fetch_intraday_price_cached("AAPL"), range(6)))
+    assert prices == [190.5] * 6
+    assert len(stub.requests) == 1
+
+
+def test_concurrent_batches_share_in_flight_symbols():
+    with TwelveDataStub({"AAPL": 1.0, "MSFT": 2.0}, delay=0.2) as stub:
+
+        def fetch(_):
+            return fetch_intraday_prices_concurrently(["AAPL", "MSFT"], **stub.client_kwargs())
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(fetch, range(4)))
+    assert results == [{"AAPL": 1.0, "MSFT": 2.0}] * 4
+    assert len(stub.requests) == 1
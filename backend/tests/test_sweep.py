@@ -0,0 +1,130 @@
+import json
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, ingestion, models, schemas, sweep_cli
+from app.backtest import BacktestData, run_backtest
+from app.crud import indicator_defs_from_plan
+from app.sweep import apply_params, expand_grid, iter_sweep, rank_results, run_sweep
+from synthetic_bars import make_bar_rows
+
+
+def _data(count: int = 400) -> BacktestData:
+    return BacktestData.from_bars([models.DailyBar(**row) for row in make_bar_rows(count)])
+
+
+def _base_plan() -> dict:
+    return {
+        "entry_rules": [{"id": "E1", "condition_expr": "Close lt SMA({period}) - {offset}"}],
+        "exit_rules": {
+            "hard_stop": {"type": "pct_below_entry", "value": 0.1},
+            "conditions": [{"id": "X1", "condition_expr": "Close gt ind.ma * 1.02"}],
+        },
+        "indicators": [{"id": "ma", "type": "MA", "ma_type": "SMA", "period": "{period}"}],
+    }
+
+
+GRID = {"period": [10, 20, 50], "offset": [0, 2], "exit_rules.hard_stop.value": [0.05, 0.1]}
+
+
+def test_apply_params_fills_placeholders_and_paths():
+    base = _base_plan()
+    plan = apply_params(base, {"period": 20, "offset": 1.5, "exit_rules.hard_stop.value": 0.07})
+    assert plan["entry_rules"][0]["condition_expr"] == "Close lt SMA(20) - 1.5"
+    assert plan["indicators"][0]["period"] == 20
+    assert plan["exit_rules"]["hard_stop"]["value"] == 0.07
+    assert base == _base_plan()
+
+    with pytest.raises(ValueError):
+        apply_params(base, {"exit_rules.missing.value": 1})
+
+
+def test_expand_grid_is_cartesian_product():
+    variants = expand_grid({"a": [1, 2], "b": ["x", "y", "z"]})
+    assert len(variants) == 6
+    assert variants[0] == {"a": 1, "b": "x"}
+    assert variants[-1] == {"a": 2, "b": "z"}
+
+
+def test_sequential_sweep_matches_individual_backtests():
+    data = _data()
+    results = sorted(iter_sweep(data, _base_plan(), GRID, workers=1), key=lambda item: item.index)
+    assert len(results) == 12
+    for result in results:
+        assert result.error is None
+        plan = apply_params(_base_plan(), result.params)
+        fresh = BacktestData.from_bars(
+            [models.DailyBar(**row) for row in make_bar_rows(400)], indicator_defs_from_plan(plan)
+        )
+        assert result.summary == run_backtest(plan, fresh).summary
+    assert any(key[0] == "SMA" for key in data.series_cache)
+
+
+def test_process_pool_sweep_matches_sequential():
+    sequential = run_sweep(_data(), _base_plan(), GRID, workers=1)
+    parallel = run_sweep(_data(), _base_plan(), GRID, workers=2)
+    assert [item.index for item in parallel] == [item.index for item in sequential]
+    assert [item.summary for item in parallel] == [item.summary for item in sequential]
+
+
+def test_failed_variants_rank_last():
+    grid = {"period": [10, 20], "exit_rules.nope": [1]}
+    results = run_sweep(_data(), _base_plan(), grid, workers=1)
+    assert all(result.error for result in results)
+
+    grid = {"period": [10, 20, "x"], "offset": [0]}
+    ranked = run_sweep(_data(), _base_plan(), grid, workers=1)
+    assert ranked[-1].params == {"period": "x", "offset": 0}
+    assert ranked[-1].error is not None
+    assert ranked[0].metric("total_return") >= ranked[1].metric("total_return")
+    assert rank_results(ranked, "trades")[0].summary["trades"] == max(
+        item.summary["trades"] for item in ranked if item.summary
+    )
+
+
+def test_rank_direction_follows_metric():
+    results = run_sweep(_data(), _base_plan(), GRID, workers=1)
+    summaries = [item.summary for item in results if item.summary]
+
+    def first(metric, descending=None):
+        return rank_results(results, metric, descending)[0].summary[metric]
+
+    assert first("losses") == min(summary["losses"] for summary in summaries)
+    assert first("max_drawdown") == max(summary["max_drawdown"] for summary in summaries)
+    assert first("total_return", descending=False) == min(
+        summary["total_return"] for summary in summaries
+    )
+    assert first("losses", descending=True) == max(summary["losses"] for summary in summaries)
+
+
+def test_sweep_cli(db_session, monkeypatch, tmp_path, capsys):
+    stock = models.Stock(ticker="MSFT", market="US", currency="USD")
+    db_session.add(stock)
+    db_session.commit()
+    crud.create_rule_plan(
+        db_session, stock, schemas.RulePlanCreate(version=1, is_active=True, rules=_base_plan())
+    )
+    ingestion.upsert_daily_bars(db_session, stock.id, make_bar_rows(300), source="fixture")
+    monkeypatch.setattr(sweep_cli, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+
+    args = ["--ticker", "msft", "--param", "period=10,20", "--param", "offset=0,1", "--workers", "1"]
+    assert sweep_cli.main(args + ["--jsonl"]) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(lines) == 4
+    assert all("summary" in line for line in lines)
+
+    grid_path = tmp_path / "grid.json"
+    grid_path.write_text(json.dumps({"period": [5, 10, 20]}), encoding="utf-8")
+    args = ["--stock-id", str(stock.id), "--grid", str(grid_path), "--param", "offset=0"]
+    assert sweep_cli.main(args + ["--workers", "1", "--top", "2", "--metric", "trades"]) == 0
+    out = capsys.readouterr().out
+    assert "3 variants" in out
+    assert out.count("trades=") == 2
+
+    assert sweep_cli.main(args + ["--workers", "1", "--top", "1", "--metric", "losses"]) == 0
+    assert sweep_cli.main(args + ["--workers", "1", "--metric", "trades", "--ascending"]) == 0
+    lines = [line for line in capsys.readouterr().out.splitlines() if "trades=" in line]
+    trades = [int(line.split("trades=")[1].split()[0]) for line in lines]
+    assert len(trades) == 3
+    assert trades == sorted(trades)
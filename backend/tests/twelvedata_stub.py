@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app.rate_limit import CreditRateLimiter
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class TwelveDataStub:
+    def __init__(
+        self,
+        prices: dict[str, float],
+        delay: float = 0.0,
+        connect_delay: float = 0.0,
+        failing: set[str] | None = None,
+    ):
+        self.prices = prices
+        self.failing = failing or set()
+        self.delay = delay
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self.requests: list[tuple[str, dict]] = []
+        self._lock = threading.Lock()
+        self._server = _StubServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def client_kwargs(self) -> dict:
+        return {
+            "api_key": "test",
+            "base_url": self.base_url,
+            "limiter": CreditRateLimiter(per_minute=1000, per_day=100000),
+        }
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def quote_payload(self, symbols: list[str]) -> dict:
+        if len(symbols) == 1:
+            return self._quote(symbols[0])
+        return {symbol: self._quote(symbol) for symbol in symbols}
+
+    def _quote(self, symbol: str) -> dict:
+        price = self.prices.get(symbol.upper())
+        if price is None:
+            return {
+                "code": 404,
+                "message": f"symbol {symbol} not found",
+                "status": "error",
+            }
+        return {"symbol": symbol.upper(), "close": f"{price:.5f}"}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = -1
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+                if stub.connect_delay:
+                    time.sleep(stub.connect_delay)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.requests.append((url.path, params))
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if url.path != "/quote":
+                    self.send_error(404)
+                    return
+                symbols = [item for item in params.get("symbol", "").split(",") if item]
+                if stub.failing.intersection(symbols):
+                    self.send_error(500)
+                    return
+                body = json.dumps(stub.quote_payload(symbols)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler